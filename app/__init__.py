@@ -8,4 +8,13 @@ def create_app():
     from app.routes import main
     app.register_blueprint(main)
 
+    from app.cli import register_commands
+    register_commands(app)
+
+    from app.profiling import init_profiling
+    init_profiling(app)
+
+    from app.assessments.calibration import init_calibration_reload
+    init_calibration_reload(app)
+
     return app
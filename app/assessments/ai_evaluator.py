@@ -1,69 +1,341 @@
 """
 AI-Powered Writing Evaluator
 Uses Claude API to assess student writing against Ontario curriculum rubrics.
+
+Where requests actually go (Claude, the offline scorer, recorded responses or
+a local stub server) is decided by the backend; see backends.py.
 """
 
 import os
 import json
+import hashlib
+import threading
+import time
+from collections import deque
+
+from app.assessments.backends import DEFAULT_MODEL, EvaluationRequest, backend_from_env
+from app.assessments.evaluation_cache import cache_from_env, make_cache_key
+from app.assessments.stream_parser import IncrementalEvaluationParser
+from app.assessments.local_scorer import score_writing
+from app.assessments.resilience import CircuitBreaker, call_with_retries, is_retryable_error
+from app.assessments.writing import (
+    RUBRIC_CATEGORIES, STRUCTURE_CHECK_QUESTIONS, THINK_FIRST_FRAMEWORK, TYPE_SELF_ASSESSMENT_QUESTIONS
+)
+from app.curriculum import ACHIEVEMENT_LEVELS
+from app.metrics import ai_call_duration, ai_call_tokens, ai_evaluations
+
+
+MODEL = DEFAULT_MODEL
+
+# Call budget defaults; each can be overridden with the environment variable of the same name
+AI_TIMEOUT_SECONDS = 30.0
+AI_DEADLINE_SECONDS = 45.0
+AI_MAX_RETRIES = 2
+AI_RETRY_BASE_DELAY = 0.5
+AI_RETRY_MAX_DELAY = 4.0
+AI_BREAKER_THRESHOLD = 5
+AI_BREAKER_COOLDOWN = 60.0
+
+# Prompt caching only applies once the cached prefix reaches this many tokens
+# (1,024 for Sonnet-class models); a shorter system prompt is silently sent uncached.
+MIN_CACHEABLE_PROMPT_TOKENS = 1024
+
+EVALUATION_RESPONSE_FORMAT = """Respond in this exact JSON format:
+{
+    "overall_level": <1-4>,
+    "overall_percentage": <50-100>,
+    "categories": {
+        "main_message": {
+            "level": <1-4>,
+            "strength": "<what they did well in 1 sentence>",
+            "improvement": "<specific suggestion to improve in 1 sentence>"
+        },
+        "logical_structure": {
+            "level": <1-4>,
+            "strength": "<what they did well in 1 sentence>",
+            "improvement": "<specific suggestion to improve in 1 sentence>"
+        },
+        "grouping": {
+            "level": <1-4>,
+            "strength": "<what they did well in 1 sentence>",
+            "improvement": "<specific suggestion to improve in 1 sentence>"
+        },
+        "conventions": {
+            "level": <1-4>,
+            "strength": "<what they did well in 1 sentence>",
+            "improvement": "<specific suggestion to improve in 1 sentence>"
+        }
+    },
+    "overall_feedback": "<2-3 sentences of encouraging, specific feedback about what they did well>",
+    "top_priority": "<The single most important thing they should focus on improving, explained in a helpful way for a Grade 7-8 student>"
+}"""
+
+
+def _build_system_prompt():
+    """
+    Assemble the evaluation instructions that are the same for every submission.
+
+    The full rubric, the planning framework students were taught and the
+    output format all go here, so the provider can cache them; only the
+    prompt details and essay vary per call.
+    """
+    lines = [
+        "You are assessing a Grade 7-8 student's writing for an Ontario curriculum assessment.",
+        "Evaluate the writing in the user's message and provide helpful, encouraging feedback.",
+        "",
+        "ACHIEVEMENT LEVELS (Ontario Achievement Chart):"
+    ]
+    for key in sorted(ACHIEVEMENT_LEVELS, reverse=True):
+        level = ACHIEVEMENT_LEVELS[key]
+        lines.append(f"- Level {key[-1]} ({level['range']}): {level['description']}. "
+                     f"{level['characteristics']}.")
+
+    lines += ["", "Evaluate against these four criteria (each worth 25%):"]
+    for number, (key, category) in enumerate(RUBRIC_CATEGORIES.items(), 1):
+        lines += ["", f"{number}. {category['name'].upper()} (\"{key}\"): {category['description']}"]
+        for level, descriptor in category["levels"].items():
+            lines.append(f"   - {level}: {descriptor}")
+
+    lines += ["", "Students planned with the Think First framework; credit writing that follows it:"]
+    for step in THINK_FIRST_FRAMEWORK.values():
+        lines.append(f"- {step['name']}: {step['prompt']} {step['description']}")
+
+    lines += ["", "Students were taught to check their structure with these questions:"]
+    lines += [f"- {question}" for question in STRUCTURE_CHECK_QUESTIONS]
+
+    lines += ["", "What to look for in each type of writing:"]
+    for prompt_type, questions in TYPE_SELF_ASSESSMENT_QUESTIONS.items():
+        lines.append(f"{prompt_type}:")
+        lines += [f"- {question}" for question in questions]
+
+    lines += [
+        "",
+        "Give each category the level whose descriptor best fits the writing, and make "
+        "overall_percentage fall inside the range of overall_level.",
+        "",
+        EVALUATION_RESPONSE_FORMAT,
+        "",
+        "Be encouraging but honest. Focus on helping the student improve. "
+        "Use language appropriate for Grade 7-8 students."
+    ]
+    return "\n".join(lines)
+
+
+# Everything that is the same for every submission lives in the system prompt
+# so the provider can cache it; only the prompt details and essay vary per call.
+EVALUATION_SYSTEM_PROMPT = _build_system_prompt()
+
 
-try:
-    import anthropic
-    HAS_ANTHROPIC = True
-except ImportError:
-    HAS_ANTHROPIC = False
+class UsageTelemetry:
+    """Token and latency counters for Claude calls, split by prompt-cache use."""
+
+    def __init__(self, history=200):
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.input_tokens = 0
+        self.cache_read_input_tokens = 0
+        self.cache_creation_input_tokens = 0
+        self.output_tokens = 0
+        self.recent = deque(maxlen=history)
+
+    def record(self, usage, latency):
+        """Add one call's usage block (from the API response) and its latency."""
+        call = {
+            "input_tokens": getattr(usage, 'input_tokens', 0) or 0,
+            "cache_read_input_tokens": getattr(usage, 'cache_read_input_tokens', 0) or 0,
+            "cache_creation_input_tokens": getattr(usage, 'cache_creation_input_tokens', 0) or 0,
+            "output_tokens": getattr(usage, 'output_tokens', 0) or 0,
+            "latency_seconds": round(latency, 3)
+        }
+        with self._lock:
+            self.calls += 1
+            self.input_tokens += call["input_tokens"]
+            self.cache_read_input_tokens += call["cache_read_input_tokens"]
+            self.cache_creation_input_tokens += call["cache_creation_input_tokens"]
+            self.output_tokens += call["output_tokens"]
+            self.recent.append(call)
+
+    def snapshot(self):
+        """Return totals, the cached share of input tokens and mean latency by cache use."""
+        with self._lock:
+            recent = list(self.recent)
+            totals = {
+                "calls": self.calls,
+                "uncached_input_tokens": self.input_tokens,
+                "cache_read_input_tokens": self.cache_read_input_tokens,
+                "cache_creation_input_tokens": self.cache_creation_input_tokens,
+                "output_tokens": self.output_tokens
+            }
+        all_input = (totals["uncached_input_tokens"] + totals["cache_read_input_tokens"]
+                     + totals["cache_creation_input_tokens"])
+        totals["cached_input_ratio"] = (
+            round(totals["cache_read_input_tokens"] / all_input, 3) if all_input else 0.0
+        )
+        hits = [c["latency_seconds"] for c in recent if c["cache_read_input_tokens"]]
+        misses = [c["latency_seconds"] for c in recent if not c["cache_read_input_tokens"]]
+        totals["mean_latency_seconds"] = {
+            "prompt_cache_hit": round(sum(hits) / len(hits), 3) if hits else None,
+            "prompt_cache_miss": round(sum(misses) / len(misses), 3) if misses else None
+        }
+        return totals
 
 
 class AIEvaluator:
     """Evaluates student writing using AI against curriculum rubrics."""
 
-    def __init__(self):
-        self.api_key = os.environ.get('ANTHROPIC_API_KEY')
-        self.client = None
-        if HAS_ANTHROPIC and self.api_key:
-            self.client = anthropic.Anthropic(api_key=self.api_key)
+    def __init__(self, backend=None):
+        self.backend = backend or backend_from_env()
+        self.model = self.backend.model
+        self.prompt_version = self._prompt_fingerprint()
+        self.usage = UsageTelemetry()
+        self.timeout = float(os.environ.get('AI_TIMEOUT_SECONDS', AI_TIMEOUT_SECONDS))
+        self.deadline = float(os.environ.get('AI_DEADLINE_SECONDS', AI_DEADLINE_SECONDS))
+        self.max_retries = int(os.environ.get('AI_MAX_RETRIES', AI_MAX_RETRIES))
+        self.retry_base_delay = float(os.environ.get('AI_RETRY_BASE_DELAY', AI_RETRY_BASE_DELAY))
+        self.retry_max_delay = float(os.environ.get('AI_RETRY_MAX_DELAY', AI_RETRY_MAX_DELAY))
+        self.breaker = CircuitBreaker(
+            failure_threshold=int(os.environ.get('AI_BREAKER_THRESHOLD', AI_BREAKER_THRESHOLD)),
+            cooldown_seconds=float(os.environ.get('AI_BREAKER_COOLDOWN', AI_BREAKER_COOLDOWN))
+        )
+        self.cache = cache_from_env() if self.backend.cacheable and self.is_available() else None
+        if self.cache:
+            # Entries built from an older evaluation prompt can never be hit again
+            self.cache.invalidate(self.prompt_version)
 
     def is_available(self):
         """Check if AI evaluation is available."""
-        return self.client is not None
+        return self.backend.is_available()
 
-    def evaluate_writing(self, student_text, prompt_info):
+    def evaluate_writing(self, student_text, prompt_info, on_category=None, metrics=None):
         """
         Evaluate student writing against the rubric.
 
         Args:
             student_text: The student's written response
             prompt_info: Dict with prompt details (title, type, requirements)
+            on_category: Optional callback(category_key, category_dict). When
+                given, the response is streamed and the callback fires as
+                soon as each rubric category is complete.
+            metrics: Optional TextMetrics already computed for student_text
 
         Returns:
             Dict with scores, feedback, and improvement suggestions
         """
         if not self.is_available():
-            return self._fallback_evaluation(student_text, prompt_info)
+            ai_evaluations.inc("fallback_unavailable")
+            return self._fallback_evaluation(student_text, prompt_info, metrics)
+
+        cache_key = None
+        if self.cache:
+            cache_key = make_cache_key(student_text, prompt_info, self.model, self.prompt_version)
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                ai_evaluations.inc("cache_hit")
+                if on_category:
+                    for key, category in cached.get("categories", {}).items():
+                        on_category(key, category)
+                return cached
 
-        evaluation_prompt = self._build_evaluation_prompt(student_text, prompt_info)
+        # While the breaker is open, skip the API entirely for a bounded response time
+        if not self.breaker.allow():
+            ai_evaluations.inc("fallback_breaker_open")
+            return self._fallback_evaluation(student_text, prompt_info, metrics)
+
+        request = EvaluationRequest(
+            system=self._system_blocks(),
+            prompt=self._build_evaluation_prompt(student_text, prompt_info),
+            student_text=student_text,
+            prompt_info=prompt_info,
+            metrics=metrics
+        )
+        progress = {"streamed": False}
+
+        def attempt(remaining):
+            return self._request_evaluation(
+                request, on_category, min(self.timeout, remaining), progress
+            )
 
         try:
-            message = self.client.messages.create(
-                model="claude-sonnet-4-20250514",
-                max_tokens=2000,
-                messages=[
-                    {"role": "user", "content": evaluation_prompt}
-                ]
+            response_text = call_with_retries(
+                attempt,
+                max_retries=self.max_retries,
+                deadline_seconds=self.deadline,
+                base_delay=self.retry_base_delay,
+                max_delay=self.retry_max_delay,
+                # A stream that already showed feedback can't be replayed cleanly
+                is_retryable=lambda e: not progress["streamed"] and is_retryable_error(e)
             )
+        except Exception as e:
+            self.breaker.record_failure()
+            print(f"AI evaluation error: {e}")
+            ai_evaluations.inc("fallback_error")
+            return self._fallback_evaluation(student_text, prompt_info, metrics)
 
-            response_text = message.content[0].text
+        self.breaker.record_success()
+        ai_evaluations.inc("ai")
+        evaluation = self._extract_json(response_text)
+        if evaluation is None:
             return self._parse_evaluation_response(response_text)
+        if cache_key:
+            self.cache.put(cache_key, evaluation, self.prompt_version)
+        return evaluation
 
-        except Exception as e:
-            print(f"AI evaluation error: {e}")
-            return self._fallback_evaluation(student_text, prompt_info)
+    def _request_evaluation(self, request, on_category, timeout, progress):
+        """Make one backend call and return the response text."""
+        started = time.perf_counter()
+        try:
+            if not on_category:
+                text, usage = self.backend.complete(request, timeout)
+            else:
+                # Stream the evaluation, reporting each category as it completes
+                parser = IncrementalEvaluationParser()
 
-    def _build_evaluation_prompt(self, student_text, prompt_info):
-        """Build the prompt for AI evaluation."""
-        return f"""You are assessing a Grade 7-8 student's writing for an Ontario curriculum assessment.
-Evaluate this writing and provide helpful, encouraging feedback.
+                def on_text(chunk):
+                    for key, category in parser.feed(chunk):
+                        progress["streamed"] = True
+                        on_category(key, category)
+
+                text, usage = self.backend.stream(request, timeout, on_text)
+        except Exception:
+            ai_call_duration.observe(time.perf_counter() - started, self.backend.name, "error")
+            raise
+        latency = time.perf_counter() - started
+        ai_call_duration.observe(latency, self.backend.name, "success")
+        if usage is not None:
+            self.usage.record(usage, latency)
+            ai_call_tokens.observe(
+                (getattr(usage, 'input_tokens', 0) or 0)
+                + (getattr(usage, 'cache_read_input_tokens', 0) or 0)
+                + (getattr(usage, 'cache_creation_input_tokens', 0) or 0),
+                self.backend.name, "in")
+            ai_call_tokens.observe(getattr(usage, 'output_tokens', 0) or 0, self.backend.name, "out")
+        return text
+
+    def _prompt_fingerprint(self):
+        """Hash the evaluation prompt template so cache entries follow its changes."""
+        template = self._build_evaluation_prompt("{student_text}", {
+            "title": "{title}",
+            "type": "{type}",
+            "word_minimum": "{word_minimum}",
+            "word_maximum": "{word_maximum}"
+        })
+        fingerprint = hashlib.sha256(EVALUATION_SYSTEM_PROMPT.encode('utf-8'))
+        fingerprint.update(template.encode('utf-8'))
+        return fingerprint.hexdigest()[:16]
 
-WRITING PROMPT: {prompt_info.get('title', 'Writing Assignment')}
+    def _system_blocks(self):
+        """The static rubric instructions, marked for provider-side prompt caching."""
+        return [
+            {
+                "type": "text",
+                "text": EVALUATION_SYSTEM_PROMPT,
+                "cache_control": {"type": "ephemeral"}
+            }
+        ]
+
+    def _build_evaluation_prompt(self, student_text, prompt_info):
+        """Build the per-submission part of the evaluation prompt."""
+        return f"""WRITING PROMPT: {prompt_info.get('title', 'Writing Assignment')}
 TYPE: {prompt_info.get('type', 'General Writing')}
 REQUIREMENTS: {prompt_info.get('word_minimum', 200)}-{prompt_info.get('word_maximum', 500)} words
 
@@ -71,51 +343,10 @@ STUDENT'S WRITING:
 \"\"\"
 {student_text}
 \"\"\"
+"""
 
-Evaluate against these four criteria (each worth 25%):
-
-1. MAIN MESSAGE & FOCUS: Is the main point clear from the start? Does the reader immediately understand what the writer is saying?
-
-2. LOGICAL STRUCTURE: Do supporting points clearly connect to the main message? Does each paragraph answer 'why?' or 'how?' about the main point?
-
-3. GROUPING & COMPLETENESS: Are ideas organized without overlap? Are the supporting points different from each other? Together do they cover everything important?
-
-4. CONVENTIONS & CLARITY: Is the writing clear and relatively error-free? Are sentences varied and words precise?
-
-Respond in this exact JSON format:
-{{
-    "overall_level": <1-4>,
-    "overall_percentage": <50-100>,
-    "categories": {{
-        "main_message": {{
-            "level": <1-4>,
-            "strength": "<what they did well in 1 sentence>",
-            "improvement": "<specific suggestion to improve in 1 sentence>"
-        }},
-        "logical_structure": {{
-            "level": <1-4>,
-            "strength": "<what they did well in 1 sentence>",
-            "improvement": "<specific suggestion to improve in 1 sentence>"
-        }},
-        "grouping": {{
-            "level": <1-4>,
-            "strength": "<what they did well in 1 sentence>",
-            "improvement": "<specific suggestion to improve in 1 sentence>"
-        }},
-        "conventions": {{
-            "level": <1-4>,
-            "strength": "<what they did well in 1 sentence>",
-            "improvement": "<specific suggestion to improve in 1 sentence>"
-        }}
-    }},
-    "overall_feedback": "<2-3 sentences of encouraging, specific feedback about what they did well>",
-    "top_priority": "<The single most important thing they should focus on improving, explained in a helpful way for a Grade 7-8 student>"
-}}
-
-Be encouraging but honest. Focus on helping the student improve. Use language appropriate for Grade 7-8 students."""
-
-    def _parse_evaluation_response(self, response_text):
-        """Parse the AI response into structured evaluation."""
+    def _extract_json(self, response_text):
+        """Return the JSON object embedded in the AI response, or None."""
         try:
             # Find JSON in response
             start = response_text.find('{')
@@ -125,6 +356,13 @@ Be encouraging but honest. Focus on helping the student improve. Use language ap
                 return json.loads(json_str)
         except json.JSONDecodeError:
             pass
+        return None
+
+    def _parse_evaluation_response(self, response_text):
+        """Parse the AI response into structured evaluation."""
+        evaluation = self._extract_json(response_text)
+        if evaluation is not None:
+            return evaluation
 
         # Return a default structure if parsing fails
         return {
@@ -140,60 +378,25 @@ Be encouraging but honest. Focus on helping the student improve. Use language ap
             "top_priority": "Focus on stating your main message clearly in your first paragraph so readers know right away what you're writing about."
         }
 
-    def _fallback_evaluation(self, student_text, prompt_info):
-        """Provide basic evaluation when AI is not available."""
-        words = student_text.split()
-        word_count = len(words)
-        paragraphs = [p for p in student_text.split('\n\n') if p.strip()]
-        paragraph_count = len(paragraphs)
-        sentences = student_text.replace('!', '.').replace('?', '.').split('.')
-        sentence_count = len([s for s in sentences if s.strip()])
-
-        # Basic heuristics
-        has_good_length = prompt_info.get('word_minimum', 200) <= word_count <= prompt_info.get('word_maximum', 500)
-        has_paragraphs = paragraph_count >= 3
-        has_variety = sentence_count >= 5
-
-        # Estimate levels based on basic analysis
-        base_level = 2
-        if has_good_length:
-            base_level += 0.5
-        if has_paragraphs:
-            base_level += 0.5
-        if has_variety:
-            base_level += 0.5
-
-        overall_level = min(4, max(1, round(base_level)))
-
-        level_percentages = {1: 55, 2: 65, 3: 74, 4: 85}
+    def _fallback_evaluation(self, student_text, prompt_info, metrics=None):
+        """Provide an offline, feature-based evaluation when AI is not available."""
+        return score_writing(student_text, prompt_info, metrics)
 
-        return {
-            "overall_level": overall_level,
-            "overall_percentage": level_percentages[overall_level],
-            "categories": {
-                "main_message": {
-                    "level": overall_level,
-                    "strength": "You have a message to share with your reader.",
-                    "improvement": "Make sure your main point is crystal clear in your first paragraph."
-                },
-                "logical_structure": {
-                    "level": overall_level if has_paragraphs else max(1, overall_level - 1),
-                    "strength": "You've organized your writing." if has_paragraphs else "You've started organizing your ideas.",
-                    "improvement": "Each paragraph should make ONE clear point that supports your main message."
-                },
-                "grouping": {
-                    "level": overall_level,
-                    "strength": "You've included supporting points.",
-                    "improvement": "Double-check that your points are different from each other and don't repeat the same idea."
-                },
-                "conventions": {
-                    "level": overall_level,
-                    "strength": "Your writing is understandable.",
-                    "improvement": "Always proofread your work for spelling and grammar errors."
-                }
-            },
-            "overall_feedback": f"You wrote {word_count} words across {paragraph_count} paragraph{'s' if paragraph_count != 1 else ''}. " +
-                ("Good job meeting the word count!" if has_good_length else f"Try to {'expand' if word_count < prompt_info.get('word_minimum', 200) else 'tighten'} your writing to meet the target."),
-            "top_priority": "Focus on making your main message clear from the very first paragraph. Your reader should know exactly what you're saying before they finish your introduction.",
-            "ai_evaluated": False
-        }
+
+_evaluator = None
+_evaluator_lock = threading.Lock()
+
+
+def get_evaluator():
+    """
+    Return the process-wide AIEvaluator.
+
+    Every WritingAssessment shares this evaluator, and with it the pooled
+    Claude client, so submissions reuse warm connections.
+    """
+    global _evaluator
+    if _evaluator is None:
+        with _evaluator_lock:
+            if _evaluator is None:
+                _evaluator = AIEvaluator()
+    return _evaluator
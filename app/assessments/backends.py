@@ -0,0 +1,301 @@
+"""
+Evaluator Backends
+Where AIEvaluator sends an evaluation request, chosen by configuration.
+
+Every backend turns an EvaluationRequest into the model's response text
+(plus a token usage block when there is one), either in one piece with
+complete() or chunk by chunk with stream(). AIEvaluator keeps the caching,
+deadlines, retries and circuit breaker, so the same pipeline can run against
+the real Claude API, the offline scorer, recorded responses or a local stub
+server that mimics the Messages API.
+
+Backends:
+    claude  The Claude Messages API (default)
+    local   The offline feature-based scorer; no network, no API key
+    replay  Responses recorded in a cassette, looked up by request hash
+    record  Claude (or the stub) with every call recorded in a cassette
+    stub    The Claude client pointed at a local stub server
+            (python -m benchmarks.stub_server)
+
+Configuration (environment variables):
+    AI_BACKEND         Backend name (default claude)
+    AI_MODEL           Model to request (default claude-sonnet-4-20250514)
+    AI_STUB_URL        Stub server address (default http://127.0.0.1:8765)
+    AI_CASSETTE_PATH   Cassette recorded to and replayed from
+                       (default instance/ai_cassette.jsonl.gz)
+    AI_REPLAY_SPEED    Multiplier on recorded latencies when replaying;
+                       0 replays instantly (default 1)
+    AI_RECORD_BACKEND  Backend the record backend wraps: claude or stub
+                       (default claude)
+"""
+
+import hashlib
+import json
+import os
+import time
+
+try:
+    from anthropic import APITimeoutError
+except ImportError:
+    # Only the Claude backends raise it, and they are unavailable without the SDK
+    APITimeoutError = None
+
+from app.assessments.cassette import Cassette, unpack_usage
+from app.assessments.client_pool import get_client
+from app.assessments.evaluation_cache import INSTANCE_DIR
+from app.assessments.local_scorer import score_writing
+
+
+DEFAULT_MODEL = "claude-sonnet-4-20250514"
+DEFAULT_STUB_URL = "http://127.0.0.1:8765"
+DEFAULT_CASSETTE_PATH = os.path.join(INSTANCE_DIR, 'ai_cassette.jsonl.gz')
+DEFAULT_REPLAY_SPEED = 1.0
+
+MAX_TOKENS = 2000
+
+
+class EvaluationRequest:
+    """One evaluation call: the prompt for remote models and the raw inputs for local ones."""
+
+    def __init__(self, system, prompt, student_text, prompt_info, metrics=None, max_tokens=MAX_TOKENS):
+        self.system = system
+        self.prompt = prompt
+        self.student_text = student_text
+        self.prompt_info = prompt_info
+        self.metrics = metrics
+        self.max_tokens = max_tokens
+
+    def key(self, model):
+        """Hash identifying the request, used to look up recorded responses."""
+        payload = json.dumps({
+            "model": model,
+            "system": [block.get("text") for block in self.system],
+            "prompt": self.prompt
+        }, sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class ReplayMiss(LookupError):
+    """Raised when the replay backend has no recording for a request."""
+
+
+class ClaudeBackend:
+    """The Claude Messages API through the shared, pooled client."""
+
+    name = "claude"
+    cacheable = True
+
+    def __init__(self, api_key, model=DEFAULT_MODEL, base_url=None):
+        self.model = model
+        self.base_url = base_url
+        self.client = get_client(api_key, base_url)
+
+    def is_available(self):
+        return self.client is not None
+
+    def complete(self, request, timeout):
+        """Return (text, usage) for one non-streaming call."""
+        message = self.client.messages.create(
+            model=self.model,
+            max_tokens=request.max_tokens,
+            system=request.system,
+            messages=[
+                {"role": "user", "content": request.prompt}
+            ],
+            timeout=timeout
+        )
+        return message.content[0].text, message.usage
+
+    def stream(self, request, timeout, on_text):
+        """
+        Call on_text(chunk) as the response streams in; return (text, usage).
+
+        The client's timeout only bounds each read, so a response that keeps
+        trickling in could run far past it; the whole stream is held to
+        `timeout` seconds and then abandoned with APITimeoutError, which the
+        retry and circuit-breaker code already treat as a timeout.
+        """
+        deadline = time.monotonic() + timeout
+        chunks = []
+        with self.client.messages.stream(
+            model=self.model,
+            max_tokens=request.max_tokens,
+            system=request.system,
+            messages=[
+                {"role": "user", "content": request.prompt}
+            ],
+            timeout=timeout
+        ) as stream:
+            for text in stream.text_stream:
+                if time.monotonic() > deadline:
+                    stream.close()
+                    raise APITimeoutError(request=stream.response.request)
+                chunks.append(text)
+                on_text(text)
+            usage = stream.get_final_message().usage
+        return "".join(chunks), usage
+
+
+class StubBackend(ClaudeBackend):
+    """The Claude client aimed at a local Messages API stub, for load tests."""
+
+    name = "stub"
+    # Every stub response is generated afresh, so caching would hide the load
+    cacheable = False
+
+    def __init__(self, base_url=DEFAULT_STUB_URL, model=DEFAULT_MODEL):
+        super().__init__("stub-key", model=model, base_url=base_url)
+
+
+class LocalBackend:
+    """
+    The offline feature-based scorer.
+
+    It reports itself as unavailable, so AIEvaluator answers straight from
+    the local scorer (its fallback) without any AI plumbing; complete() and
+    stream() still work for callers that want backend-shaped output.
+    """
+
+    name = "local"
+    model = "local-scorer"
+    cacheable = False
+
+    def is_available(self):
+        return False
+
+    def complete(self, request, timeout):
+        evaluation = score_writing(request.student_text, request.prompt_info, request.metrics)
+        return json.dumps(evaluation), None
+
+    def stream(self, request, timeout, on_text):
+        text, usage = self.complete(request, timeout)
+        on_text(text)
+        return text, usage
+
+
+class ReplayBackend:
+    """
+    Responses recorded earlier in a cassette, served without any network.
+
+    Each response is returned after its recorded latency multiplied by
+    speed (1 reproduces the original timing, 0.5 halves it, 0 returns
+    immediately). Streamed replies wait for the recorded first-token time,
+    then release the text in chunks over the rest of the latency. A request
+    with no recording raises ReplayMiss.
+    """
+
+    name = "replay"
+    cacheable = False
+
+    # Characters per replayed stream chunk
+    CHUNK_CHARS = 24
+
+    def __init__(self, path=DEFAULT_CASSETTE_PATH, model=DEFAULT_MODEL, speed=1.0):
+        self.model = model
+        self.speed = speed
+        self.cassette = path if isinstance(path, Cassette) else Cassette(path)
+        self.misses = 0
+        if not len(self.cassette):
+            print(f"No recorded AI responses in {self.cassette.path}")
+
+    def is_available(self):
+        return bool(len(self.cassette))
+
+    def _lookup(self, request, timeout):
+        entry = self.cassette.get(request.key(self.model))
+        if entry is None:
+            self.misses += 1
+            raise ReplayMiss("No recorded response for this request")
+        latency = entry["latency"] * self.speed
+        if latency > timeout:
+            time.sleep(timeout)
+            raise TimeoutError("Recorded response is slower than the timeout")
+        return entry, latency
+
+    def complete(self, request, timeout):
+        entry, latency = self._lookup(request, timeout)
+        time.sleep(latency)
+        return entry["text"], unpack_usage(entry["usage"])
+
+    def stream(self, request, timeout, on_text):
+        entry, latency = self._lookup(request, timeout)
+        text = entry["text"]
+        first_token = min(latency, (entry.get("first_token") or 0) * self.speed)
+        chunks = [text[i:i + self.CHUNK_CHARS] for i in range(0, len(text), self.CHUNK_CHARS)]
+        pause = (latency - first_token) / max(1, len(chunks))
+        time.sleep(first_token)
+        for chunk in chunks:
+            on_text(chunk)
+            if pause:
+                time.sleep(pause)
+        return text, unpack_usage(entry["usage"])
+
+
+class RecordingBackend:
+    """
+    Pass calls through to another backend and record each one in a cassette.
+
+    Only successful calls are recorded; errors reach the evaluator unchanged
+    so its retries behave as they would without recording.
+    """
+
+    name = "record"
+    # Every call must reach the wrapped backend to be recorded
+    cacheable = False
+
+    def __init__(self, backend, cassette):
+        self.backend = backend
+        self.model = backend.model
+        self.cassette = cassette if isinstance(cassette, Cassette) else Cassette(cassette)
+
+    def is_available(self):
+        return self.backend.is_available()
+
+    def complete(self, request, timeout):
+        started = time.perf_counter()
+        text, usage = self.backend.complete(request, timeout)
+        self.cassette.record(request.key(self.model), request, text, usage,
+                             time.perf_counter() - started)
+        return text, usage
+
+    def stream(self, request, timeout, on_text):
+        started = time.perf_counter()
+        first = []
+
+        def record_first(chunk):
+            if not first:
+                first.append(time.perf_counter() - started)
+            on_text(chunk)
+
+        text, usage = self.backend.stream(request, timeout, record_first)
+        self.cassette.record(request.key(self.model), request, text, usage,
+                             time.perf_counter() - started, first[0] if first else None)
+        return text, usage
+
+
+BACKENDS = ("claude", "local", "replay", "record", "stub")
+
+
+def remote_backend(name, model):
+    """The Claude API backend, or the stub when name is "stub"."""
+    if name == "stub":
+        return StubBackend(os.environ.get('AI_STUB_URL', DEFAULT_STUB_URL), model=model)
+    if name != "claude":
+        print(f"Unknown AI backend {name!r}; using claude")
+    return ClaudeBackend(os.environ.get('ANTHROPIC_API_KEY'), model=model)
+
+
+def backend_from_env():
+    """Build the evaluator backend named by AI_BACKEND."""
+    name = os.environ.get('AI_BACKEND', 'claude').strip().lower()
+    model = os.environ.get('AI_MODEL', DEFAULT_MODEL)
+    cassette_path = os.environ.get('AI_CASSETTE_PATH', DEFAULT_CASSETTE_PATH)
+    if name == "local":
+        return LocalBackend()
+    if name == "replay":
+        speed = float(os.environ.get('AI_REPLAY_SPEED', DEFAULT_REPLAY_SPEED))
+        return ReplayBackend(cassette_path, model=model, speed=speed)
+    if name == "record":
+        source = os.environ.get('AI_RECORD_BACKEND', 'claude').strip().lower()
+        return RecordingBackend(remote_backend(source, model), cassette_path)
+    return remote_backend(name, model)
@@ -0,0 +1,347 @@
+"""
+Batch Class Grading
+Scores a whole class's answers to one reading passage at once.
+
+Teachers who give the test on paper can upload every student's answers as
+CSV or JSON. The answers become a students x questions NumPy matrix that is
+compared with the passage's answer key in a single vectorized pass; scores,
+achievement levels and skill breakdowns all come from that one comparison.
+Each student's result is identical to what ReadingAssessment.evaluate_answers
+returns for the same answers.
+
+CSV layout: a header row with a student column ("student_id", "student" or
+"name") and one column per question id ("q1", "q2", ...). Answers may be
+option indexes (0-3) or letters (A-D); blank cells count as unanswered, and
+any other answer rejects the upload.
+"""
+
+import csv
+import io
+import json
+from functools import lru_cache
+
+import numpy as np
+
+from app.assessments.irt import estimate_abilities
+from app.assessments.reading import (
+    LEVEL_CUTOFFS, NEEDS_IMPROVEMENT_BELOW, STRENGTH_FROM, get_passage_catalog, skill_feedback
+)
+
+
+STUDENT_COLUMNS = ("student_id", "student", "name")
+
+# Matrix value for a question the student left blank
+UNANSWERED = -1
+
+
+class BatchFormatError(ValueError):
+    """Raised when uploaded class answers cannot be parsed."""
+
+
+class AnswerKey:
+    """The arrays needed to grade one passage, built once per passage."""
+
+    def __init__(self, passage):
+        questions = passage["questions"]
+        self.question_ids = [q["id"] for q in questions]
+        self.question_details = [
+            (q["id"], q["question"], q["skill"], q["correct"], q["explanation"]) for q in questions
+        ]
+        self.correct = np.array([q["correct"] for q in questions], dtype=np.int16)
+        self.option_counts = {q["id"]: len(q["options"]) for q in questions}
+
+        # Skills in order of first appearance, matching evaluate_answers
+        self.skills = list(dict.fromkeys(q["skill"] for q in questions))
+        skill_index = {skill: i for i, skill in enumerate(self.skills)}
+        self.skill_matrix = np.zeros((len(questions), len(self.skills)), dtype=np.int32)
+        for row, question in enumerate(questions):
+            self.skill_matrix[row, skill_index[question["skill"]]] = 1
+        self.skill_totals = self.skill_matrix.sum(axis=0)
+
+        # Rasch difficulties, once every question has been calibrated
+        difficulties = [q.get("difficulty") for q in questions]
+        self.difficulties = None if None in difficulties else np.array(difficulties, dtype=np.float64)
+
+        # Per-skill feedback items indexed by status: none, needs improvement, strength
+        self.feedback = [
+            (None, skill_feedback(skill, 0), skill_feedback(skill, 100)) for skill in self.skills
+        ]
+
+
+@lru_cache(maxsize=None)
+def get_answer_key(passage_id):
+    """Return the cached AnswerKey for a passage, or None if it does not exist."""
+    passage = get_passage_catalog().get(passage_id)
+    return AnswerKey(passage) if passage else None
+
+
+def _parse_answer(value):
+    """Turn one cell or JSON value into an option index, or None if blank."""
+    if value is None:
+        return None
+    if isinstance(value, bool):
+        raise BatchFormatError(f"Invalid answer: {value!r}")
+    if isinstance(value, int):
+        if value < 0:
+            raise BatchFormatError(f"Invalid answer: {value!r}")
+        return value
+    text = str(value).strip()
+    if not text:
+        return None
+    if text.isdigit():
+        return int(text)
+    if len(text) == 1 and text.isalpha():
+        return ord(text.upper()) - ord("A")
+    raise BatchFormatError(f"Invalid answer: {value!r}")
+
+
+def parse_csv(text):
+    """
+    Parse class answers from CSV text.
+
+    Returns:
+        List of (student_id, answers) pairs, answers mapping question id to index
+    """
+    reader = csv.DictReader(io.StringIO(text))
+    if not reader.fieldnames:
+        raise BatchFormatError("CSV file is empty")
+    fieldnames = [name.strip() for name in reader.fieldnames]
+    reader.fieldnames = fieldnames
+    student_column = next((c for c in fieldnames if c.lower() in STUDENT_COLUMNS), None)
+    if student_column is None:
+        raise BatchFormatError("CSV needs a student_id column")
+
+    students = []
+    for line, row in enumerate(reader, start=2):
+        student_id = (row.get(student_column) or "").strip()
+        if not student_id:
+            raise BatchFormatError(f"Row {line} has no student id")
+        answers = {}
+        for column in fieldnames:
+            if column != student_column:
+                answer = _parse_answer(row.get(column))
+                if answer is not None:
+                    answers[column] = answer
+        students.append((student_id, answers))
+    return students
+
+
+def parse_json(data):
+    """
+    Parse class answers from decoded JSON.
+
+    Accepts a list of {"student_id": ..., "answers": {...}} objects or a
+    dict mapping student id to answers.
+
+    Returns:
+        List of (student_id, answers) pairs
+    """
+    if isinstance(data, dict):
+        data = [{"student_id": sid, "answers": answers} for sid, answers in data.items()]
+    if not isinstance(data, list):
+        raise BatchFormatError("Expected a list of students")
+
+    students = []
+    for number, entry in enumerate(data, start=1):
+        if not isinstance(entry, dict) or not isinstance(entry.get("answers"), dict):
+            raise BatchFormatError(f"Student {number} needs an answers object")
+        student_id = entry.get("student_id") or entry.get("student") or entry.get("name")
+        if student_id in (None, ""):
+            raise BatchFormatError(f"Student {number} has no student_id")
+        answers = {}
+        for qid, value in entry["answers"].items():
+            answer = _parse_answer(value)
+            if answer is not None:
+                answers[qid] = answer
+        students.append((str(student_id), answers))
+    return students
+
+
+def parse_answers(text, filename=""):
+    """Parse an uploaded answers file, choosing CSV or JSON by name or content."""
+    stripped = text.lstrip("﻿").lstrip()
+    if filename.lower().endswith(".json") or stripped[:1] in ("[", "{"):
+        try:
+            return parse_json(json.loads(stripped))
+        except json.JSONDecodeError as e:
+            raise BatchFormatError(f"Invalid JSON: {e}")
+    return parse_csv(text.lstrip("﻿"))
+
+
+def check_answers(key, students):
+    """
+    Make sure every answer picks one of its question's options.
+
+    Raises:
+        BatchFormatError: naming the first student and question out of range
+    """
+    option_counts = key.option_counts
+    for student_id, answers in students:
+        for qid, answer in answers.items():
+            count = option_counts.get(qid)
+            if count is not None and not 0 <= answer < count:
+                raise BatchFormatError(f"Student {student_id}: the answer to {qid} must be "
+                                       f"0-{count - 1} or A-{chr(ord('A') + count - 1)}")
+
+
+def valid_answers(key, answers):
+    """
+    Keep only the answers that pick one of their question's options.
+
+    Answers are coerced to option indexes as in an upload ("B" or "1" -> 1);
+    anything else, or an answer to an unknown question, is dropped.
+
+    Returns:
+        Dict mapping question id to option index
+    """
+    cleaned = {}
+    if not isinstance(answers, dict):
+        return cleaned
+    for qid, value in answers.items():
+        count = key.option_counts.get(qid)
+        if count is None:
+            continue
+        try:
+            answer = _parse_answer(value)
+        except BatchFormatError:
+            continue
+        if answer is not None and answer < count:
+            cleaned[qid] = answer
+    return cleaned
+
+
+def answer_matrix(key, students):
+    """
+    Build the students x questions matrix of chosen option indexes.
+
+    Cells that are not an option index of their question (e.g. from an old
+    log line) count as unanswered rather than breaking the matrix.
+    """
+    question_ids = key.question_ids
+    counts = [key.option_counts[qid] for qid in question_ids]
+    rows = [
+        [answer if type(answer) is int and 0 <= answer < count else UNANSWERED
+         for answer, count in zip(map(answers.get, question_ids), counts)]
+        for _, answers in students
+    ]
+    return np.array(rows, dtype=np.int16).reshape(len(students), len(question_ids))
+
+
+def grade_class(passage_id, students):
+    """
+    Grade every student's answers to one passage.
+
+    Args:
+        passage_id: ID of the passage
+        students: List of (student_id, answers) pairs from parse_answers()
+
+    Returns:
+        Dict with one evaluate_answers-style result per student (plus its
+        student_id) and a class summary, or {"error": ...} if the passage
+        does not exist
+
+    Raises:
+        BatchFormatError: if an answer is not one of its question's options
+    """
+    key = get_answer_key(passage_id)
+    if key is None:
+        return {"error": "Passage not found"}
+    check_answers(key, students)
+    passage = get_passage_catalog()[passage_id]
+    total = len(key.question_ids)
+
+    # The vectorized pass: every score, level and skill count at once
+    matrix = answer_matrix(key, students)
+    correct = matrix == key.correct
+    correct_counts = correct.sum(axis=1)
+    percentages = np.round(correct_counts / total * 100).astype(int)
+    levels = np.searchsorted(LEVEL_CUTOFFS, percentages, side="right") + 1
+    skill_correct = correct.astype(np.int32) @ key.skill_matrix
+    skill_percentages = np.round(skill_correct / key.skill_totals * 100).astype(int)
+    if key.difficulties is not None and len(students):
+        abilities = [
+            {"theta": round(theta, 2), "standard_error": round(se, 2)}
+            for theta, se in zip(*(a.tolist() for a in estimate_abilities(correct, key.difficulties)))
+        ]
+    else:
+        abilities = None
+    feedback_status = np.where(skill_percentages < NEEDS_IMPROVEMENT_BELOW, 1,
+                               np.where(skill_percentages >= STRENGTH_FROM, 2, 0))
+
+    # Plain Python values for building the per-student dicts
+    correct_rows = correct.tolist()
+    answer_rows = matrix.tolist()
+    correct_counts = correct_counts.tolist()
+    percentages = percentages.tolist()
+    levels = levels.tolist()
+    skill_correct = skill_correct.tolist()
+    skill_percentages = skill_percentages.tolist()
+    skill_totals = key.skill_totals.tolist()
+    feedback_status = feedback_status.tolist()
+
+    results = []
+    for row, (student_id, _) in enumerate(students):
+        question_results = [
+            {
+                "question_id": qid,
+                "question": text,
+                "skill": skill,
+                "correct": is_correct,
+                "student_answer": None if answer == UNANSWERED else answer,
+                "correct_answer": correct_answer,
+                "explanation": explanation
+            }
+            for (qid, text, skill, correct_answer, explanation), is_correct, answer
+            in zip(key.question_details, correct_rows[row], answer_rows[row])
+        ]
+        result = {
+            "passage_id": passage_id,
+            "passage_title": passage["title"],
+            "total_questions": total,
+            "correct_count": correct_counts[row],
+            "score_percentage": percentages[row],
+            "achievement_level": f"Level {levels[row]}",
+            "question_results": question_results,
+            "skill_breakdown": {
+                skill: {
+                    "correct": skill_correct[row][col],
+                    "total": skill_totals[col],
+                    "percentage": skill_percentages[row][col]
+                }
+                for col, skill in enumerate(key.skills)
+            },
+            "curriculum_feedback": [
+                dict(key.feedback[col][status])
+                for col, status in enumerate(feedback_status[row]) if status
+            ]
+        }
+        if abilities:
+            result["ability"] = abilities[row]
+        results.append(dict(student_id=student_id, **result))
+
+    return {
+        "passage_id": passage_id,
+        "passage_title": passage["title"],
+        "student_count": len(students),
+        "results": results,
+        "summary": _class_summary(key, correct, percentages, levels)
+    }
+
+
+def _class_summary(key, correct, percentages, levels):
+    """Class-wide averages from the same correctness matrix."""
+    class_size = len(percentages)
+    level_counts = {f"Level {level}": levels.count(level) for level in range(1, 5)}
+    if not class_size:
+        return {"average_percentage": 0, "level_counts": level_counts,
+                "question_percent_correct": {}, "skill_percent_correct": {}}
+    question_rates = np.round(correct.mean(axis=0) * 100).astype(int).tolist()
+    skill_rates = np.round(
+        correct.sum(axis=0) @ key.skill_matrix / (key.skill_totals * class_size) * 100
+    ).astype(int).tolist()
+    return {
+        "average_percentage": round(sum(percentages) / class_size),
+        "level_counts": level_counts,
+        "question_percent_correct": dict(zip(key.question_ids, question_rates)),
+        "skill_percent_correct": dict(zip(key.skills, skill_rates))
+    }
@@ -0,0 +1,186 @@
+"""
+Item Bank Calibration
+Fits Rasch difficulties for every reading question from the response log
+and stores them with the passage data.
+
+Run nightly with `flask calibrate`. The result is written to the calibration
+file, which get_passage_catalog() merges into each question as "difficulty";
+once every question of a passage is calibrated, reading results include the
+student's ability on the common scale.
+
+The command runs in its own process, so it cannot clear the web app's
+cached catalog. Instead the app checks the calibration file's modification
+time every so often between requests and reloads the catalog when the file
+has changed.
+
+Configuration (environment variables):
+    CALIBRATION_CHECK_INTERVAL  Seconds between checks for a new calibration file
+                                (default 60; 0 turns reloading off)
+"""
+
+import os
+import threading
+import time
+
+import numpy as np
+
+from app.assessments import irt
+from app.assessments.adaptive import get_item_bank
+from app.assessments.batch_grading import get_answer_key
+from app.assessments.reading import _passage_summaries, get_passage_catalog
+
+
+# Items answered fewer times than this are left uncalibrated
+MIN_ITEM_RESPONSES = 20
+
+DEFAULT_CHECK_INTERVAL = 60.0
+
+
+def build_response_arrays(records):
+    """
+    Flatten logged responses into (person, item, correct) arrays.
+
+    Responses with a student_id are pooled per student, which is what links
+    passages onto one scale; anonymous responses each count as a separate
+    person. Unanswered questions are treated as missing, and when a student
+    answered the same question more than once the latest answer is used.
+
+    Returns:
+        (persons, items, correct, person_count, item_ids) where item_ids
+        lists (passage_id, question_id) in item index order
+    """
+    catalog = get_passage_catalog()
+    item_ids = []
+    passage_items = {}
+    for passage_id, passage in catalog.items():
+        passage_items[passage_id] = [
+            (question["id"], len(item_ids) + n, question["correct"])
+            for n, question in enumerate(passage["questions"])
+        ]
+        item_ids.extend((passage_id, question["id"]) for question in passage["questions"])
+
+    person_index = {}
+    persons, items, correct = [], [], []
+    for n, (passage_id, student_id, answers) in enumerate(records):
+        questions = passage_items.get(passage_id)
+        if questions is None:
+            continue
+        key = student_id if student_id is not None else ("anonymous", n)
+        person = person_index.setdefault(key, len(person_index))
+        for qid, item, right_answer in questions:
+            answer = answers.get(qid)
+            if answer is not None:
+                persons.append(person)
+                items.append(item)
+                correct.append(answer == right_answer)
+
+    persons = np.array(persons, dtype=np.int64)
+    items = np.array(items, dtype=np.int64)
+    correct = np.array(correct, dtype=np.float64)
+
+    # Keep only each person's latest answer to an item
+    if len(persons):
+        pair = persons * len(item_ids) + items
+        _, last = np.unique(pair[::-1], return_index=True)
+        keep = np.sort(len(pair) - 1 - last)
+        persons, items, correct = persons[keep], items[keep], correct[keep]
+
+    return persons, items, correct, len(person_index), item_ids
+
+
+def calibrate(records, min_item_responses=MIN_ITEM_RESPONSES):
+    """
+    Fit the Rasch model to logged responses.
+
+    Args:
+        records: (passage_id, student_id, answers) tuples from ResponseLog.records()
+        min_item_responses: Responses an item needs to be calibrated
+
+    Returns:
+        Calibration dict ready for irt.save_calibration()
+    """
+    started = time.perf_counter()
+    persons, items, correct, person_count, item_ids = build_response_arrays(records)
+    fit = irt.fit_rasch(persons, items, correct, person_count, len(item_ids))
+
+    calibrated = {}
+    for index, (passage_id, question_id) in enumerate(item_ids):
+        count = int(fit.item_counts[index])
+        if count < min_item_responses or np.isnan(fit.difficulties[index]):
+            continue
+        calibrated.setdefault(passage_id, {})[question_id] = {
+            "difficulty": round(float(fit.difficulties[index]), 3),
+            "standard_error": round(float(fit.standard_errors[index]), 3),
+            "responses": count
+        }
+
+    return {
+        "model": "rasch",
+        "method": "jml",
+        "fitted_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "response_count": int(len(correct)),
+        "person_count": person_count,
+        "iterations": fit.iterations,
+        "converged": fit.converged,
+        "seconds": round(time.perf_counter() - started, 3),
+        "items": calibrated
+    }
+
+
+def reload_catalog():
+    """Drop the cached passage catalog so the next request merges the new calibration."""
+    get_passage_catalog.cache_clear()
+    _passage_summaries.cache_clear()
+    get_answer_key.cache_clear()
+    get_item_bank.cache_clear()
+
+
+def _calibration_mtime():
+    try:
+        return os.stat(os.environ.get('CALIBRATION_PATH', irt.DEFAULT_CALIBRATION_PATH)).st_mtime_ns
+    except OSError:
+        return None
+
+
+_watch = {"mtime": None, "next_check": 0.0, "interval": DEFAULT_CHECK_INTERVAL}
+_watch_lock = threading.Lock()
+
+
+def reload_if_changed():
+    """
+    Reload the catalog if the calibration file changed since it was last seen.
+    Checks the file at most once per interval; other calls return at once.
+
+    Returns:
+        True if the catalog was reloaded
+    """
+    now = time.monotonic()
+    if now < _watch["next_check"]:
+        return False
+    # Only one request does the check; the rest carry on with the current catalog
+    if not _watch_lock.acquire(blocking=False):
+        return False
+    try:
+        _watch["next_check"] = now + _watch["interval"]
+        mtime = _calibration_mtime()
+        if mtime == _watch["mtime"]:
+            return False
+        _watch["mtime"] = mtime
+        reload_catalog()
+        print("Item calibration changed; reloaded the passage catalog")
+        return True
+    finally:
+        _watch_lock.release()
+
+
+def init_calibration_reload(app):
+    """Have the app pick up a new calibration file without a restart."""
+    interval = float(os.environ.get('CALIBRATION_CHECK_INTERVAL', DEFAULT_CHECK_INTERVAL))
+    if interval <= 0:
+        return
+    # The catalog is built lazily, after this, so it reads this file or a newer one
+    _watch.update(mtime=_calibration_mtime(), next_check=time.monotonic() + interval, interval=interval)
+
+    @app.before_request
+    def check_calibration():
+        reload_if_changed()
@@ -0,0 +1,126 @@
+"""
+AI Evaluation Cassettes
+Real evaluation calls recorded once and replayed later without the network.
+
+A cassette is a JSON Lines file, gzip-compressed when its name ends in .gz,
+with one line per recorded call:
+
+    {"key": "<request hash>", "text": "<response text>",
+     "usage": [input, cache_read, cache_creation, output],
+     "latency": 3.412, "first_token": 0.811,
+     "student_text": "...", "prompt_info": {...}}
+
+"key" is EvaluationRequest.key(), so lookups need no request parsing, and a
+request recorded twice keeps its latest response. "first_token" is only set
+for streamed calls. The student text and prompt details are kept so a
+cassette can be re-run on its own (`flask ai-cassette replay`).
+
+Lines are appended as calls complete (each append is a separate gzip member,
+which readers handle transparently), so a recording interrupted part-way
+keeps everything recorded before the interruption.
+"""
+
+import gzip
+import json
+import os
+import threading
+from types import SimpleNamespace
+
+
+USAGE_FIELDS = ("input_tokens", "cache_read_input_tokens",
+                "cache_creation_input_tokens", "output_tokens")
+
+
+def _open(path, mode):
+    if path.endswith('.gz'):
+        return gzip.open(path, mode + 't', encoding='utf-8')
+    return open(path, mode, encoding='utf-8')
+
+
+def pack_usage(usage):
+    """Usage block (API object or dict) as a compact list, or None."""
+    if usage is None:
+        return None
+    if isinstance(usage, dict):
+        return [usage.get(field) or 0 for field in USAGE_FIELDS]
+    return [getattr(usage, field, 0) or 0 for field in USAGE_FIELDS]
+
+
+def unpack_usage(packed):
+    """Inverse of pack_usage, shaped like the API's usage object."""
+    if packed is None:
+        return None
+    return SimpleNamespace(**dict(zip(USAGE_FIELDS, packed)))
+
+
+class Cassette:
+    """Recorded evaluation calls, indexed by request hash."""
+
+    def __init__(self, path):
+        self.path = path
+        self.entries = {}
+        self._lock = threading.Lock()
+        if os.path.exists(path):
+            with _open(path, 'r') as f:
+                for line in f:
+                    if line.strip():
+                        entry = json.loads(line)
+                        self.entries[entry["key"]] = entry
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __contains__(self, key):
+        return key in self.entries
+
+    def get(self, key):
+        """Return the recorded entry for a request hash, or None."""
+        return self.entries.get(key)
+
+    def record(self, key, request, text, usage, latency, first_token=None):
+        """
+        Add one call to the cassette and append it to the file.
+
+        Args:
+            key: EvaluationRequest.key() of the request
+            request: The EvaluationRequest
+            text: Response text
+            usage: Usage block from the response, or None
+            latency: Seconds the call took
+            first_token: Seconds to the first streamed text, for streamed calls
+        """
+        entry = {
+            "key": key,
+            "text": text,
+            "usage": pack_usage(usage),
+            "latency": round(latency, 3),
+            "first_token": None if first_token is None else round(first_token, 3),
+            "student_text": request.student_text,
+            "prompt_info": dict(request.prompt_info)
+        }
+        line = json.dumps(entry, ensure_ascii=False, separators=(',', ':')) + "\n"
+        with self._lock:
+            self.entries[key] = entry
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            with _open(self.path, 'a') as f:
+                f.write(line)
+
+    def summary(self):
+        """Counts, file size and recorded latencies."""
+        latencies = sorted(entry["latency"] for entry in self.entries.values())
+        summary = {
+            "path": self.path,
+            "entries": len(latencies),
+            "streamed": sum(1 for entry in self.entries.values() if entry.get("first_token") is not None),
+            "bytes": os.path.getsize(self.path) if os.path.exists(self.path) else 0
+        }
+        if latencies:
+            summary["latency_seconds"] = {
+                "mean": round(sum(latencies) / len(latencies), 3),
+                "p50": latencies[len(latencies) // 2],
+                "p95": latencies[int(len(latencies) * 0.95)],
+                "max": latencies[-1]
+            }
+        return summary
@@ -0,0 +1,38 @@
+"""
+Read-only Content Catalogs
+Helpers for building passage and prompt catalogs once per process.
+
+The passage and prompt banks are large literals that never change while the
+app is running, so they are built a single time and shared by every request
+as read-only mappings and tuples.
+"""
+
+from types import MappingProxyType
+
+
+def freeze(value):
+    """
+    Return a deeply read-only copy of a catalog value.
+
+    Dicts become MappingProxyType views and lists become tuples. Strings,
+    numbers and other immutable values are returned unchanged.
+    """
+    if isinstance(value, (dict, MappingProxyType)):
+        return MappingProxyType({key: freeze(item) for key, item in value.items()})
+    if isinstance(value, (list, tuple)):
+        return tuple(freeze(item) for item in value)
+    return value
+
+
+def thaw(value):
+    """
+    Return a plain, mutable copy of a frozen catalog value.
+
+    Use this before handing catalog data to code that expects real dicts and
+    lists, such as JSON serialization.
+    """
+    if isinstance(value, (dict, MappingProxyType)):
+        return {key: thaw(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [thaw(item) for item in value]
+    return value
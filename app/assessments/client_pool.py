@@ -0,0 +1,134 @@
+"""
+Shared Anthropic Client Pool
+Keeps one long-lived Claude API client per process so writing submissions
+reuse warm HTTP connections instead of opening a new pool (and paying a new
+TLS handshake) on every request.
+
+Configuration (environment variables):
+    ANTHROPIC_POOL_SIZE         Maximum open connections per client (default 10)
+    ANTHROPIC_KEEPALIVE_EXPIRY  Seconds an idle connection is kept open (default 30)
+"""
+
+import os
+import threading
+
+try:
+    import anthropic
+    HAS_ANTHROPIC = True
+except ImportError:
+    HAS_ANTHROPIC = False
+
+
+DEFAULT_POOL_SIZE = 10
+DEFAULT_KEEPALIVE_EXPIRY = 30.0
+
+
+class ConnectionStats:
+    """Thread-safe counters for new versus reused HTTP connections."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.new_connections = 0
+        self.tls_handshakes = 0
+
+    def trace(self, event_name, info):
+        """HTTP transport trace callback; counts connects and requests."""
+        if event_name == "connection.connect_tcp.started":
+            with self._lock:
+                self.new_connections += 1
+        elif event_name == "connection.start_tls.started":
+            with self._lock:
+                self.tls_handshakes += 1
+        elif event_name.endswith("send_request_headers.started"):
+            with self._lock:
+                self.requests += 1
+
+    def attach(self, request):
+        """Request event hook that turns on tracing for one request."""
+        request.extensions["trace"] = self.trace
+
+    def snapshot(self):
+        """Return the current counters as a plain dict."""
+        with self._lock:
+            requests = self.requests
+            new_connections = self.new_connections
+            tls_handshakes = self.tls_handshakes
+        reused = max(0, requests - new_connections)
+        return {
+            "requests": requests,
+            "new_connections": new_connections,
+            "reused_connections": reused,
+            "tls_handshakes": tls_handshakes,
+            "reuse_ratio": round(reused / requests, 3) if requests else 0.0
+        }
+
+
+_lock = threading.Lock()
+_clients = {}
+_stats = ConnectionStats()
+
+
+def _pool_size():
+    return int(os.environ.get('ANTHROPIC_POOL_SIZE', DEFAULT_POOL_SIZE))
+
+
+def _keepalive_expiry():
+    return float(os.environ.get('ANTHROPIC_KEEPALIVE_EXPIRY', DEFAULT_KEEPALIVE_EXPIRY))
+
+
+def _build_client(api_key, base_url=None):
+    """Create a Claude client backed by a keep-alive connection pool."""
+    pool_size = _pool_size()
+    # The SDK re-exports its HTTP library's Limits type via its defaults
+    limits_type = type(anthropic.DEFAULT_CONNECTION_LIMITS)
+    http_client = anthropic.DefaultHttpxClient(
+        limits=limits_type(
+            max_connections=pool_size,
+            max_keepalive_connections=pool_size,
+            keepalive_expiry=_keepalive_expiry()
+        ),
+        event_hooks={"request": [_stats.attach]}
+    )
+    # Retries and timeouts are handled per call by AIEvaluator
+    return anthropic.Anthropic(api_key=api_key, base_url=base_url, http_client=http_client, max_retries=0)
+
+
+def get_client(api_key, base_url=None):
+    """
+    Return the shared Claude client for an API key and endpoint.
+
+    The client is created on first use and then reused by every thread;
+    the underlying HTTP client is safe to share between threads.
+
+    Args:
+        api_key: Anthropic API key
+        base_url: Optional API endpoint, e.g. a local stub server; the SDK
+            default (or ANTHROPIC_BASE_URL) when omitted
+
+    Returns:
+        An anthropic.Anthropic client, or None if the SDK or key is missing
+    """
+    if not HAS_ANTHROPIC or not api_key:
+        return None
+
+    key = (api_key, base_url)
+    client = _clients.get(key)
+    if client is not None:
+        return client
+
+    with _lock:
+        client = _clients.get(key)
+        if client is None:
+            client = _build_client(api_key, base_url)
+            _clients[key] = client
+    return client
+
+
+def pool_stats():
+    """Return connection reuse counters and pool settings for monitoring."""
+    stats = _stats.snapshot()
+    stats["clients"] = len(_clients)
+    stats["pool_size"] = _pool_size()
+    stats["keepalive_expiry"] = _keepalive_expiry()
+    return stats
@@ -0,0 +1,185 @@
+"""
+AI Evaluation Cache
+Content-addressed, on-disk cache of Claude writing evaluations.
+
+A resubmitted essay (or a teacher re-running a calibration sample) hashes to
+the same key, so it is answered from SQLite in milliseconds instead of making
+another paid API call. Keys cover the whitespace-normalized essay, the prompt
+details, the model name and a fingerprint of the evaluation prompt, so
+changing the prompt template automatically retires old entries.
+
+Configuration (environment variables):
+    EVAL_CACHE_ENABLED      Set to 0 to turn the cache off (default 1)
+    EVAL_CACHE_PATH         SQLite file (default instance/eval_cache.sqlite3)
+    EVAL_CACHE_MAX_ENTRIES  Size cap; least recently used entries go first (default 5000)
+    EVAL_CACHE_TTL          Seconds an entry stays valid (default 30 days)
+"""
+
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+
+
+INSTANCE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), 'instance')
+
+DEFAULT_CACHE_PATH = os.path.join(INSTANCE_DIR, 'eval_cache.sqlite3')
+DEFAULT_MAX_ENTRIES = 5000
+DEFAULT_TTL_SECONDS = 30 * 24 * 60 * 60
+
+_PARAGRAPH_BREAK = re.compile(r'\n\s*\n')
+
+
+def normalize_text(text):
+    """
+    Collapse whitespace so trivially different resubmissions share a key.
+
+    Paragraph breaks are kept because they change how the essay is judged;
+    all other runs of whitespace become a single space.
+    """
+    paragraphs = (' '.join(p.split()) for p in _PARAGRAPH_BREAK.split(text.strip()))
+    return '\n\n'.join(p for p in paragraphs if p)
+
+
+def make_cache_key(student_text, prompt_info, model, prompt_version):
+    """Return the content hash that identifies one evaluation request."""
+    payload = json.dumps({
+        "text": normalize_text(student_text),
+        "prompt": prompt_info,
+        "model": model,
+        "prompt_version": prompt_version
+    }, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class EvaluationCache:
+    """SQLite-backed evaluation cache with LRU and TTL eviction."""
+
+    def __init__(self, path=DEFAULT_CACHE_PATH, max_entries=DEFAULT_MAX_ENTRIES,
+                 ttl_seconds=DEFAULT_TTL_SECONDS):
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+
+        if path != ':memory:':
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._conn = sqlite3.connect(path, timeout=5, check_same_thread=False)
+        with self._lock:
+            if path != ':memory:':
+                self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS evaluations (
+                    key TEXT PRIMARY KEY,
+                    prompt_version TEXT NOT NULL,
+                    evaluation TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    last_access REAL NOT NULL
+                )
+            """)
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_evaluations_last_access ON evaluations (last_access)"
+            )
+            self._conn.commit()
+
+    def get(self, key):
+        """Return the cached evaluation for key, or None on a miss."""
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT evaluation, created_at FROM evaluations WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            evaluation, created_at = row
+            if now - created_at > self.ttl_seconds:
+                self._conn.execute("DELETE FROM evaluations WHERE key = ?", (key,))
+                self._conn.commit()
+                self.misses += 1
+                self.evictions += 1
+                return None
+            self._conn.execute("UPDATE evaluations SET last_access = ? WHERE key = ?", (now, key))
+            self._conn.commit()
+            self.hits += 1
+        return json.loads(evaluation)
+
+    def put(self, key, evaluation, prompt_version):
+        """Store an evaluation and evict the least recently used overflow."""
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO evaluations VALUES (?, ?, ?, ?, ?)",
+                (key, prompt_version, json.dumps(evaluation), now, now)
+            )
+            self._evict(now)
+            self._conn.commit()
+
+    def _evict(self, now):
+        """Drop expired entries, then trim to max_entries by last access."""
+        expired = self._conn.execute(
+            "DELETE FROM evaluations WHERE created_at < ?", (now - self.ttl_seconds,)
+        ).rowcount
+        overflow = self._conn.execute(
+            "DELETE FROM evaluations WHERE key IN ("
+            "  SELECT key FROM evaluations ORDER BY last_access DESC LIMIT -1 OFFSET ?"
+            ")", (self.max_entries,)
+        ).rowcount
+        self.evictions += expired + overflow
+
+    def invalidate(self, prompt_version=None):
+        """
+        Remove cached evaluations.
+
+        Args:
+            prompt_version: If given, remove only entries made with a
+                different prompt fingerprint; otherwise remove everything.
+
+        Returns:
+            Number of entries removed
+        """
+        with self._lock:
+            if prompt_version is None:
+                removed = self._conn.execute("DELETE FROM evaluations").rowcount
+            else:
+                removed = self._conn.execute(
+                    "DELETE FROM evaluations WHERE prompt_version != ?", (prompt_version,)
+                ).rowcount
+            self._conn.commit()
+        return removed
+
+    def stats(self):
+        """Return hit/miss counters and current size."""
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM evaluations").fetchone()[0]
+        lookups = self.hits + self.misses
+        return {
+            "entries": entries,
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl_seconds,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_ratio": round(self.hits / lookups, 3) if lookups else 0.0
+        }
+
+
+def cache_from_env():
+    """Build the evaluation cache from environment settings, or None if disabled."""
+    if os.environ.get('EVAL_CACHE_ENABLED', '1') in ('0', 'false', 'False', ''):
+        return None
+    try:
+        return EvaluationCache(
+            path=os.environ.get('EVAL_CACHE_PATH', DEFAULT_CACHE_PATH),
+            max_entries=int(os.environ.get('EVAL_CACHE_MAX_ENTRIES', DEFAULT_MAX_ENTRIES)),
+            ttl_seconds=float(os.environ.get('EVAL_CACHE_TTL', DEFAULT_TTL_SECONDS))
+        )
+    except (OSError, sqlite3.Error) as e:
+        print(f"Evaluation cache unavailable: {e}")
+        return None
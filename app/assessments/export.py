@@ -0,0 +1,152 @@
+"""
+Results Export
+Saved reading and writing results as a CSV or Excel spreadsheet, one row
+per attempt, for report cards.
+
+Rows are read from the results store a chunk at a time and written out as
+they arrive, so exporting a whole school's history uses the same memory as
+exporting one class. CSV is sent as it is produced (chunked transfer).
+Excel files are zip archives and can't be sent until they are finished, so
+openpyxl's write-only mode streams the rows into a temporary file on disk,
+which is then sent in blocks and deleted.
+
+Besides the attempt's score and level, each row has one column per reading
+skill (percent correct on that skill's questions, blank if the test didn't
+cover it) and one per writing rubric category (level 1-4).
+
+Excel export needs the optional openpyxl package (pip install openpyxl).
+"""
+
+import csv
+import io
+import tempfile
+import time
+
+from app.assessments.knowledge_tracing import catalog_skills
+from app.assessments.reading import ReadingAssessment
+from app.assessments.rollups import observations
+from app.assessments.writing import CATEGORY_NAMES, WritingAssessment
+
+try:
+    from openpyxl import Workbook
+    HAS_OPENPYXL = True
+except ImportError:
+    HAS_OPENPYXL = False
+
+
+BASE_COLUMNS = ("Attempt", "Date", "Student", "Class", "Assessment", "Item", "Title", "Score %", "Level")
+# Rows written per chunk sent
+CSV_CHUNK_ROWS = 500
+FILE_BLOCK_SIZE = 64 * 1024
+# Text starting with these is read as a formula by spreadsheet programs
+FORMULA_PREFIXES = ("=", "+", "-", "@", "\t", "\r")
+
+
+def item_titles():
+    """Passage and prompt titles by id, for listing attempts."""
+    titles = {passage["id"]: passage["title"] for passage in ReadingAssessment().get_available_passages()}
+    titles.update((prompt["id"], prompt["title"]) for prompt in WritingAssessment().get_available_prompts())
+    titles["adaptive"] = "Adaptive Reading Test"
+    return titles
+
+
+class ExportColumns:
+    """The spreadsheet layout: fixed columns, then skills, then rubric categories."""
+
+    def __init__(self, skills=None, categories=None):
+        self.skills = list(catalog_skills() if skills is None else skills)
+        self.categories = list(CATEGORY_NAMES if categories is None else categories)
+        self.headers = (list(BASE_COLUMNS)
+                        + [f"{skill} %" for skill in self.skills]
+                        + [f"{CATEGORY_NAMES.get(key, key)} level" for key in self.categories])
+        offset = len(BASE_COLUMNS)
+        self.position = {("skill", skill): offset + n for n, skill in enumerate(self.skills)}
+        offset += len(self.skills)
+        self.position.update((("category", key), offset + n) for n, key in enumerate(self.categories))
+
+    def row(self, attempt, titles):
+        """One spreadsheet row for an attempt from ResultsStore.replay()."""
+        kind = attempt["kind"]
+        row = [
+            attempt["id"],
+            time.strftime("%Y-%m-%d %H:%M", time.localtime(attempt["created_at"])),
+            attempt["student_id"] or "",
+            attempt["class_id"] or "",
+            kind,
+            attempt["item_id"],
+            titles.get(attempt["item_id"], attempt["item_id"]),
+            attempt["score"],
+            attempt["level"]
+        ]
+        row.extend([None] * (len(self.headers) - len(row)))
+        for dimension, name, value, _, _ in observations(kind, attempt["result"]):
+            column = self.position.get((dimension, name))
+            if column is not None:
+                row[column] = round(value) if dimension == "skill" else int(value)
+        return row
+
+
+def _csv_cell(value):
+    """
+    A value as written to CSV.
+
+    Text that a spreadsheet would run as a formula (a student or class id
+    like "=HYPERLINK(...)") gets a leading apostrophe, so it shows as typed.
+    """
+    if value is None:
+        return ""
+    if isinstance(value, str) and value.startswith(FORMULA_PREFIXES):
+        return "'" + value
+    return value
+
+
+def iter_csv(attempts, columns, titles, chunk_rows=CSV_CHUNK_ROWS):
+    """
+    Yield a CSV file in pieces of about chunk_rows rows.
+
+    Args:
+        attempts: Iterable of attempts, e.g. ResultsStore.replay()
+        columns: ExportColumns
+        titles: Passage and prompt titles by id
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    # The byte-order mark makes Excel read the file as UTF-8
+    buffer.write("\ufeff")
+    writer.writerow(columns.headers)
+    pending = 0
+    for attempt in attempts:
+        writer.writerow([_csv_cell(value) for value in columns.row(attempt, titles)])
+        pending += 1
+        if pending >= chunk_rows:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+            pending = 0
+    yield buffer.getvalue()
+
+
+def iter_xlsx(attempts, columns, titles, block_size=FILE_BLOCK_SIZE):
+    """
+    Yield an Excel workbook in blocks, written through a temporary file.
+
+    Args:
+        attempts: Iterable of attempts, e.g. ResultsStore.replay()
+        columns: ExportColumns
+        titles: Passage and prompt titles by id
+    """
+    if not HAS_OPENPYXL:
+        raise RuntimeError("Excel export needs openpyxl (pip install openpyxl)")
+    with tempfile.TemporaryFile() as output:
+        workbook = Workbook(write_only=True)
+        sheet = workbook.create_sheet("Results")
+        sheet.append(columns.headers)
+        for attempt in attempts:
+            sheet.append(columns.row(attempt, titles))
+        workbook.save(output)
+        output.seek(0)
+        while True:
+            block = output.read(block_size)
+            if not block:
+                return
+            yield block
@@ -0,0 +1,279 @@
+"""
+Rasch Model
+Item response theory for the reading item bank: fitting item difficulties
+from logged responses and scoring students on the common ability scale.
+
+Under the Rasch model the chance that a student of ability theta answers an
+item of difficulty b correctly is 1 / (1 + exp(b - theta)). Abilities and
+difficulties share one logit scale, so scores from passages of different
+difficulty can be compared once the items have been calibrated together.
+
+Responses are handled as flat (person, item, correct) arrays rather than a
+dense students x items matrix, so every Newton step is a handful of NumPy
+operations over the responses actually given and memory grows with the
+number of answers, not students x bank size.
+
+Configuration (environment variables):
+    CALIBRATION_PATH  JSON file of calibrated difficulties
+                      (default instance/item_calibration.json)
+"""
+
+import json
+import os
+
+import numpy as np
+
+from app.assessments.evaluation_cache import INSTANCE_DIR
+
+
+DEFAULT_CALIBRATION_PATH = os.path.join(INSTANCE_DIR, 'item_calibration.json')
+
+# Raw scores of 0 or all-correct have no finite estimate; they are nudged
+# inwards by this many points, a common convention for Rasch scoring
+EXTREME_SCORE_ADJUSTMENT = 0.3
+
+# Largest change, in logits, allowed in a single Newton step
+MAX_STEP = 1.0
+
+
+def _expit(x):
+    return 1.0 / (1.0 + np.exp(-x))
+
+
+def _solve_for_scores(owner, offsets, targets, size, start=None, iterations=50, tolerance=1e-6):
+    """
+    Solve sum_j expit(u[owner_j] + offsets_j) = targets[k] for every k at once.
+
+    Each row of a response list belongs to one owner (a person or an item);
+    this finds the location u for every owner whose expected score matches
+    its target score, with clipped Newton steps.
+
+    Returns:
+        (u, information) arrays of length size
+    """
+    counts = np.bincount(owner, minlength=size).astype(np.float64)
+    if start is None:
+        proportion = np.divide(targets, counts, out=np.full(size, 0.5), where=counts > 0)
+        mean_offset = np.divide(np.bincount(owner, offsets, minlength=size), counts,
+                                out=np.zeros(size), where=counts > 0)
+        u = np.log(proportion / (1 - proportion)) - mean_offset
+    else:
+        u = start.astype(np.float64)
+
+    for _ in range(iterations):
+        p = _expit(u[owner] + offsets)
+        expected = np.bincount(owner, p, minlength=size)
+        information = np.bincount(owner, p * (1 - p), minlength=size)
+        step = np.divide(targets - expected, information, out=np.zeros(size), where=information > 0)
+        np.clip(step, -MAX_STEP, MAX_STEP, out=step)
+        u += step
+        if np.abs(step).max(initial=0.0) < tolerance:
+            break
+
+    p = _expit(u[owner] + offsets)
+    return u, np.bincount(owner, p * (1 - p), minlength=size)
+
+
+def _adjusted_scores(raw, counts):
+    """Move zero and perfect raw scores inwards so they have finite estimates."""
+    return np.clip(raw, EXTREME_SCORE_ADJUSTMENT, np.maximum(counts - EXTREME_SCORE_ADJUSTMENT,
+                                                             EXTREME_SCORE_ADJUSTMENT))
+
+
+class RaschFit:
+    """Result of a Rasch calibration."""
+
+    def __init__(self, difficulties, standard_errors, item_counts, person_count,
+                 iterations, converged):
+        self.difficulties = difficulties
+        self.standard_errors = standard_errors
+        self.item_counts = item_counts
+        self.person_count = person_count
+        self.iterations = iterations
+        self.converged = converged
+
+
+def fit_rasch(persons, items, correct, person_count, item_count,
+              max_iterations=200, tolerance=1e-4):
+    """
+    Fit item difficulties by joint maximum likelihood (JML).
+
+    Persons and items with extreme scores (all right or all wrong) carry no
+    information about the other side and are left out of the joint fit;
+    extreme items are placed afterwards against the fitted abilities using
+    adjusted scores. Difficulties are centred on zero and multiplied by the
+    usual (L - 1) / L correction for JML's bias on short tests.
+
+    Passages are only placed on one scale if some students answered items
+    from more than one of them (adaptive tests, or students identified by
+    student_id across passages); unlinked passages keep the centring of
+    their starting values.
+
+    Args:
+        persons: Person index of each response
+        items: Item index of each response
+        correct: 1 for a correct response, 0 otherwise
+        person_count: Number of persons
+        item_count: Number of items
+
+    Returns:
+        RaschFit; items with no responses get NaN difficulty
+    """
+    persons = np.asarray(persons, dtype=np.int64)
+    items = np.asarray(items, dtype=np.int64)
+    correct = np.asarray(correct, dtype=np.float64)
+
+    item_counts = np.bincount(items, minlength=item_count)
+
+    # Drop extreme persons and items until none remain; removing one can
+    # make another extreme
+    active = np.ones(len(correct), dtype=bool)
+    while True:
+        p_n = np.bincount(persons[active], minlength=person_count)
+        p_r = np.bincount(persons[active], correct[active], minlength=person_count)
+        i_n = np.bincount(items[active], minlength=item_count)
+        i_r = np.bincount(items[active], correct[active], minlength=item_count)
+        person_ok = (p_r > 0) & (p_r < p_n)
+        item_ok = (i_r > 0) & (i_r < i_n)
+        still_active = active & person_ok[persons] & item_ok[items]
+        if still_active.sum() == active.sum():
+            break
+        active = still_active
+
+    core_persons, core_items, core_correct = persons[active], items[active], correct[active]
+    person_scores = np.bincount(core_persons, core_correct, minlength=person_count)
+    item_scores = np.bincount(core_items, core_correct, minlength=item_count)
+
+    theta = np.zeros(person_count)
+    difficulty = np.zeros(item_count)
+    iterations = 0
+    converged = not active.any()
+    for iterations in range(1, max_iterations + 1):
+        # One Newton step for abilities, then one for difficulties (as -b)
+        theta, _ = _solve_for_scores(core_persons, -difficulty[core_items], person_scores,
+                                     person_count, start=theta, iterations=1)
+        easiness, _ = _solve_for_scores(core_items, theta[core_persons], item_scores,
+                                        item_count, start=-difficulty, iterations=1)
+        new_difficulty = -easiness
+        if item_ok.any():
+            new_difficulty[item_ok] -= new_difficulty[item_ok].mean()
+        change = np.abs(new_difficulty - difficulty)[item_ok].max(initial=0.0)
+        difficulty = new_difficulty
+        if change < tolerance:
+            converged = True
+            break
+
+    # JML overstates the spread of difficulties on short tests
+    answered = np.bincount(core_persons, minlength=person_count)
+    mean_length = answered[answered > 0].mean() if answered.any() else 0
+    if mean_length > 1:
+        difficulty[item_ok] *= (mean_length - 1) / mean_length
+
+    # Place every person (extreme ones via adjusted scores), then extreme items
+    fitted_rows = item_ok[items]
+    raw = np.bincount(persons[fitted_rows], correct[fitted_rows], minlength=person_count)
+    counts = np.bincount(persons[fitted_rows], minlength=person_count)
+    theta, _ = _solve_for_scores(persons[fitted_rows], -difficulty[items[fitted_rows]],
+                                 _adjusted_scores(raw, counts), person_count)
+
+    extreme_items = ~item_ok & (item_counts > 0)
+    if extreme_items.any():
+        rows = extreme_items[items] & (np.bincount(persons[fitted_rows], minlength=person_count) > 0)[persons]
+        raw = np.bincount(items[rows], correct[rows], minlength=item_count)
+        counts = np.bincount(items[rows], minlength=item_count)
+        easiness, _ = _solve_for_scores(items[rows], theta[persons[rows]],
+                                        _adjusted_scores(raw, counts), item_count)
+        placed = extreme_items & (counts > 0)
+        difficulty[placed] = -easiness[placed]
+
+    # Standard errors from the information each item collected
+    p = _expit(theta[persons] - difficulty[items])
+    information = np.bincount(items, p * (1 - p), minlength=item_count)
+    with np.errstate(divide='ignore'):
+        standard_errors = 1 / np.sqrt(information)
+
+    unanswered = item_counts == 0
+    difficulty[unanswered] = np.nan
+    standard_errors[unanswered] = np.nan
+    return RaschFit(difficulty, standard_errors, item_counts, person_count, iterations, converged)
+
+
+def estimate_abilities(scored, difficulties):
+    """
+    Estimate abilities for students who all took the same calibrated items.
+
+    Args:
+        scored: students x items array of 0/1 (unanswered counts as 0)
+        difficulties: Difficulty of each item
+
+    Returns:
+        (theta, standard_error) arrays, one value per student
+    """
+    scored = np.asarray(scored, dtype=np.float64)
+    difficulties = np.asarray(difficulties, dtype=np.float64)
+    students, length = scored.shape
+    owner = np.repeat(np.arange(students), length)
+    offsets = np.tile(-difficulties, students)
+    targets = _adjusted_scores(scored.sum(axis=1), np.full(students, float(length)))
+    # A fixed number of steps (no early exit) gives each student the same
+    # estimate whether scored alone or with a whole class
+    theta, information = _solve_for_scores(owner, offsets, targets, students,
+                                           iterations=25, tolerance=0.0)
+    return theta, 1 / np.sqrt(information)
+
+
+def ability_estimate(correct_flags, difficulties):
+    """Return {"theta", "standard_error"} for one student's right/wrong answers."""
+    theta, standard_error = estimate_abilities([correct_flags], difficulties)
+    return {"theta": round(float(theta[0]), 2), "standard_error": round(float(standard_error[0]), 2)}
+
+
+def load_calibration(path=None):
+    """
+    Read the calibration file.
+
+    Returns:
+        The calibration dict, or None if there is no usable file
+    """
+    path = path or os.environ.get('CALIBRATION_PATH', DEFAULT_CALIBRATION_PATH)
+    try:
+        with open(path, encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError) as e:
+        print(f"Could not read item calibration {path}: {e}")
+        return None
+
+
+def save_calibration(calibration, path=None):
+    """Write the calibration file atomically, so readers never see half a file."""
+    path = path or os.environ.get('CALIBRATION_PATH', DEFAULT_CALIBRATION_PATH)
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    temporary = f"{path}.tmp"
+    with open(temporary, 'w', encoding='utf-8') as f:
+        json.dump(calibration, f, indent=2)
+    os.replace(temporary, path)
+    return path
+
+
+def apply_calibration(passages, calibration):
+    """
+    Store calibrated difficulties next to each question in the passage data.
+
+    Adds "difficulty" and "difficulty_se" to every question the calibration
+    covers; other questions are left as they are.
+    """
+    if not calibration:
+        return passages
+    items = calibration.get("items", {})
+    for passage_id, passage in passages.items():
+        calibrated = items.get(passage_id, {})
+        for question in passage["questions"]:
+            entry = calibrated.get(question["id"])
+            if entry and entry.get("difficulty") is not None:
+                question["difficulty"] = entry["difficulty"]
+                question["difficulty_se"] = entry.get("standard_error")
+    return passages
@@ -0,0 +1,180 @@
+"""
+Item Analysis
+Classical test statistics for every reading question, computed from the
+response log.
+
+For each passage the logged answers become a students x questions matrix
+(the same one batch grading uses). All statistics are vectorized over that
+matrix, so a passage with 100,000 responses is analysed in well under a
+second:
+
+- p-value: share of students answering correctly (item difficulty)
+- point-biserial: correlation between getting the item right and the score
+  on the rest of the passage (item discrimination)
+- option frequencies, with each distractor's own point-biserial, to spot
+  options that attract strong students or that nobody picks
+- Cronbach's alpha: internal consistency of the passage as a whole
+"""
+
+import numpy as np
+
+from app.assessments.batch_grading import UNANSWERED, answer_matrix, get_answer_key
+from app.assessments.reading import get_passage_catalog
+
+
+# Flag thresholds
+TOO_EASY = 0.90
+TOO_HARD = 0.30
+LOW_DISCRIMINATION = 0.20
+UNUSED_DISTRACTOR = 0.05
+
+# Below this many responses the statistics are reported but marked unstable
+MIN_STABLE_RESPONSES = 30
+
+
+def _column_correlations(x, y):
+    """Pearson correlation of each column of x with the same column of y (NaN if constant)."""
+    if not len(x):
+        return np.full(x.shape[1], np.nan)
+    x = x - x.mean(axis=0)
+    y = y - y.mean(axis=0)
+    denominator = np.sqrt((x * x).sum(axis=0) * (y * y).sum(axis=0))
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return (x * y).sum(axis=0) / denominator
+
+
+def _rounded(value, digits=3):
+    """Round a NumPy scalar for JSON, turning NaN into None."""
+    value = float(value)
+    return None if np.isnan(value) else round(value, digits)
+
+
+def cronbach_alpha(scored):
+    """
+    Cronbach's alpha for a students x items matrix of 0/1 scores.
+
+    Returns:
+        Alpha as a float, or NaN with fewer than two items or no score variance
+    """
+    items = scored.shape[1]
+    if items < 2 or scored.shape[0] < 2:
+        return float('nan')
+    total_variance = scored.sum(axis=1).var()
+    if not total_variance:
+        return float('nan')
+    return items / (items - 1) * (1 - scored.var(axis=0).sum() / total_variance)
+
+
+def analyze_passage(passage_id, responses):
+    """
+    Compute item statistics for one passage.
+
+    Args:
+        passage_id: ID of the passage
+        responses: List of answer dicts (question_id -> option index)
+
+    Returns:
+        Dict of passage-level and per-question statistics, or None if the
+        passage does not exist
+    """
+    key = get_answer_key(passage_id)
+    if key is None:
+        return None
+    passage = get_passage_catalog()[passage_id]
+    questions = passage["questions"]
+    option_count = max(len(q["options"]) for q in questions)
+    count = len(responses)
+
+    matrix = answer_matrix(key, [(None, answers) for answers in responses])
+    scored = (matrix == key.correct).astype(np.float64)
+    totals = scored.sum(axis=1)
+    # Item-rest scores keep an item from correlating with itself
+    rest = totals[:, None] - scored
+
+    if count:
+        p_values = scored.mean(axis=0)
+        omitted = (matrix == UNANSWERED).mean(axis=0)
+    else:
+        p_values = omitted = np.full(len(questions), np.nan)
+    discrimination = _column_correlations(scored, rest)
+
+    # chosen[:, q, k] is 1 where the student picked option k on question q
+    chosen = (matrix[:, :, None] == np.arange(option_count)).astype(np.float64)
+    option_rates = chosen.mean(axis=0) if count else np.full((len(questions), option_count), np.nan)
+    option_discrimination = _column_correlations(
+        chosen.reshape(count, len(questions) * option_count), np.repeat(rest, option_count, axis=1)
+    ).reshape(len(questions), option_count)
+
+    items = []
+    for q, question in enumerate(questions):
+        p_value = p_values[q]
+        flags = []
+        if p_value > TOO_EASY:
+            flags.append("too_easy")
+        elif p_value < TOO_HARD:
+            flags.append("too_hard")
+        if discrimination[q] < LOW_DISCRIMINATION:
+            flags.append("low_discrimination")
+
+        options = []
+        for k, text in enumerate(question["options"]):
+            is_key = k == question["correct"]
+            rate = option_rates[q, k]
+            if not is_key and count:
+                if rate < UNUSED_DISTRACTOR:
+                    flags.append(f"unused_distractor_{k}")
+                if rate > p_value:
+                    flags.append(f"distractor_{k}_more_popular_than_key")
+                if option_discrimination[q, k] > 0:
+                    flags.append(f"distractor_{k}_attracts_strong_students")
+            options.append({
+                "option": k,
+                "text": text,
+                "is_correct": is_key,
+                "frequency": _rounded(rate),
+                "point_biserial": _rounded(option_discrimination[q, k])
+            })
+
+        items.append({
+            "question_id": question["id"],
+            "skill": question["skill"],
+            "p_value": _rounded(p_value),
+            "point_biserial": _rounded(discrimination[q]),
+            "omitted_rate": _rounded(omitted[q]),
+            "options": options,
+            "flags": flags
+        })
+
+    return {
+        "passage_id": passage_id,
+        "passage_title": passage["title"],
+        "response_count": count,
+        "stable": count >= MIN_STABLE_RESPONSES,
+        "mean_score_percentage": _rounded(totals.mean() / len(questions) * 100, 1) if count else None,
+        "cronbach_alpha": _rounded(cronbach_alpha(scored)),
+        "items": items
+    }
+
+
+def analyze_bank(responses_by_passage, passage_ids=None):
+    """
+    Compute item statistics for several passages.
+
+    Args:
+        responses_by_passage: Dict mapping passage id to its answer dicts
+        passage_ids: Passages to include; every catalog passage if omitted
+
+    Returns:
+        Dict with one analyze_passage() result per passage
+    """
+    if passage_ids is None:
+        passage_ids = list(get_passage_catalog())
+    passages = []
+    for passage_id in passage_ids:
+        analysis = analyze_passage(passage_id, responses_by_passage.get(passage_id, []))
+        if analysis is not None:
+            passages.append(analysis)
+    return {
+        "response_count": sum(p["response_count"] for p in passages),
+        "passages": passages
+    }
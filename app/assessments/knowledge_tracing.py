@@ -0,0 +1,308 @@
+"""
+Knowledge Tracing
+Bayesian Knowledge Tracing (BKT) of each student's mastery of each reading
+skill ("Making inferences", "Main idea and theme", ...), updated from every
+answered question.
+
+BKT treats a skill as either learned or not. Each answer updates the
+probability that the student has learned it: a correct answer could be a
+guess, and a wrong one a slip, so neither is taken as proof. After each
+answer the student may also learn the skill with a fixed probability. One
+update is a handful of arithmetic on two numbers, so tracing runs inline in
+the submit handlers.
+
+State is two fixed-width arrays, one row per student and one column per
+skill: float32 mastery probabilities and int32 counts of answers seen. Rows
+are found through a dict of student ids, and columns through the skill list
+(seeded from the passage catalog, so columns stay put). A background thread
+saves the arrays to one .npz file whenever they have changed, and they are
+saved again at exit. If the file is missing, mastery is rebuilt from the
+saved results history.
+
+Parameters are the usual BKT starting values, with the guess rate at 1/4
+because every question has four options:
+    P(L0) = 0.3    already knows the skill before any answer
+    P(T)  = 0.1    learns the skill between answers
+    P(S)  = 0.1    answers wrongly despite knowing the skill
+    P(G)  = 0.25   answers correctly without knowing it
+
+Configuration (environment variables):
+    KNOWLEDGE_TRACING_ENABLED   Set to 0 to turn mastery tracking off (default 1)
+    MASTERY_PATH                Saved mastery arrays (default instance/mastery.npz)
+    MASTERY_SAVE_INTERVAL       Seconds between saves of changed arrays (default 30)
+"""
+
+import atexit
+import os
+import threading
+import time
+
+import numpy as np
+
+from app.assessments.evaluation_cache import INSTANCE_DIR
+from app.assessments.reading import get_passage_catalog
+
+
+DEFAULT_MASTERY_PATH = os.path.join(INSTANCE_DIR, 'mastery.npz')
+DEFAULT_SAVE_INTERVAL = 30.0
+
+P_INIT = 0.3
+P_TRANSIT = 0.1
+P_SLIP = 0.1
+P_GUESS = 0.25
+
+# Probability at which a skill counts as mastered
+MASTERED_AT = 0.95
+
+INITIAL_CAPACITY = 256
+
+
+def catalog_skills():
+    """Every skill tested in the passage catalog, sorted."""
+    return sorted({question["skill"] for passage in get_passage_catalog().values()
+                   for question in passage["questions"]})
+
+
+def bkt_update(p, correct, transit=P_TRANSIT, slip=P_SLIP, guess=P_GUESS):
+    """
+    One BKT step: the probability the skill is learned after an answer.
+
+    Args:
+        p: Probability the skill was learned before the answer
+        correct: Whether the answer was right
+
+    Returns:
+        Updated probability
+    """
+    if correct:
+        known = p * (1 - slip)
+        posterior = known / (known + (1 - p) * guess)
+    else:
+        known = p * slip
+        posterior = known / (known + (1 - p) * (1 - guess))
+    return posterior + (1 - posterior) * transit
+
+
+class KnowledgeTracer:
+    """Per-student, per-skill BKT mastery held in fixed-width numpy arrays."""
+
+    def __init__(self, skills=(), capacity=INITIAL_CAPACITY):
+        self.skills = list(skills)
+        self.skill_index = {skill: col for col, skill in enumerate(self.skills)}
+        self.students = []
+        self.student_index = {}
+        self.mastery = np.full((capacity, len(self.skills)), P_INIT, dtype=np.float32)
+        self.answers = np.zeros((capacity, len(self.skills)), dtype=np.int32)
+        self.updates = 0
+        self.dirty = False
+        self._lock = threading.Lock()
+
+    def _row(self, student_id):
+        row = self.student_index.get(student_id)
+        if row is None:
+            row = self.student_index[student_id] = len(self.students)
+            self.students.append(student_id)
+            if row == self.mastery.shape[0]:
+                self._resize(rows=row * 2)
+        return row
+
+    def _column(self, skill):
+        col = self.skill_index.get(skill)
+        if col is None:
+            col = self.skill_index[skill] = len(self.skills)
+            self.skills.append(skill)
+            self._resize(columns=col + 1)
+        return col
+
+    def _resize(self, rows=None, columns=None):
+        rows = rows or self.mastery.shape[0]
+        columns = columns or self.mastery.shape[1]
+        mastery = np.full((rows, columns), P_INIT, dtype=np.float32)
+        answers = np.zeros((rows, columns), dtype=np.int32)
+        old_rows, old_columns = self.mastery.shape
+        mastery[:old_rows, :old_columns] = self.mastery
+        answers[:old_rows, :old_columns] = self.answers
+        self.mastery, self.answers = mastery, answers
+
+    def observe(self, student_id, skill, correct):
+        """Update one student's mastery of one skill from one answer."""
+        with self._lock:
+            row = self._row(student_id)
+            col = self._column(skill)
+            self.mastery[row, col] = bkt_update(float(self.mastery[row, col]), correct)
+            self.answers[row, col] += 1
+            self.updates += 1
+            self.dirty = True
+
+    def observe_result(self, student_id, result):
+        """
+        Update mastery from every answered question in a reading result.
+
+        Args:
+            student_id: The student who answered
+            result: A reading, batch or adaptive result with question_results
+
+        Returns:
+            Number of answers applied
+        """
+        # A skipped question says nothing about what the student knows
+        answered = [q for q in result.get("question_results") or () if q.get("student_answer") is not None]
+        if not student_id or not answered:
+            return 0
+        with self._lock:
+            row = self._row(student_id)
+            for question in answered:
+                col = self._column(question["skill"])
+                self.mastery[row, col] = bkt_update(float(self.mastery[row, col]), question["correct"])
+                self.answers[row, col] += 1
+            self.updates += len(answered)
+            self.dirty = True
+        return len(answered)
+
+    def student_mastery(self, student_id):
+        """
+        Return {skill: {"mastery", "answers", "mastered"}} for the skills the
+        student has answered questions on.
+        """
+        with self._lock:
+            row = self.student_index.get(student_id)
+            if row is None:
+                return {}
+            mastery = self.mastery[row].tolist()
+            answers = self.answers[row].tolist()
+            skills = list(self.skills)
+        return {
+            skill: {"mastery": round(p, 3), "answers": n, "mastered": p >= MASTERED_AT}
+            for skill, p, n in zip(skills, mastery, answers) if n
+        }
+
+    def mastery_vector(self, student_id, skills=None):
+        """
+        Return one student's mastery as an array, for vectorised use.
+
+        Args:
+            student_id: The student
+            skills: Skill order for the result (default: self.skills); skills
+                never seen get the prior P(L0)
+
+        Returns:
+            float32 array of mastery probabilities, P(L0) for an unknown student
+        """
+        with self._lock:
+            row = self.student_index.get(student_id)
+            vector = self.mastery[row].copy() if row is not None else \
+                np.full(len(self.skills), P_INIT, dtype=np.float32)
+            if skills is None:
+                return vector
+            index = self.skill_index
+            return np.array([vector[index[s]] if s in index else P_INIT for s in skills], dtype=np.float32)
+
+    def save(self, path):
+        """Write the arrays to path atomically and mark them saved."""
+        with self._lock:
+            count = len(self.students)
+            state = {
+                "mastery": self.mastery[:count].copy(),
+                "answers": self.answers[:count].copy(),
+                "students": np.array(self.students, dtype=str),
+                "skills": np.array(self.skills, dtype=str)
+            }
+            self.dirty = False
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        temp_path = f"{path}.tmp"
+        with open(temp_path, 'wb') as f:
+            np.savez(f, **state)
+        os.replace(temp_path, path)
+
+    @classmethod
+    def load(cls, path, skills=()):
+        """Read arrays written by save(), adding any skills not saved there."""
+        with np.load(path, allow_pickle=False) as data:
+            saved_skills = data["skills"].tolist()
+            tracer = cls(saved_skills, capacity=max(INITIAL_CAPACITY, len(data["students"]) * 2))
+            count = len(data["students"])
+            tracer.mastery[:count] = data["mastery"]
+            tracer.answers[:count] = data["answers"]
+            tracer.students = data["students"].tolist()
+        tracer.student_index = {student_id: row for row, student_id in enumerate(tracer.students)}
+        for skill in skills:
+            tracer._column(skill)
+        return tracer
+
+    def stats(self):
+        """Return array sizes and update counters."""
+        return {
+            "students": len(self.students),
+            "skills": len(self.skills),
+            "updates": self.updates,
+            "array_bytes": self.mastery.nbytes + self.answers.nbytes,
+            "unsaved_changes": self.dirty
+        }
+
+
+def rebuild_from_results(store, skills=None):
+    """
+    Trace every saved reading result again, oldest first.
+
+    Returns:
+        A new KnowledgeTracer
+    """
+    tracer = KnowledgeTracer(catalog_skills() if skills is None else skills)
+    for attempt in store.replay(kinds=("reading", "adaptive")):
+        tracer.observe_result(attempt["student_id"], attempt["result"])
+    return tracer
+
+
+def _save_loop(tracer, path, interval):
+    while True:
+        time.sleep(interval)
+        if tracer.dirty:
+            _save(tracer, path)
+
+
+def _save(tracer, path):
+    try:
+        tracer.save(path)
+    except OSError as e:
+        print(f"Could not save mastery to {path}: {e}")
+
+
+_tracer = None
+_tracer_lock = threading.Lock()
+
+
+def get_knowledge_tracer():
+    """Return the process-wide knowledge tracer, or None if tracing is disabled."""
+    global _tracer
+    if os.environ.get('KNOWLEDGE_TRACING_ENABLED', '1') in ('0', 'false', 'False', ''):
+        return None
+    if _tracer is None:
+        with _tracer_lock:
+            if _tracer is None:
+                from app.assessments.results_store import get_results_store
+
+                path = os.environ.get('MASTERY_PATH', DEFAULT_MASTERY_PATH)
+                tracer = None
+                if os.path.exists(path):
+                    try:
+                        tracer = KnowledgeTracer.load(path, catalog_skills())
+                    except (OSError, ValueError, KeyError) as e:
+                        print(f"Could not load mastery from {path}, rebuilding: {e}")
+                if tracer is None:
+                    store = get_results_store()
+                    if store:
+                        store.flush()
+                        tracer = rebuild_from_results(store)
+                        if tracer.students:
+                            print(f"Built mastery for {len(tracer.students)} students from saved results")
+                    else:
+                        tracer = KnowledgeTracer(catalog_skills())
+
+                interval = float(os.environ.get('MASTERY_SAVE_INTERVAL', DEFAULT_SAVE_INTERVAL))
+                threading.Thread(target=_save_loop, args=(tracer, path, interval),
+                                 name="mastery-saver", daemon=True).start()
+                atexit.register(lambda: tracer.dirty and _save(tracer, path))
+                _tracer = tracer
+    return _tracer
@@ -0,0 +1,322 @@
+"""
+Local Rubric Scorer
+Offline, feature-based scoring of student writing against the four Think
+First rubric categories.
+
+Used whenever Claude is unavailable: no API key, an open circuit breaker or
+a failed call. Every feature is computed in time linear in the essay length,
+so a typical essay is scored in well under 5 ms and the scorer can serve as
+a real low-latency tier rather than a stub.
+"""
+
+import math
+import re
+
+from app.assessments.text_analysis import analyze_text
+from app.assessments.writing import CATEGORY_NAMES
+
+
+TRANSITIONS = (
+    "first", "firstly", "second", "secondly", "third", "finally", "next", "then", "lastly",
+    "however", "therefore", "because", "although", "instead", "meanwhile", "moreover",
+    "furthermore", "additionally", "also", "besides", "consequently", "as a result",
+    "for example", "for instance", "in addition", "in conclusion", "to conclude",
+    "on the other hand", "in contrast", "similarly", "likewise", "overall", "since",
+    "so that", "this means", "that is why", "in the end", "after that", "even though"
+)
+
+STOPWORDS = frozenset(
+    "about above after again also because been before being below between both cannot "
+    "could does doing down during each from further have having here hers herself himself "
+    "into itself just more most myself only other ought ours ourselves over same should "
+    "some such than that their theirs them themselves then there these they this those "
+    "through under until very what when where which while will with would your yours "
+    "yourself yourselves really things thing like want make made much many every".split()
+)
+
+# Score thresholds for Levels 2, 3 and 4 (below the first is Level 1)
+LEVEL_THRESHOLDS = (0.35, 0.55, 0.75)
+
+# (score, percentage) anchors on the rubric's 50-100 scale (Level 1 = 50-59%);
+# the level thresholds land on 60/70/80%
+PERCENTAGE_ANCHORS = ((0.0, 50), (0.35, 60), (0.55, 70), (0.75, 80), (1.0, 100))
+
+_WORD = re.compile(r"[a-z][a-z'’]*")
+_PARAGRAPH_BREAK = re.compile(r"\n[ \t\r]*\n")
+_SINGLE_WORD_TRANSITIONS = frozenset(t for t in TRANSITIONS if " " not in t)
+# Multi-word transitions as whole words, so "also that" is not read as "so that"
+_PHRASE_TRANSITION = re.compile(r"\b(?:" + "|".join(
+    r"\s+".join(map(re.escape, t.split())) for t in TRANSITIONS if " " in t
+) + r")\b")
+# A sentence that starts with a lower-case letter (ellipses may continue a sentence)
+_LOWERCASE_START = re.compile(r"(?<![.…])[.!?][\"'”’)]*\s+[\"'“‘(]*[a-z]")
+_INNER_PUNCTUATION = re.compile(r"[,;:—–]")
+
+
+FEEDBACK = {
+    "opening_focus": (
+        "Your opening points the reader toward your main idea.",
+        "State your main message in your very first sentence, then keep coming back to it."
+    ),
+    "length": (
+        "You gave your ideas enough room to develop.",
+        "Adjust your length to the target so each idea gets the space it needs."
+    ),
+    "cohesion": (
+        "Your paragraphs keep returning to your main message.",
+        "Connect each paragraph back to your main message using some of the same key words."
+    ),
+    "transitions": (
+        "You use linking words that help the reader follow your thinking.",
+        "Use linking words like 'because', 'for example' or 'as a result' to show how your points connect."
+    ),
+    "paragraphing": (
+        "You organized your writing into clear paragraphs.",
+        "Break your writing into paragraphs, with one main point in each."
+    ),
+    "distinctness": (
+        "Each paragraph brings something new to your writing.",
+        "Check that your paragraphs make different points instead of repeating the same idea."
+    ),
+    "lexical_diversity": (
+        "You use a good range of words.",
+        "Try using more varied and precise words instead of repeating the same ones."
+    ),
+    "paragraph_balance": (
+        "Your paragraphs are well balanced.",
+        "Give each supporting point a similar amount of detail so none of them feels thin."
+    ),
+    "capitalization": (
+        "Your sentences start with capital letters.",
+        "Start every sentence with a capital letter, and always capitalize 'I'."
+    ),
+    "punctuation": (
+        "Your punctuation helps your sentences read smoothly.",
+        "Use commas to separate ideas within longer sentences, and end each sentence with punctuation."
+    ),
+    "sentence_variety": (
+        "You mix short and long sentences.",
+        "Mix short, punchy sentences with longer ones to keep your reader interested."
+    ),
+    "run_ons": (
+        "Your sentences are a manageable length.",
+        "Split very long sentences into two so each one is easy to follow."
+    )
+}
+
+# Features about paragraphs and how they relate; writing in a single paragraph
+# gets a placeholder score for them, which must never be praised as a strength
+_PARAGRAPH_FEATURES = frozenset({"cohesion", "paragraphing", "distinctness", "paragraph_balance"})
+
+# Feature weights for each rubric category
+CATEGORY_FEATURES = {
+    "main_message": {"opening_focus": 0.6, "length": 0.2, "cohesion": 0.2},
+    "logical_structure": {"transitions": 0.4, "cohesion": 0.35, "paragraphing": 0.25},
+    "grouping": {"distinctness": 0.45, "lexical_diversity": 0.3, "paragraph_balance": 0.25},
+    "conventions": {"capitalization": 0.35, "punctuation": 0.25, "sentence_variety": 0.25, "run_ons": 0.15}
+}
+
+def _clamp(value):
+    return 0.0 if value < 0 else 1.0 if value > 1 else value
+
+
+def _content_words(words):
+    return {w for w in words if len(w) > 3 and w not in STOPWORDS}
+
+
+def _coefficient_of_variation(values):
+    count = len(values)
+    if count < 2:
+        return 0.0
+    mean = sum(values) / count
+    if not mean:
+        return 0.0
+    variance = sum((v - mean) ** 2 for v in values) / count
+    return math.sqrt(variance) / mean
+
+
+def extract_features(text, prompt_info, metrics=None):
+    """
+    Compute rubric features for one essay, each scaled to 0-1.
+
+    Args:
+        text: The student's writing
+        prompt_info: Dict with word_minimum and word_maximum
+        metrics: Optional TextMetrics already computed for text
+
+    Returns:
+        Dict mapping feature name to a score between 0 and 1
+    """
+    if metrics is None:
+        metrics = analyze_text(text)
+    lowered = text.lower()
+    sentence_count = metrics.sentence_count or 1
+
+    # Tokenize paragraph by paragraph so the words are only extracted once
+    words = []
+    paragraphs = []
+    for paragraph in _PARAGRAPH_BREAK.split(lowered):
+        paragraph_words = _WORD.findall(paragraph)
+        if paragraph_words:
+            words.extend(paragraph_words)
+            paragraphs.append(_content_words(paragraph_words))
+    paragraphs = paragraphs or [set()]
+    word_total = len(words) or 1
+    opening, body = paragraphs[0], paragraphs[1:]
+
+    # Main message: does the first sentence's vocabulary carry through the essay?
+    first_sentence_words = metrics.sentence_lengths[0] if metrics.sentence_lengths else 0
+    opening_sentence = _content_words(words[:first_sentence_words])
+    later = set().union(*paragraphs[1:]) | _content_words(words[first_sentence_words:])
+    recurrence = len(opening_sentence & later) / len(opening_sentence) if opening_sentence else 0.0
+    focused_length = 1.0 if 6 <= first_sentence_words <= 30 else 0.6
+    opening_focus = _clamp(recurrence / 0.4) * focused_length
+
+    word_minimum = prompt_info.get('word_minimum', 200)
+    word_maximum = prompt_info.get('word_maximum', 500)
+    if metrics.word_count < word_minimum:
+        length = metrics.word_count / word_minimum
+    elif metrics.word_count > word_maximum:
+        length = max(0.5, word_maximum / metrics.word_count)
+    else:
+        length = 1.0
+
+    # Logical structure: body paragraphs tied to the opening, linked by transitions
+    if body:
+        overlaps = [len(p & opening) / (min(len(p), len(opening)) or 1) for p in body]
+        cohesion = _clamp((sum(overlaps) / len(overlaps)) / 0.25)
+    else:
+        cohesion = 0.3
+    transition_count = sum(map(_SINGLE_WORD_TRANSITIONS.__contains__, words))
+    transition_count += len(_PHRASE_TRANSITION.findall(lowered))
+    transitions = _clamp(transition_count / sentence_count / 0.3)
+    paragraphing = {0: 0.0, 1: 0.2, 2: 0.6}.get(metrics.paragraph_count, 1.0)
+
+    # Grouping: adjacent paragraphs should not repeat each other
+    if len(paragraphs) > 1:
+        similarities = [
+            len(a & b) / (len(a | b) or 1) for a, b in zip(paragraphs, paragraphs[1:])
+        ]
+        distinctness = _clamp(1 - (sum(similarities) / len(similarities) - 0.1) / 0.3)
+    else:
+        distinctness = 0.4
+    root_ttr = len(set(words)) / math.sqrt(word_total)
+    lexical_diversity = _clamp((root_ttr - 4.0) / 5.0)
+    paragraph_balance = (
+        _clamp(1 - (_coefficient_of_variation(metrics.paragraph_word_counts) - 0.3) / 0.7)
+        if metrics.paragraph_count > 1 else 0.5
+    )
+
+    # Conventions
+    stripped = text.lstrip("\"'“‘( \t\r\n")
+    lowercase_starts = len(_LOWERCASE_START.findall(text)) + (1 if stripped[:1].islower() else 0)
+    padded = f" {text} "
+    lowercase_i = padded.count(" i ") + padded.count(" i'") + padded.count(" i’")
+    capitalization = _clamp(1 - lowercase_starts / sentence_count - 0.1 * lowercase_i)
+    punctuation_per_sentence = len(_INNER_PUNCTUATION.findall(text)) / sentence_count
+    if punctuation_per_sentence < 0.3:
+        punctuation = _clamp(punctuation_per_sentence / 0.3)
+    else:
+        punctuation = _clamp(1 - (punctuation_per_sentence - 2.5) / 2.5)
+    sentence_variety = (
+        _clamp(_coefficient_of_variation(metrics.sentence_lengths) / 0.4)
+        if metrics.sentence_count >= 3 else 0.2
+    )
+    long_sentences = sum(1 for n in metrics.sentence_lengths if n > 35)
+    run_ons = _clamp(1 - 3 * long_sentences / sentence_count)
+
+    return {
+        "opening_focus": opening_focus,
+        "length": length,
+        "cohesion": cohesion,
+        "transitions": transitions,
+        "paragraphing": paragraphing,
+        "distinctness": distinctness,
+        "lexical_diversity": lexical_diversity,
+        "paragraph_balance": paragraph_balance,
+        "capitalization": capitalization,
+        "punctuation": punctuation,
+        "sentence_variety": sentence_variety,
+        "run_ons": run_ons
+    }
+
+
+def level_for_score(score):
+    """Map a 0-1 category score onto Levels 1-4."""
+    level = 1
+    for threshold in LEVEL_THRESHOLDS:
+        if score >= threshold:
+            level += 1
+    return level
+
+
+def percentage_for_score(score):
+    """Map a 0-1 score onto the 50-100 scale the rubric and AI evaluations use."""
+    for (low, low_pct), (high, high_pct) in zip(PERCENTAGE_ANCHORS, PERCENTAGE_ANCHORS[1:]):
+        if score <= high:
+            return int(round(low_pct + (score - low) / (high - low) * (high_pct - low_pct)))
+    return PERCENTAGE_ANCHORS[-1][1]
+
+
+def score_writing(text, prompt_info, metrics=None):
+    """
+    Score an essay offline against the four rubric categories.
+
+    Args:
+        text: The student's writing
+        prompt_info: Dict with prompt details (title, type, requirements)
+        metrics: Optional TextMetrics already computed for text
+
+    Returns:
+        Evaluation dict in the same shape as the AI evaluation
+    """
+    if metrics is None:
+        metrics = analyze_text(text)
+    features = extract_features(text, prompt_info, metrics)
+
+    # A short response cannot show much of any skill, however tidy it is
+    ceiling = 0.25 + 0.75 * features["length"] if metrics.word_count < prompt_info.get('word_minimum', 200) else 1.0
+
+    categories = {}
+    category_scores = {}
+    for category, weights in CATEGORY_FEATURES.items():
+        score = min(ceiling, sum(features[name] * weight for name, weight in weights.items()))
+        category_scores[category] = score
+        praisable = [name for name in weights
+                     if metrics.paragraph_count > 1 or name not in _PARAGRAPH_FEATURES]
+        strongest = max(praisable, key=lambda name: features[name])
+        weakest = min((name for name in weights if name != strongest), key=lambda name: features[name])
+        categories[category] = {
+            "level": level_for_score(score),
+            "strength": FEEDBACK[strongest][0],
+            "improvement": FEEDBACK[weakest][1]
+        }
+
+    mean_score = sum(category_scores.values()) / len(category_scores)
+    overall_percentage = percentage_for_score(mean_score)
+    if overall_percentage >= 80:
+        overall_level = 4
+    elif overall_percentage >= 70:
+        overall_level = 3
+    elif overall_percentage >= 60:
+        overall_level = 2
+    else:
+        overall_level = 1
+
+    word_count = metrics.word_count
+    paragraph_count = metrics.paragraph_count
+    word_minimum = prompt_info.get('word_minimum', 200)
+    has_good_length = word_minimum <= word_count <= prompt_info.get('word_maximum', 500)
+    best = max(category_scores, key=category_scores.get)
+    focus = min(category_scores, key=category_scores.get)
+
+    return {
+        "overall_level": overall_level,
+        "overall_percentage": overall_percentage,
+        "categories": categories,
+        "overall_feedback": f"You wrote {word_count} words across {paragraph_count} paragraph{'s' if paragraph_count != 1 else ''}. " +
+            ("Good job meeting the word count! " if has_good_length else f"Try to {'expand' if word_count < word_minimum else 'tighten'} your writing to meet the target. ") +
+            f"Your strongest area is your {CATEGORY_NAMES[best].lower()}: {categories[best]['strength'][0].lower()}{categories[best]['strength'][1:]}",
+        "top_priority": f"Focus on your {CATEGORY_NAMES[focus].lower()}. {categories[focus]['improvement']}",
+        "ai_evaluated": False
+    }
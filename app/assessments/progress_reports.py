@@ -0,0 +1,220 @@
+"""
+Progress Reports
+Printable per-student progress reports for a whole class or school,
+rendered in parallel and collected into one zip.
+
+The parent process gathers each student's figures from the results store
+and knowledge tracer. These are cheap rollup reads, so a school's 300
+students take a few milliseconds. It hands the reports in small batches to a
+ProcessPoolExecutor, which renders the PDFs (report_pdf.py). Each worker
+process loads the fonts and builds the page styles once, then renders
+batch after batch. Finished PDFs are written into the zip as they come back,
+and only a few batches are in flight at a time, so memory stays flat
+however many students there are. The zip is written under a temporary name
+and renamed when complete.
+
+Workers are started with "spawn" rather than "fork", because the server
+process has running threads and open database connections that a forked
+child must not inherit.
+
+Configuration (environment variables):
+    REPORT_WORKERS      Rendering processes (default: CPU count)
+    REPORT_FONT         TrueType font for report text (default reportlab's Vera.ttf)
+    REPORT_BOLD_FONT    TrueType font for headings (default reportlab's VeraBd.ttf)
+    REPORT_DIR          Where background report jobs write their zips (default instance/reports)
+"""
+
+import multiprocessing
+import os
+import time
+import zipfile
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+from app.assessments.evaluation_cache import INSTANCE_DIR
+from app.assessments.report_pdf import DEFAULT_FONTS, HAS_REPORTLAB, init_worker, render_batch
+from app.assessments.writing import CATEGORY_NAMES
+
+
+DEFAULT_REPORT_DIR = os.path.join(INSTANCE_DIR, 'reports')
+DEFAULT_BATCH_SIZE = 4
+RECENT_ATTEMPTS = 8
+
+
+def report_fonts():
+    """The (regular, bold) TrueType fonts configured for reports."""
+    return (os.environ.get('REPORT_FONT', DEFAULT_FONTS[0]),
+            os.environ.get('REPORT_BOLD_FONT', DEFAULT_FONTS[1]))
+
+
+def build_report(store, tracer, student_id, class_id=None, titles=None):
+    """
+    Gather one student's report figures into a plain, picklable dict.
+
+    Args:
+        store: ResultsStore
+        tracer: KnowledgeTracer, or None
+        student_id: The student
+        class_id: Class shown on the report
+        titles: Passage and prompt titles by id
+
+    Returns:
+        Dict for report_pdf.render_report
+    """
+    titles = titles or {}
+    progress = store.progress(student_id=student_id)
+    mastery = tracer.student_mastery(student_id) if tracer else {}
+    skills = []
+    for skill in progress["skills"]:
+        entry = {key: skill[key] for key in ("name", "correct", "total", "average", "rolling_average")}
+        if skill["name"] in mastery:
+            entry["mastery"] = mastery[skill["name"]]["mastery"]
+            entry["mastered"] = mastery[skill["name"]]["mastered"]
+        skills.append(entry)
+
+    writing = None
+    latest = store.history(student_id=student_id, kind="writing", limit=1, include_result=True)
+    if progress["categories"] or latest:
+        evaluation = latest[0]["result"].get("evaluation", latest[0]["result"]) if latest else {}
+        latest_levels = {key: category.get("level")
+                         for key, category in (evaluation.get("categories") or {}).items()
+                         if isinstance(category, dict)}
+        writing = {
+            "categories": [
+                {"label": CATEGORY_NAMES.get(category["name"], category["name"]),
+                 "latest": latest_levels.get(category["name"]),
+                 "average": category["average"],
+                 "attempts": category["attempts"]}
+                for category in sorted(progress["categories"], key=_rubric_order)
+            ],
+            "overall_level": evaluation.get("overall_level"),
+            "top_priority": evaluation.get("top_priority")
+        }
+
+    recent = [
+        {"title": titles.get(attempt["item_id"], attempt["item_id"]),
+         "date": time.strftime("%Y-%m-%d", time.localtime(attempt["created_at"])),
+         "kind": attempt["kind"],
+         "score": attempt["score"],
+         "level": attempt["level"]}
+        for attempt in store.history(student_id=student_id, limit=RECENT_ATTEMPTS)
+    ]
+    return {
+        "student_id": student_id,
+        "class_id": class_id,
+        "generated": time.strftime("%B %d, %Y"),
+        "skills": skills,
+        "writing": writing,
+        "recent": recent
+    }
+
+
+def _rubric_order(category):
+    names = list(CATEGORY_NAMES)
+    return names.index(category["name"]) if category["name"] in names else len(names)
+
+
+def _batches(items, size):
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _archive_name(student_id, used):
+    name = "".join(c if c.isalnum() or c in "-_" else "_" for c in str(student_id)) or "student"
+    candidate, n = name, 1
+    while candidate in used:
+        n += 1
+        candidate = f"{name}-{n}"
+    used.add(candidate)
+    return f"{candidate}.pdf"
+
+
+def generate_reports(reports, zip_path, workers=None, batch_size=DEFAULT_BATCH_SIZE,
+                     fonts=None, on_progress=None):
+    """
+    Render reports in a process pool and write them into a zip as they finish.
+
+    Args:
+        reports: Iterable of report dicts from build_report (may be a generator)
+        zip_path: Zip file to create
+        workers: Rendering processes (default REPORT_WORKERS or the CPU count)
+        batch_size: Reports sent to a worker at a time
+        fonts: (regular, bold) TrueType fonts (default report_fonts())
+        on_progress: Optional callback(done, seconds) after each batch is written
+
+    Returns:
+        {"reports", "seconds", "reports_per_second", "workers", "bytes"}
+    """
+    if not HAS_REPORTLAB:
+        raise RuntimeError("PDF reports need reportlab (pip install reportlab)")
+    workers = workers or int(os.environ.get('REPORT_WORKERS', 0)) or os.cpu_count() or 1
+    directory = os.path.dirname(zip_path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+
+    started = time.perf_counter()
+    done = 0
+    used = set()
+    partial_path = f"{zip_path}.part"
+
+    def write(futures):
+        nonlocal done
+        for future in futures:
+            for student_id, pdf in future.result():
+                archive.writestr(_archive_name(student_id, used), pdf)
+                done += 1
+        if on_progress:
+            on_progress(done, time.perf_counter() - started)
+
+    context = multiprocessing.get_context("spawn")
+    # PDFs are already compressed, so they are stored rather than deflated
+    with ProcessPoolExecutor(workers, mp_context=context, initializer=init_worker,
+                             initargs=(fonts or report_fonts(),)) as pool, \
+            zipfile.ZipFile(partial_path, "w", zipfile.ZIP_STORED) as archive:
+        pending = set()
+        for batch in _batches(reports, batch_size):
+            if len(pending) >= workers * 2:
+                finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+                write(finished)
+            pending.add(pool.submit(render_batch, batch))
+        while pending:
+            finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+            write(finished)
+    os.replace(partial_path, zip_path)
+
+    seconds = time.perf_counter() - started
+    return {
+        "reports": done,
+        "seconds": round(seconds, 3),
+        "reports_per_second": round(done / seconds, 1) if seconds else 0.0,
+        "workers": workers,
+        "bytes": os.path.getsize(zip_path)
+    }
+
+
+def class_reports(store, tracer, class_id=None, student_ids=None, titles=None):
+    """
+    Yield report dicts for the given students, or for everyone in a class
+    (everyone with saved results if no class is given).
+    """
+    for student_id in student_ids or store.students(class_id=class_id):
+        yield build_report(store, tracer, student_id, class_id=class_id, titles=titles)
+
+
+def remove_old_archives(directory, max_age):
+    """Delete report zips older than max_age seconds."""
+    if not os.path.isdir(directory):
+        return
+    cutoff = time.time() - max_age
+    for name in os.listdir(directory):
+        path = os.path.join(directory, name)
+        if name.endswith((".zip", ".zip.part")) and os.path.getmtime(path) < cutoff:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
@@ -9,17 +9,63 @@ Includes passages thematically connected to notable Canadian and world literatur
 - Education activism (Malala Yousafzai themes)
 """
 
+from functools import lru_cache
+
 from app.curriculum import READING_EXPECTATIONS, ACHIEVEMENT_LEVELS
+from app.assessments.catalog import freeze
+from app.assessments.irt import ability_estimate, apply_calibration, load_calibration
+
+
+# Lowest score percentage for Levels 2, 3 and 4 (anything lower is Level 1)
+LEVEL_CUTOFFS = (60, 70, 80)
+
+
+def achievement_level(score_percentage):
+    """Return the achievement level label ("Level 1" to "Level 4") for a score."""
+    level = 1
+    for cutoff in LEVEL_CUTOFFS:
+        if score_percentage >= cutoff:
+            level += 1
+    return f"Level {level}"
+
+
+# Skill percentages below this need practice; at or above STRENGTH_FROM are strengths
+NEEDS_IMPROVEMENT_BELOW = 70
+STRENGTH_FROM = 80
+
+
+def skill_feedback(skill, percentage):
+    """Return the feedback item for one skill's percentage, or None if unremarkable."""
+    if percentage < NEEDS_IMPROVEMENT_BELOW:
+        return {
+            "skill": skill,
+            "status": "needs_improvement",
+            "message": f"Consider practicing {skill.lower()}. "
+                      f"Review strategies for this skill area."
+        }
+    if percentage >= STRENGTH_FROM:
+        return {
+            "skill": skill,
+            "status": "strength",
+            "message": f"Strong performance in {skill.lower()}!"
+        }
+    return None
 
 
 class ReadingAssessment:
     """Handles reading comprehension assessments."""
 
     def __init__(self):
-        self.passages = self._load_passages()
+        self.passages = get_passage_catalog()
+
+    @staticmethod
+    def _load_passages():
+        """
+        Build the reading passages with questions.
 
-    def _load_passages(self):
-        """Load reading passages with questions."""
+        This constructs the full passage literal and is only meant to be
+        called once per process; use get_passage_catalog() instead.
+        """
         return {
             # Original passages
             "fiction_1": {
@@ -1332,18 +1378,7 @@ similar energy drinks." - Verified Purchaser
 
     def get_available_passages(self):
         """Return list of available passages for selection."""
-        return [
-            {
-                "id": p["id"],
-                "title": p["title"],
-                "type": p["type"],
-                "grade": p["grade"],
-                "question_count": len(p["questions"]),
-                "themes": p.get("themes", []),
-                "related_texts": p.get("related_texts", [])
-            }
-            for p in self.passages.values()
-        ]
+        return list(_passage_summaries())
 
     def get_passage(self, passage_id):
         """Get a specific passage by ID."""
@@ -1378,6 +1413,7 @@ similar energy drinks." - Verified Purchaser
 
         skill_correct = {}
         skill_total = {}
+        correct_flags = []
 
         for question in passage["questions"]:
             qid = question["id"]
@@ -1388,6 +1424,7 @@ similar energy drinks." - Verified Purchaser
 
             student_answer = answers.get(qid)
             is_correct = student_answer == question["correct"]
+            correct_flags.append(is_correct)
 
             if is_correct:
                 results["correct_count"] += 1
@@ -1409,15 +1446,7 @@ similar energy drinks." - Verified Purchaser
         )
 
         # Determine achievement level
-        score = results["score_percentage"]
-        if score >= 80:
-            results["achievement_level"] = "Level 4"
-        elif score >= 70:
-            results["achievement_level"] = "Level 3"
-        elif score >= 60:
-            results["achievement_level"] = "Level 2"
-        else:
-            results["achievement_level"] = "Level 1"
+        results["achievement_level"] = achievement_level(results["score_percentage"])
 
         # Calculate skill breakdown
         for skill in skill_total:
@@ -1432,6 +1461,11 @@ similar energy drinks." - Verified Purchaser
         # Generate curriculum-aligned feedback
         results["curriculum_feedback"] = self._generate_feedback(results)
 
+        # Place the student on the common ability scale once the passage is calibrated
+        difficulties = [question.get("difficulty") for question in passage["questions"]]
+        if None not in difficulties:
+            results["ability"] = ability_estimate(correct_flags, difficulties)
+
         return results
 
     def _generate_feedback(self, results):
@@ -1439,18 +1473,38 @@ similar energy drinks." - Verified Purchaser
         feedback = []
 
         for skill, data in results["skill_breakdown"].items():
-            if data["percentage"] < 70:
-                feedback.append({
-                    "skill": skill,
-                    "status": "needs_improvement",
-                    "message": f"Consider practicing {skill.lower()}. "
-                              f"Review strategies for this skill area."
-                })
-            elif data["percentage"] >= 80:
-                feedback.append({
-                    "skill": skill,
-                    "status": "strength",
-                    "message": f"Strong performance in {skill.lower()}!"
-                })
+            item = skill_feedback(skill, data["percentage"])
+            if item:
+                feedback.append(item)
 
         return feedback
+
+
+@lru_cache(maxsize=None)
+def get_passage_catalog():
+    """
+    Return the process-wide passage catalog.
+
+    The catalog is built on first use and shared by every ReadingAssessment
+    instance. It is read-only: passages are mappings and question lists are
+    tuples, so no request can change what another request sees. Calibrated
+    item difficulties, if any, are merged into the questions.
+    """
+    return freeze(apply_calibration(ReadingAssessment._load_passages(), load_calibration()))
+
+
+@lru_cache(maxsize=None)
+def _passage_summaries():
+    """Return the cached passage summaries shown on the selection page."""
+    return tuple(
+        freeze({
+            "id": p["id"],
+            "title": p["title"],
+            "type": p["type"],
+            "grade": p["grade"],
+            "question_count": len(p["questions"]),
+            "themes": p.get("themes", []),
+            "related_texts": p.get("related_texts", [])
+        })
+        for p in get_passage_catalog().values()
+    )
@@ -0,0 +1,140 @@
+"""
+Passage Recommendation
+Ranks the reading passages a student has not taken yet by how much practice
+they give in the skills the student is weakest at.
+
+The passage catalog is turned once into a passage x skill coverage matrix:
+each row spreads a passage's weight over the skills its questions test, in
+proportion to the number of questions on each. The passage's
+curriculum_alignment strands (comprehension, vocabulary, ...) add a smaller
+share on top. A strand's weight is spread over every skill tested in
+passages aligned with that strand, so a vocabulary passage also helps a
+student who is weak at the vocabulary skills of other passages. Both parts
+are folded into a single matrix when it is built.
+
+A student's weakness in each skill is 1 - their knowledge-tracing mastery.
+Skills they have never answered keep the prior, so untried skills count as
+fairly weak. Scoring every passage is then a single matrix-vector product.
+Passages already taken are masked out, and only the top few are sorted.
+"""
+
+from functools import lru_cache
+
+import numpy as np
+
+from app.assessments.knowledge_tracing import P_INIT, get_knowledge_tracer
+from app.assessments.reading import get_passage_catalog
+from app.assessments.results_store import get_results_store
+
+
+# Share of each passage's score that comes from its curriculum strands
+STRAND_WEIGHT = 0.25
+DEFAULT_LIMIT = 3
+# Weak skills named as the reason for each recommendation
+REASON_SKILLS = 3
+
+
+class PassageRecommender:
+    """Skill-gap passage ranking over a precomputed coverage matrix."""
+
+    def __init__(self, catalog, strand_weight=STRAND_WEIGHT):
+        self.passage_ids = list(catalog)
+        self.titles = [catalog[passage_id]["title"] for passage_id in self.passage_ids]
+        self.row = {passage_id: row for row, passage_id in enumerate(self.passage_ids)}
+        self.skills = sorted({question["skill"] for passage in catalog.values()
+                              for question in passage["questions"]})
+        self.strands = sorted({strand for passage in catalog.values()
+                               for strand in passage.get("curriculum_alignment", ())})
+        skill_col = {skill: col for col, skill in enumerate(self.skills)}
+        strand_col = {strand: col for col, strand in enumerate(self.strands)}
+
+        # Share of each passage's questions on each skill
+        questions = np.zeros((len(self.passage_ids), len(self.skills)))
+        aligned = np.zeros((len(self.passage_ids), len(self.strands)))
+        for row, passage_id in enumerate(self.passage_ids):
+            passage = catalog[passage_id]
+            for question in passage["questions"]:
+                questions[row, skill_col[question["skill"]]] += 1
+            for strand in passage.get("curriculum_alignment", ()):
+                aligned[row, strand_col[strand]] = 1
+        totals = questions.sum(axis=1, keepdims=True)
+        coverage = np.divide(questions, totals, out=np.zeros_like(questions), where=totals > 0)
+
+        # Each strand's skills, weighted by how many of the strand's questions test them
+        strand_skills = aligned.T @ questions
+        strand_totals = strand_skills.sum(axis=1, keepdims=True)
+        strand_skills = np.divide(strand_skills, strand_totals, out=np.zeros_like(strand_skills),
+                                  where=strand_totals > 0)
+        strand_counts = aligned.sum(axis=1, keepdims=True)
+        strand_share = np.divide(aligned, strand_counts, out=np.zeros_like(aligned), where=strand_counts > 0)
+
+        self.matrix = np.ascontiguousarray(
+            (1 - strand_weight) * coverage + strand_weight * strand_share @ strand_skills,
+            dtype=np.float32)
+        self.coverage = coverage.astype(np.float32)
+
+    def scores(self, weakness):
+        """Expected practice on weak skills for every passage, in catalog order."""
+        return self.matrix @ weakness
+
+    def recommend(self, weakness, seen=(), limit=DEFAULT_LIMIT):
+        """
+        Rank unseen passages for a student.
+
+        Args:
+            weakness: float32 array of 1 - mastery, in self.skills order
+            seen: Passage ids the student has already taken
+            limit: Most passages to return
+
+        Returns:
+            List of {"passage_id", "title", "score", "target_skills"}, best first
+        """
+        scores = self.scores(weakness)
+        rows = [self.row[passage_id] for passage_id in seen if passage_id in self.row]
+        if rows:
+            scores[rows] = -np.inf
+        available = len(self.passage_ids) - len(set(rows))
+        limit = min(limit, available)
+        if limit <= 0:
+            return []
+        # Only the top few need sorting
+        top = np.argpartition(-scores, limit - 1)[:limit] if limit < len(scores) else np.arange(len(scores))
+        # Best score first, catalog order among equals
+        top = top[np.lexsort((top, -scores[top]))]
+
+        recommendations = []
+        for row in top.tolist():
+            targeted = self.coverage[row] * weakness
+            reasons = [self.skills[col] for col in np.argsort(-targeted)[:REASON_SKILLS].tolist()
+                       if targeted[col] > 0]
+            recommendations.append({
+                "passage_id": self.passage_ids[row],
+                "title": self.titles[row],
+                "score": round(float(scores[row]), 3),
+                "target_skills": reasons
+            })
+        return recommendations
+
+
+@lru_cache(maxsize=None)
+def get_recommender():
+    """The recommender for the current passage catalog."""
+    return PassageRecommender(get_passage_catalog())
+
+
+def recommend_for_student(student_id, limit=DEFAULT_LIMIT):
+    """
+    Recommend passages for one student from their mastery and history.
+
+    Without knowledge tracing every skill counts as equally weak, and without
+    saved results no passage counts as taken.
+    """
+    recommender = get_recommender()
+    tracer = get_knowledge_tracer()
+    if tracer and student_id:
+        weakness = 1 - tracer.mastery_vector(student_id, recommender.skills)
+    else:
+        weakness = np.full(len(recommender.skills), 1 - P_INIT, dtype=np.float32)
+    store = get_results_store()
+    seen = store.seen_items(student_id, kind="reading") if store and student_id else ()
+    return recommender.recommend(weakness, seen, limit)
@@ -0,0 +1,183 @@
+"""
+Progress Report PDF
+Renders one student's printable progress report from a plain dict built by
+progress_reports.build_report: reading skill progress and mastery, writing
+rubric levels with the latest top priority, and recent assessments.
+
+This module runs inside report worker processes, so it imports nothing from
+the rest of the app. Each worker registers the fonts once (init_worker) and
+builds the paragraph and table styles once (_layout); after that a report
+costs only its own layout and the font subset embedded in it.
+
+Needs the optional reportlab package (pip install reportlab).
+"""
+
+import io
+from functools import lru_cache
+
+try:
+    from reportlab.lib import colors
+    from reportlab.lib.fonts import addMapping
+    from reportlab.lib.pagesizes import letter
+    from reportlab.lib.styles import ParagraphStyle
+    from reportlab.lib.units import inch
+    from reportlab.pdfbase import pdfmetrics
+    from reportlab.pdfbase.ttfonts import TTFont
+    from reportlab.platypus import Paragraph, SimpleDocTemplate, Spacer, Table, TableStyle
+    HAS_REPORTLAB = True
+except ImportError:
+    HAS_REPORTLAB = False
+
+
+# reportlab ships the Vera fonts; any TTF pair can be configured instead
+DEFAULT_FONTS = ("Vera.ttf", "VeraBd.ttf")
+PRIMARY = "#1a5f7a"
+
+_fonts = {"regular": "Helvetica", "bold": "Helvetica-Bold"}
+
+
+def init_worker(fonts=DEFAULT_FONTS):
+    """
+    Register the report fonts in this process. Falls back to the built-in
+    Helvetica if they can't be loaded.
+    """
+    regular, bold = fonts
+    try:
+        pdfmetrics.registerFont(TTFont("ReportSans", regular))
+        pdfmetrics.registerFont(TTFont("ReportSans-Bold", bold))
+        # Lets <b> in paragraphs find the bold face
+        for italic in (0, 1):
+            addMapping("ReportSans", 0, italic, "ReportSans")
+            addMapping("ReportSans", 1, italic, "ReportSans-Bold")
+        _fonts.update(regular="ReportSans", bold="ReportSans-Bold")
+    except Exception as e:
+        print(f"Report fonts unavailable, using Helvetica: {e}")
+    _layout.cache_clear()
+
+
+@lru_cache(maxsize=None)
+def _layout():
+    """Paragraph and table styles, built once per process."""
+    regular, bold = _fonts["regular"], _fonts["bold"]
+    table = TableStyle([
+        ("FONT", (0, 0), (-1, -1), regular, 9),
+        ("FONT", (0, 0), (-1, 0), bold, 9),
+        ("BACKGROUND", (0, 0), (-1, 0), colors.HexColor(PRIMARY)),
+        ("TEXTCOLOR", (0, 0), (-1, 0), colors.white),
+        ("ROWBACKGROUNDS", (0, 1), (-1, -1), [colors.white, colors.HexColor("#f5f5f5")]),
+        ("GRID", (0, 0), (-1, -1), 0.5, colors.HexColor("#dddddd")),
+        ("VALIGN", (0, 0), (-1, -1), "TOP"),
+        ("ALIGN", (1, 1), (-1, -1), "CENTER")
+    ])
+    return {
+        "title": ParagraphStyle("title", fontName=bold, fontSize=18, leading=22,
+                                textColor=colors.HexColor(PRIMARY), spaceAfter=4),
+        "subtitle": ParagraphStyle("subtitle", fontName=regular, fontSize=10, leading=13,
+                                   textColor=colors.HexColor("#666666"), spaceAfter=10),
+        "heading": ParagraphStyle("heading", fontName=bold, fontSize=13, leading=16,
+                                  textColor=colors.HexColor(PRIMARY), spaceBefore=12, spaceAfter=6),
+        "body": ParagraphStyle("body", fontName=regular, fontSize=10, leading=14),
+        "cell": ParagraphStyle("cell", fontName=regular, fontSize=9, leading=11),
+        "table": table,
+        "footer_font": regular
+    }
+
+
+def _escape(text):
+    return str(text).replace("&", "&amp;").replace("<", "&lt;").replace(">", "&gt;")
+
+
+def _table(rows, widths, layout):
+    cell = layout["cell"]
+    wrapped = [rows[0]] + [[Paragraph(_escape(row[0]), cell)] + list(row[1:]) for row in rows[1:]]
+    table = Table(wrapped, colWidths=[w * inch for w in widths], repeatRows=1)
+    table.setStyle(layout["table"])
+    return table
+
+
+def _percent(value):
+    return "" if value is None else f"{round(value)}%"
+
+
+def _footer(report, layout):
+    def draw(canvas, doc):
+        canvas.saveState()
+        canvas.setFont(layout["footer_font"], 8)
+        canvas.setFillColor(colors.HexColor("#666666"))
+        canvas.drawString(0.75 * inch, 0.5 * inch,
+                          f"Ontario Reading & Writing Assessment - {report['generated']}")
+        canvas.drawRightString(letter[0] - 0.75 * inch, 0.5 * inch, f"Page {doc.page}")
+        canvas.restoreState()
+    return draw
+
+
+def render_report(report):
+    """
+    Render one progress report.
+
+    Args:
+        report: Dict from progress_reports.build_report
+
+    Returns:
+        The PDF as bytes
+    """
+    layout = _layout()
+    story = [
+        Paragraph("Reading &amp; Writing Progress Report", layout["title"]),
+        Paragraph(f"Student: {_escape(report['student_id'])}"
+                  + (f" &nbsp;|&nbsp; Class: {_escape(report['class_id'])}" if report.get("class_id") else "")
+                  + f" &nbsp;|&nbsp; {_escape(report['generated'])}", layout["subtitle"])
+    ]
+
+    story.append(Paragraph("Reading Skills", layout["heading"]))
+    if report["skills"]:
+        rows = [["Skill", "Correct", "Average", "Recent", "Mastery"]]
+        for skill in report["skills"]:
+            mastery = skill.get("mastery")
+            rows.append([skill["name"], f"{skill['correct']}/{skill['total']}", _percent(skill["average"]),
+                         _percent(skill["rolling_average"]),
+                         "" if mastery is None else _percent(mastery * 100) + (" *" if skill.get("mastered") else "")])
+        story.append(_table(rows, (2.9, 0.9, 0.9, 0.9, 0.9), layout))
+        if any(skill.get("mastered") for skill in report["skills"]):
+            story.append(Spacer(1, 4))
+            story.append(Paragraph("* mastered", layout["cell"]))
+    else:
+        story.append(Paragraph("No reading assessments yet.", layout["body"]))
+
+    story.append(Paragraph("Writing", layout["heading"]))
+    writing = report.get("writing")
+    if writing:
+        rows = [["Rubric category", "Latest level", "Average level", "Attempts"]]
+        for category in writing["categories"]:
+            rows.append([category["label"], category.get("latest") or "",
+                         f"{category['average']:.1f}", str(category["attempts"])])
+        story.append(_table(rows, (2.9, 1.2, 1.2, 1.2), layout))
+        if writing.get("overall_level"):
+            story.append(Spacer(1, 6))
+            story.append(Paragraph(f"Latest overall level: {writing['overall_level']}", layout["body"]))
+        if writing.get("top_priority"):
+            story.append(Spacer(1, 6))
+            story.append(Paragraph(f"<b>Top priority:</b> {_escape(writing['top_priority'])}", layout["body"]))
+    else:
+        story.append(Paragraph("No writing assessments yet.", layout["body"]))
+
+    if report["recent"]:
+        story.append(Paragraph("Recent Assessments", layout["heading"]))
+        rows = [["Assessment", "Date", "Type", "Score", "Level"]]
+        for attempt in report["recent"]:
+            rows.append([attempt["title"], attempt["date"], attempt["kind"].capitalize(),
+                         _percent(attempt["score"]), attempt["level"] or ""])
+        story.append(_table(rows, (2.7, 1.1, 0.9, 0.8, 1.0), layout))
+
+    output = io.BytesIO()
+    doc = SimpleDocTemplate(output, pagesize=letter, leftMargin=0.75 * inch, rightMargin=0.75 * inch,
+                            topMargin=0.75 * inch, bottomMargin=0.85 * inch,
+                            title=f"Progress report - {report['student_id']}")
+    footer = _footer(report, layout)
+    doc.build(story, onFirstPage=footer, onLaterPages=footer)
+    return output.getvalue()
+
+
+def render_batch(reports):
+    """Render several reports in one worker call. Returns [(student_id, pdf bytes)]."""
+    return [(report["student_id"], render_report(report)) for report in reports]
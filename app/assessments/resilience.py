@@ -0,0 +1,132 @@
+"""
+Resilience Helpers for AI Calls
+Deadlines, jittered retries and a circuit breaker so a slow or failing
+Claude API cannot hold writing submissions hostage.
+"""
+
+import random
+import threading
+import time
+
+
+# Status codes worth another attempt: timeouts, conflicts, rate limits, overload
+RETRYABLE_STATUS_CODES = {408, 409, 429}
+
+
+class CircuitOpenError(Exception):
+    """Raised when a call is refused because the circuit breaker is open."""
+
+
+class CircuitBreaker:
+    """
+    Stops calling a failing dependency for a cool-down period.
+
+    After `failure_threshold` consecutive failures the breaker opens and
+    allow() returns False until `cooldown_seconds` have passed. It then lets
+    a single trial call through (half-open); success closes the breaker and
+    failure opens it again.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold=5, cooldown_seconds=60.0):
+        self.failure_threshold = failure_threshold
+        self.cooldown_seconds = cooldown_seconds
+        self.state = self.CLOSED
+        self.consecutive_failures = 0
+        self.opened_at = None
+        self.times_opened = 0
+        self.short_circuited = 0
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    def allow(self):
+        """Return True if a call may go ahead right now."""
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.OPEN and time.monotonic() - self.opened_at >= self.cooldown_seconds:
+                self.state = self.HALF_OPEN
+            if self.state == self.HALF_OPEN and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return True
+            self.short_circuited += 1
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.state = self.CLOSED
+            self.consecutive_failures = 0
+            self.opened_at = None
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self.consecutive_failures += 1
+            self._trial_in_flight = False
+            if self.state == self.HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+                if self.state != self.OPEN:
+                    self.times_opened += 1
+                self.state = self.OPEN
+                self.opened_at = time.monotonic()
+
+    def snapshot(self):
+        """Return the breaker's state for health reporting."""
+        with self._lock:
+            retry_in = None
+            if self.state == self.OPEN:
+                retry_in = round(max(0.0, self.cooldown_seconds - (time.monotonic() - self.opened_at)), 1)
+            return {
+                "state": self.state,
+                "consecutive_failures": self.consecutive_failures,
+                "failure_threshold": self.failure_threshold,
+                "cooldown_seconds": self.cooldown_seconds,
+                "retry_in_seconds": retry_in,
+                "times_opened": self.times_opened,
+                "short_circuited_calls": self.short_circuited
+            }
+
+
+def is_retryable_error(error):
+    """Return True for transient API failures: timeouts, dropped connections, 429 and 5xx."""
+    status = getattr(error, 'status_code', None)
+    if status is not None:
+        return status in RETRYABLE_STATUS_CODES or status >= 500
+    # Connection and timeout errors carry no status code
+    return type(error).__name__ in ('APIConnectionError', 'APITimeoutError')
+
+
+def backoff_delay(attempt, base_delay, max_delay):
+    """Full-jitter exponential backoff: uniform in [0, min(max, base * 2**attempt)]."""
+    return random.uniform(0, min(max_delay, base_delay * (2 ** attempt)))
+
+
+def call_with_retries(func, max_retries, deadline_seconds, base_delay=0.5, max_delay=4.0,
+                      is_retryable=is_retryable_error):
+    """
+    Call func(timeout) with bounded, jittered retries inside an overall deadline.
+
+    func receives the seconds left before the deadline so it can pass a
+    matching per-attempt timeout to the client.
+
+    Raises:
+        The last error if it is not retryable, retries are used up, or the
+        next backoff would run past the deadline
+    """
+    deadline = time.monotonic() + deadline_seconds
+    attempt = 0
+    while True:
+        remaining = deadline - time.monotonic()
+        try:
+            return func(remaining)
+        except Exception as e:
+            if attempt >= max_retries or not is_retryable(e):
+                raise
+            delay = backoff_delay(attempt, base_delay, max_delay)
+            if time.monotonic() + delay >= deadline:
+                raise
+            print(f"AI call failed ({e}); retrying in {delay:.2f}s")
+            time.sleep(delay)
+            attempt += 1
@@ -0,0 +1,137 @@
+"""
+Reading Response Log
+Append-only record of every set of reading answers that gets graded.
+
+Each graded test (single student or batch upload) adds one JSON line with
+the passage id and the chosen answers. Item analysis and calibration read
+the log back; reads are incremental, so only lines appended since the last
+read are parsed.
+
+Configuration (environment variables):
+    RESPONSE_LOG_ENABLED  Set to 0 to stop recording responses (default 1)
+    RESPONSE_LOG_PATH     JSON Lines file (default instance/reading_responses.jsonl)
+"""
+
+import json
+import os
+import threading
+import time
+
+from app.assessments.evaluation_cache import INSTANCE_DIR
+
+
+DEFAULT_LOG_PATH = os.path.join(INSTANCE_DIR, 'reading_responses.jsonl')
+
+
+class ResponseLog:
+    """Thread-safe JSON Lines log of reading answers, grouped by passage when read."""
+
+    def __init__(self, path):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._write_lock = threading.Lock()
+        self._read_lock = threading.Lock()
+        self._offset = 0
+        self._responses = {}
+        self._student_ids = {}
+
+    def append(self, passage_id, answers, student_id=None, source="single"):
+        """Record one student's answers to a passage."""
+        self.append_many(passage_id, [(student_id, answers)], source=source)
+
+    def append_many(self, passage_id, students, source="batch"):
+        """
+        Record several students' answers to one passage in a single write.
+
+        Args:
+            passage_id: ID of the passage
+            students: Iterable of (student_id, answers) pairs
+            source: Where the answers came from ("single" or "batch")
+        """
+        now = round(time.time(), 3)
+        lines = []
+        for student_id, answers in students:
+            record = {"ts": now, "passage_id": passage_id, "answers": answers, "source": source}
+            if student_id is not None:
+                record["student_id"] = student_id
+            lines.append(json.dumps(record, separators=(',', ':')) + "\n")
+        if not lines:
+            return
+        with self._write_lock, open(self.path, 'a', encoding='utf-8') as f:
+            f.write("".join(lines))
+
+    def responses(self, passage_id=None):
+        """
+        Return the logged answers, reading only what was appended since last time.
+
+        Args:
+            passage_id: Optional passage to return; all passages if omitted
+
+        Returns:
+            List of answer dicts for one passage, or a dict mapping each
+            passage id to its list
+        """
+        with self._read_lock:
+            self._read_new_lines()
+            if passage_id is not None:
+                return list(self._responses.get(passage_id, ()))
+            return {pid: list(answers) for pid, answers in self._responses.items()}
+
+    def records(self):
+        """
+        Return every logged response with its student id.
+
+        Returns:
+            List of (passage_id, student_id, answers); student_id is None
+            for anonymous responses
+        """
+        with self._read_lock:
+            self._read_new_lines()
+            return [
+                (passage_id, student_id, answers)
+                for passage_id, responses in self._responses.items()
+                for student_id, answers in zip(self._student_ids[passage_id], responses)
+            ]
+
+    def _read_new_lines(self):
+        try:
+            with open(self.path, 'rb') as f:
+                f.seek(self._offset)
+                data = f.read()
+        except FileNotFoundError:
+            return
+        # Leave a partly written final line for the next read
+        end = data.rfind(b"\n") + 1
+        self._offset += end
+        for line in data[:end].splitlines():
+            try:
+                record = json.loads(line)
+                passage_id, answers = record["passage_id"], record["answers"]
+            except (ValueError, KeyError, TypeError):
+                continue
+            if not isinstance(answers, dict):
+                continue
+            self._responses.setdefault(passage_id, []).append(answers)
+            self._student_ids.setdefault(passage_id, []).append(record.get("student_id"))
+
+
+_log = None
+_log_lock = threading.Lock()
+
+
+def get_response_log():
+    """Return the process-wide response log, or None if recording is disabled."""
+    global _log
+    if os.environ.get('RESPONSE_LOG_ENABLED', '1') in ('0', 'false', 'False', ''):
+        return None
+    if _log is None:
+        with _log_lock:
+            if _log is None:
+                try:
+                    _log = ResponseLog(os.environ.get('RESPONSE_LOG_PATH', DEFAULT_LOG_PATH))
+                except OSError as e:
+                    print(f"Response log unavailable: {e}")
+                    return None
+    return _log
@@ -0,0 +1,389 @@
+"""
+Results Store
+Durable history of every graded reading test and writing evaluation.
+
+Submit handlers only put a record on an in-memory queue; a background
+writer thread takes whatever has accumulated and inserts it in one
+transaction, so no request ever waits on the disk. The database runs in
+WAL mode with synchronous=NORMAL: readers never block the writer, and a
+commit does not fsync (a power cut can lose the last moments of results,
+never corrupt the file). Records still queued when the process exits are
+flushed at exit.
+
+Attempts are indexed by student, by class, by passage or prompt, and by
+time, so history queries stay fast as the table grows. Each batch also
+updates the per-student and per-class progress rollups (see rollups.py) in
+the same transaction, so the progress dashboard never rescans history.
+
+Configuration (environment variables):
+    RESULTS_STORE_ENABLED   Set to 0 to stop saving results (default 1)
+    RESULTS_DB_PATH         SQLite file (default instance/results.sqlite3)
+    RESULTS_BATCH_SIZE      Most records written per transaction (default 500)
+    RESULTS_FLUSH_INTERVAL  Seconds the writer waits to fill a batch (default 0.25)
+    RESULTS_QUEUE_SIZE      Records held in memory before new ones are dropped (default 10000)
+    RESULTS_ROLLING_WEIGHT  How much each new attempt moves a rolling average (default 0.3)
+"""
+
+import atexit
+import json
+import os
+import queue
+import sqlite3
+import threading
+import time
+
+from app.assessments import rollups
+from app.assessments.evaluation_cache import INSTANCE_DIR
+
+
+DEFAULT_DB_PATH = os.path.join(INSTANCE_DIR, 'results.sqlite3')
+DEFAULT_BATCH_SIZE = 500
+DEFAULT_FLUSH_INTERVAL = 0.25
+DEFAULT_QUEUE_SIZE = 10000
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS attempts (
+    id INTEGER PRIMARY KEY,
+    kind TEXT NOT NULL,
+    item_id TEXT NOT NULL,
+    student_id TEXT,
+    class_id TEXT,
+    score REAL,
+    level TEXT,
+    created_at REAL NOT NULL,
+    result TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_attempts_student ON attempts (student_id, created_at);
+CREATE INDEX IF NOT EXISTS idx_attempts_class ON attempts (class_id, created_at);
+CREATE INDEX IF NOT EXISTS idx_attempts_item ON attempts (kind, item_id, created_at);
+CREATE INDEX IF NOT EXISTS idx_attempts_created ON attempts (created_at);
+"""
+
+# The score and level columns, by kind of result
+SUMMARY_FIELDS = {
+    "reading": ("score_percentage", "achievement_level"),
+    "adaptive": ("score_percentage", "achievement_level"),
+    "writing": ("overall_percentage", "overall_level")
+}
+
+
+def summarize_result(kind, result):
+    """Return the (score, level) stored alongside a result for quick listing."""
+    if kind == "writing":
+        result = result.get("evaluation", result)
+    score_field, level_field = SUMMARY_FIELDS.get(kind, (None, None))
+    score = result.get(score_field) if score_field else None
+    level = result.get(level_field) if level_field else None
+    if isinstance(level, int):
+        # Writing levels are bare numbers; reading levels are already labelled
+        level = f"Level {level}"
+    return score, level
+
+
+class ResultsStore:
+    """SQLite results history with a batched background writer."""
+
+    def __init__(self, path=DEFAULT_DB_PATH, batch_size=DEFAULT_BATCH_SIZE,
+                 flush_interval=DEFAULT_FLUSH_INTERVAL, max_queue=DEFAULT_QUEUE_SIZE,
+                 rolling_weight=rollups.DEFAULT_ROLLING_WEIGHT):
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.rolling_weight = rolling_weight
+        self.written = 0
+        self.dropped = 0
+        self.batches = 0
+        self.last_batch = {"records": 0, "seconds": 0.0}
+        self._queue = queue.Queue(maxsize=max_queue)
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._write_conn = self._connect()
+        self._write_conn.executescript(SCHEMA + rollups.SCHEMA)
+        self._write_conn.commit()
+        self._write_lock = threading.Lock()
+        self._backfill_rollups()
+        self._read_conn = self._connect()
+        self._read_lock = threading.Lock()
+
+        self._writer = threading.Thread(target=self._write_loop, name="results-writer", daemon=True)
+        self._writer.start()
+        atexit.register(self.flush)
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=10, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    def _backfill_rollups(self):
+        # Databases saved before rollups existed have history but no rollups
+        conn = self._write_conn
+        if conn.execute("SELECT 1 FROM rollups LIMIT 1").fetchone() is None and \
+                conn.execute("SELECT 1 FROM attempts WHERE student_id IS NOT NULL"
+                             " OR class_id IS NOT NULL LIMIT 1").fetchone() is not None:
+            replayed = self.rebuild_rollups()
+            print(f"Built progress rollups from {replayed} saved results")
+
+    def rebuild_rollups(self):
+        """Recompute all progress rollups from the saved attempts. Returns the attempts replayed."""
+        with self._write_lock, self._write_conn:
+            return rollups.rebuild(self._write_conn, self.rolling_weight)
+
+    def record(self, kind, item_id, result, student_id=None, class_id=None):
+        """
+        Queue one result to be saved. Never blocks.
+
+        Args:
+            kind: "reading", "adaptive" or "writing"
+            item_id: Passage or prompt id
+            result: The result dict returned to the student
+            student_id: Optional student identifier
+            class_id: Optional class identifier
+
+        Returns:
+            False if the queue was full and the result was dropped
+        """
+        try:
+            self._queue.put_nowait({
+                "kind": kind,
+                "item_id": item_id,
+                "student_id": student_id or None,
+                "class_id": class_id or None,
+                "created_at": time.time(),
+                "result": result
+            })
+            return True
+        except queue.Full:
+            self.dropped += 1
+            if self.dropped % 1000 == 1:
+                print(f"Results queue full; {self.dropped} results dropped so far")
+            return False
+
+    def flush(self, timeout=None):
+        """Block until everything queued so far has been written."""
+        if timeout is None:
+            self._queue.join()
+            return True
+        deadline = time.monotonic() + timeout
+        while self._queue.unfinished_tasks:
+            if time.monotonic() > deadline:
+                return False
+            time.sleep(0.01)
+        return True
+
+    def _write_loop(self):
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            try:
+                self._write(batch)
+            except Exception as e:
+                print(f"Results store write failed; {len(batch)} results lost: {e}")
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    def _write(self, batch):
+        started = time.perf_counter()
+        rows = []
+        for record in batch:
+            score, level = summarize_result(record["kind"], record["result"])
+            rows.append((record["kind"], record["item_id"], record["student_id"], record["class_id"],
+                         score, level, record["created_at"],
+                         json.dumps(record["result"], separators=(',', ':'))))
+        conn = self._write_conn
+        with self._write_lock, conn:
+            conn.executemany(
+                "INSERT INTO attempts (kind, item_id, student_id, class_id, score, level, created_at, result)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?)", rows
+            )
+            rollups.apply(conn, batch, self.rolling_weight)
+        self.written += len(batch)
+        self.batches += 1
+        self.last_batch = {"records": len(batch), "seconds": round(time.perf_counter() - started, 4)}
+
+    def history(self, student_id=None, class_id=None, kind=None, item_id=None,
+                since=None, limit=50, include_result=False):
+        """
+        Return saved attempts, newest first.
+
+        Args:
+            student_id, class_id, kind, item_id: Optional filters
+            since: Only attempts at or after this Unix time
+            limit: Most attempts to return
+            include_result: Include each attempt's full result dict
+
+        Returns:
+            List of attempt dicts
+        """
+        clauses, params = [], []
+        for column, value in (("student_id", student_id), ("class_id", class_id),
+                              ("kind", kind), ("item_id", item_id)):
+            if value is not None:
+                clauses.append(f"{column} = ?")
+                params.append(value)
+        if since is not None:
+            clauses.append("created_at >= ?")
+            params.append(since)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        columns = "id, kind, item_id, student_id, class_id, score, level, created_at"
+        if include_result:
+            columns += ", result"
+        params.append(limit)
+        with self._read_lock:
+            rows = self._read_conn.execute(
+                f"SELECT {columns} FROM attempts {where} ORDER BY created_at DESC LIMIT ?", params
+            ).fetchall()
+
+        attempts = []
+        for row in rows:
+            attempt = {
+                "id": row[0],
+                "kind": row[1],
+                "item_id": row[2],
+                "student_id": row[3],
+                "class_id": row[4],
+                "score": row[5],
+                "level": row[6],
+                "created_at": row[7]
+            }
+            if include_result:
+                attempt["result"] = json.loads(row[8])
+            attempts.append(attempt)
+        return attempts
+
+    def get(self, attempt_id):
+        """Return one attempt with its full result, or None."""
+        with self._read_lock:
+            row = self._read_conn.execute(
+                "SELECT id, kind, item_id, student_id, class_id, score, level, created_at, result"
+                " FROM attempts WHERE id = ?", (attempt_id,)
+            ).fetchone()
+        if row is None:
+            return None
+        keys = ("id", "kind", "item_id", "student_id", "class_id", "score", "level", "created_at")
+        attempt = dict(zip(keys, row[:8]))
+        attempt["result"] = json.loads(row[8])
+        return attempt
+
+    def students(self, class_id=None):
+        """Return the sorted ids of students with saved attempts, optionally in one class."""
+        query = "SELECT DISTINCT student_id FROM attempts WHERE student_id IS NOT NULL"
+        params = []
+        if class_id is not None:
+            query += " AND class_id = ?"
+            params.append(class_id)
+        with self._read_lock:
+            return sorted(row[0] for row in self._read_conn.execute(query, params))
+
+    def seen_items(self, student_id, kind=None):
+        """Return the set of passage or prompt ids a student has attempts for."""
+        query = "SELECT DISTINCT item_id FROM attempts WHERE student_id = ?"
+        params = [student_id]
+        if kind is not None:
+            query += " AND kind = ?"
+            params.append(kind)
+        with self._read_lock:
+            return {row[0] for row in self._read_conn.execute(query, params)}
+
+    def replay(self, kinds=None, student_id=None, class_id=None, since=None, until=None, chunk_size=1000):
+        """
+        Yield saved attempts with their full results, oldest first, reading
+        chunk_size rows at a time so any amount of history can be walked in
+        constant memory.
+
+        Args:
+            kinds: Only attempts of these kinds (default all)
+            student_id, class_id: Optional filters
+            since, until: Only attempts in this range of Unix times
+            chunk_size: Rows read per query
+        """
+        clauses, params = [], []
+        if kinds:
+            clauses.append(f"kind IN ({', '.join('?' for _ in kinds)})")
+            params.extend(kinds)
+        for column, value in (("student_id", student_id), ("class_id", class_id)):
+            if value is not None:
+                clauses.append(f"{column} = ?")
+                params.append(value)
+        if since is not None:
+            clauses.append("created_at >= ?")
+            params.append(since)
+        if until is not None:
+            clauses.append("created_at < ?")
+            params.append(until)
+        where = "".join(f" AND {clause}" for clause in clauses)
+        last = (float('-inf'), 0)
+        while True:
+            with self._read_lock:
+                rows = self._read_conn.execute(
+                    "SELECT id, kind, item_id, student_id, class_id, score, level, created_at, result"
+                    f" FROM attempts WHERE (created_at, id) > (?, ?){where} ORDER BY created_at, id LIMIT ?",
+                    (*last, *params, chunk_size)
+                ).fetchall()
+            if not rows:
+                return
+            for row in rows:
+                yield {"id": row[0], "kind": row[1], "item_id": row[2], "student_id": row[3],
+                       "class_id": row[4], "score": row[5], "level": row[6], "created_at": row[7],
+                       "result": json.loads(row[8])}
+            last = (rows[-1][7], rows[-1][0])
+
+    def progress(self, student_id=None, class_id=None):
+        """
+        Return the progress rollups for one student, or for one class if no
+        student is given. Reads one row per skill and rubric category.
+
+        Returns:
+            {"skills": [...], "categories": [...]}; see rollups.progress
+        """
+        scope, scope_id = ("student", student_id) if student_id else ("class", class_id)
+        with self._read_lock:
+            return rollups.progress(self._read_conn, scope, scope_id)
+
+    def stats(self):
+        """Return queue depth and writer counters."""
+        return {
+            "queued": self._queue.qsize(),
+            "written": self.written,
+            "dropped": self.dropped,
+            "batches": self.batches,
+            "last_batch": self.last_batch
+        }
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_results_store():
+    """Return the process-wide results store, or None if saving is disabled."""
+    global _store
+    if os.environ.get('RESULTS_STORE_ENABLED', '1') in ('0', 'false', 'False', ''):
+        return None
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                try:
+                    _store = ResultsStore(
+                        path=os.environ.get('RESULTS_DB_PATH', DEFAULT_DB_PATH),
+                        batch_size=int(os.environ.get('RESULTS_BATCH_SIZE', DEFAULT_BATCH_SIZE)),
+                        flush_interval=float(os.environ.get('RESULTS_FLUSH_INTERVAL', DEFAULT_FLUSH_INTERVAL)),
+                        max_queue=int(os.environ.get('RESULTS_QUEUE_SIZE', DEFAULT_QUEUE_SIZE)),
+                        rolling_weight=float(os.environ.get('RESULTS_ROLLING_WEIGHT',
+                                                            rollups.DEFAULT_ROLLING_WEIGHT))
+                    )
+                except (OSError, sqlite3.Error) as e:
+                    print(f"Results store unavailable: {e}")
+                    return None
+    return _store
@@ -0,0 +1,193 @@
+"""
+Progress Rollups
+Per-student and per-class progress in each reading skill and writing rubric
+category, kept up to date as results are saved.
+
+Each rollup row holds running totals for one (student or class, skill or
+category): how many attempts touched it, how many questions were answered
+correctly out of how many, the sum of the scores, and a rolling average that
+weights recent attempts more heavily. The rolling average moves each new
+score in with weight max(RESULTS_ROLLING_WEIGHT, 1/attempts), so it is the
+plain average over the first few attempts instead of being anchored to the
+very first one.
+
+The results store folds every batch of new attempts into these rows inside
+the same transaction that saves the attempts, so the rollups never disagree
+with the history, and reading a dashboard touches one row per skill however
+long the history grows.
+
+Scores are in their own units: reading skills in percent correct, writing
+categories as a rubric level from 1 to 4. For writing categories "correct"
+counts the attempts at Level 3 or above (the provincial standard).
+"""
+
+import json
+
+from app.assessments.writing import CATEGORY_NAMES
+
+
+DEFAULT_ROLLING_WEIGHT = 0.3
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS rollups (
+    scope TEXT NOT NULL,
+    scope_id TEXT NOT NULL,
+    dimension TEXT NOT NULL,
+    name TEXT NOT NULL,
+    attempts INTEGER NOT NULL,
+    correct INTEGER NOT NULL,
+    total INTEGER NOT NULL,
+    score_sum REAL NOT NULL,
+    rolling REAL NOT NULL,
+    last_score REAL NOT NULL,
+    first_at REAL NOT NULL,
+    last_at REAL NOT NULL,
+    PRIMARY KEY (scope, scope_id, dimension, name)
+) WITHOUT ROWID;
+"""
+
+COLUMNS = ("attempts", "correct", "total", "score_sum", "rolling", "last_score", "first_at", "last_at")
+
+
+def observations(kind, result):
+    """
+    Yield (dimension, name, score, correct, total) for each skill or rubric
+    category one result measures.
+    """
+    if kind == "writing":
+        categories = result.get("evaluation", result).get("categories") or {}
+        for key, category in categories.items():
+            level = category.get("level") if isinstance(category, dict) else None
+            if isinstance(level, (int, float)):
+                yield "category", key, float(level), 1 if level >= 3 else 0, 1
+        return
+
+    for skill, data in (result.get("skill_breakdown") or {}).items():
+        total = data.get("total") or 0
+        if total:
+            correct = data.get("correct") or 0
+            yield "skill", skill, correct / total * 100, correct, total
+
+
+def _scopes(record):
+    if record.get("student_id"):
+        yield "student", record["student_id"]
+    if record.get("class_id"):
+        yield "class", record["class_id"]
+
+
+def apply(conn, batch, weight=DEFAULT_ROLLING_WEIGHT):
+    """
+    Fold a batch of newly saved attempts into the rollups.
+
+    Runs inside the caller's transaction. Each affected row is read and
+    written once per batch, however many of the batch's attempts touch it.
+
+    Args:
+        conn: SQLite connection holding the rollups table
+        batch: Records with kind, student_id, class_id, created_at and result,
+            oldest first
+        weight: Least weight a new attempt has in the rolling average (0-1)
+
+    Returns:
+        Number of rollup rows written
+    """
+    pending = {}
+    for record in batch:
+        scopes = list(_scopes(record))
+        if not scopes:
+            continue
+        at = record["created_at"]
+        for dimension, name, score, correct, total in observations(record["kind"], record["result"]):
+            for scope, scope_id in scopes:
+                key = (scope, scope_id, dimension, name)
+                row = pending.get(key)
+                if row is None:
+                    existing = conn.execute(
+                        f"SELECT {', '.join(COLUMNS)} FROM rollups"
+                        " WHERE scope = ? AND scope_id = ? AND dimension = ? AND name = ?", key
+                    ).fetchone()
+                    row = pending[key] = list(existing) if existing else [0, 0, 0, 0.0, score, score, at, at]
+                row[0] += 1
+                row[1] += correct
+                row[2] += total
+                row[3] += score
+                row[4] += max(weight, 1 / row[0]) * (score - row[4])
+                row[5] = score
+                row[7] = at
+
+    if pending:
+        conn.executemany(
+            f"INSERT OR REPLACE INTO rollups (scope, scope_id, dimension, name, {', '.join(COLUMNS)})"
+            " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            [key + tuple(row) for key, row in pending.items()]
+        )
+    return len(pending)
+
+
+def rebuild(conn, weight=DEFAULT_ROLLING_WEIGHT, chunk_size=1000):
+    """
+    Recompute every rollup from the saved attempts, oldest first.
+
+    Runs inside the caller's transaction.
+
+    Returns:
+        Number of attempts replayed
+    """
+    conn.execute("DELETE FROM rollups")
+    cursor = conn.execute(
+        "SELECT kind, student_id, class_id, created_at, result FROM attempts"
+        " WHERE student_id IS NOT NULL OR class_id IS NOT NULL ORDER BY created_at, id"
+    )
+    replayed = 0
+    while True:
+        rows = cursor.fetchmany(chunk_size)
+        if not rows:
+            return replayed
+        # Fully read the chunk before writing, so the open cursor is left alone
+        batch = [{"kind": kind, "student_id": student_id, "class_id": class_id,
+                  "created_at": created_at, "result": json.loads(result)}
+                 for kind, student_id, class_id, created_at, result in rows]
+        apply(conn, batch, weight)
+        replayed += len(batch)
+
+
+def progress(conn, scope, scope_id):
+    """
+    Return the rollups for one student or class.
+
+    Args:
+        conn: SQLite connection holding the rollups table
+        scope: "student" or "class"
+        scope_id: The student or class id
+
+    Returns:
+        {"skills": [...], "categories": [...]}, each a list of rollup dicts
+        sorted by name
+    """
+    rows = conn.execute(
+        f"SELECT dimension, name, {', '.join(COLUMNS)} FROM rollups"
+        " WHERE scope = ? AND scope_id = ? ORDER BY dimension, name", (scope, scope_id)
+    ).fetchall()
+
+    report = {"skills": [], "categories": []}
+    for row in rows:
+        dimension, name = row[0], row[1]
+        values = dict(zip(COLUMNS, row[2:]))
+        attempts = values["attempts"]
+        average = values["score_sum"] / attempts
+        entry = {
+            "name": name,
+            "label": CATEGORY_NAMES.get(name, name) if dimension == "category" else name,
+            "attempts": attempts,
+            "correct": values["correct"],
+            "total": values["total"],
+            "average": round(average, 2),
+            "rolling_average": round(values["rolling"], 2),
+            "trend": round(values["rolling"] - average, 2),
+            "last_score": round(values["last_score"], 2),
+            "first_at": values["first_at"],
+            "last_at": values["last_at"]
+        }
+        report["skills" if dimension == "skill" else "categories"].append(entry)
+    return report
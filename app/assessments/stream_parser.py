@@ -0,0 +1,83 @@
+"""
+Incremental Evaluation Parser
+Reads the evaluation JSON as it streams from Claude and reports each rubric
+category as soon as its object is complete, so feedback can be shown before
+the whole response has been generated.
+"""
+
+import json
+
+
+class IncrementalEvaluationParser:
+    """
+    Scans streamed text for completed objects under "categories".
+
+    Feed text chunks in order with feed(); each call returns the
+    (category_key, category_dict) pairs that finished in that chunk. Any
+    prose before the opening brace is ignored.
+    """
+
+    def __init__(self, container_key="categories"):
+        self.container_key = container_key
+        self.buffer = ""
+        self._pos = 0
+        self._in_string = False
+        self._escaped = False
+        self._string_start = None
+        self._last_string = None
+        self._pending_key = None
+        # One (key, start_index) entry per open object or array
+        self._stack = []
+
+    def feed(self, chunk):
+        """Consume a chunk of streamed text and return newly completed categories."""
+        self.buffer += chunk
+        completed = []
+        buffer = self.buffer
+
+        for i in range(self._pos, len(buffer)):
+            char = buffer[i]
+
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif char == '\\':
+                    self._escaped = True
+                elif char == '"':
+                    self._in_string = False
+                    self._last_string = buffer[self._string_start:i + 1]
+                continue
+
+            if not self._stack and char != '{':
+                continue
+
+            if char == '"':
+                self._in_string = True
+                self._string_start = i
+            elif char == ':':
+                self._pending_key = self._decode_key(self._last_string)
+            elif char in '{[':
+                self._stack.append((self._pending_key, i))
+                self._pending_key = None
+            elif char in '}]':
+                key, start = self._stack.pop()
+                if (char == '}' and len(self._stack) == 2
+                        and self._stack[1][0] == self.container_key):
+                    try:
+                        completed.append((key, json.loads(buffer[start:i + 1])))
+                    except json.JSONDecodeError:
+                        pass
+            elif char == ',':
+                self._pending_key = None
+
+        self._pos = len(buffer)
+        return completed
+
+    @staticmethod
+    def _decode_key(raw):
+        if raw is None:
+            return None
+        try:
+            return json.loads(raw)
+        except json.JSONDecodeError:
+            return None
@@ -5,8 +5,11 @@ Aligned with Ontario Language Curriculum Grade 7-8
 Embeds structured thinking principles to develop logical communication skills.
 """
 
+from functools import lru_cache
+
 from app.curriculum import WRITING_EXPECTATIONS, WRITING_RUBRIC, ACHIEVEMENT_LEVELS
-from app.assessments.ai_evaluator import AIEvaluator
+from app.assessments.catalog import freeze
+from app.assessments.text_analysis import analyze_text
 
 
 # Think First Framework - guides students through structured planning
@@ -38,18 +41,135 @@ THINK_FIRST_FRAMEWORK = {
     }
 }
 
+# Assessment rubric, keyed the same way as the categories in an evaluation
+RUBRIC_CATEGORIES = {
+    "main_message": {
+        "name": "Main Message & Focus",
+        "weight": "25%",
+        "description": "Is the main point clear from the start?",
+        "levels": {
+            "Level 4 (80-100%)": "Main message is crystal clear from the opening; reader immediately understands the point",
+            "Level 3 (70-79%)": "Main message is clear and stated early in the writing",
+            "Level 2 (60-69%)": "Main message is present but may be buried or unclear",
+            "Level 1 (50-59%)": "Main message is missing or very difficult to identify"
+        }
+    },
+    "logical_structure": {
+        "name": "Logical Structure",
+        "weight": "25%",
+        "description": "Do supporting points clearly connect to the main message?",
+        "levels": {
+            "Level 4 (80-100%)": "Each paragraph directly answers 'why?' or 'how?' about the main message; points are distinct and complete",
+            "Level 3 (70-79%)": "Supporting points connect to main message with clear logic",
+            "Level 2 (60-69%)": "Some connection between points and main message, but logic may be unclear",
+            "Level 1 (50-59%)": "Points seem disconnected or don't clearly support the main message"
+        }
+    },
+    "grouping": {
+        "name": "Grouping & Completeness",
+        "weight": "25%",
+        "description": "Are ideas grouped well? Do they cover everything important without repeating?",
+        "levels": {
+            "Level 4 (80-100%)": "Ideas are perfectly grouped; no overlap between points; nothing important is missing",
+            "Level 3 (70-79%)": "Ideas are well-grouped with minimal overlap; covers main points",
+            "Level 2 (60-69%)": "Some grouping attempted but ideas may overlap or important points may be missing",
+            "Level 1 (50-59%)": "Ideas are jumbled, repetitive, or major points are missing"
+        }
+    },
+    "conventions": {
+        "name": "Conventions & Clarity",
+        "weight": "25%",
+        "description": "Is the writing clear and error-free?",
+        "levels": {
+            "Level 4 (80-100%)": "Virtually no errors; writing is exceptionally clear",
+            "Level 3 (70-79%)": "Few errors that don't impede understanding",
+            "Level 2 (60-69%)": "Some errors that may impede understanding",
+            "Level 1 (50-59%)": "Frequent errors that significantly impede understanding"
+        }
+    }
+}
+
+# Rubric category keys as shown to students
+CATEGORY_NAMES = {
+    "main_message": "Clear Main Message",
+    "logical_structure": "Logical Flow",
+    "grouping": "Well-Organized Ideas",
+    "conventions": "Writing Quality"
+}
+
+# Questions to help students check their logical structure
+STRUCTURE_CHECK_QUESTIONS = [
+    "Can you state your main message in ONE sentence? Is that sentence in your opening?",
+    "For each paragraph: what ONE point does it make? Write it in the margin.",
+    "Do your paragraph points answer 'why?' or 'how?' about your main message?",
+    "Look at your paragraph points: are they all different, or do some repeat the same idea?",
+    "Together, do your points cover everything important? Is anything major missing?",
+    "Can a reader follow your logic from start to finish without getting confused?"
+]
+
+# Universal self-assessment questions, followed by those for each writing type
+SELF_ASSESSMENT_QUESTIONS = [
+    "Is my main message/point clear in the first paragraph?",
+    "Does each paragraph have ONE clear purpose?",
+    "Does each paragraph support my main message?",
+    "Are my supporting points different from each other (no repeating)?",
+    "Together, do my points cover everything important?",
+    "Can readers follow my logic from beginning to end?",
+    "Did I proofread for spelling and grammar errors?"
+]
+
+TYPE_SELF_ASSESSMENT_QUESTIONS = {
+    "Narrative Writing": [
+        "Does my opening hook show why this story matters?",
+        "Does every scene connect to the main change/lesson?",
+        "Are my events in an order that makes sense?",
+        "Does my ending connect back to my opening?"
+    ],
+    "Opinion/Persuasive Writing": [
+        "Is my position stated clearly in the first paragraph?",
+        "Is each reason a DIFFERENT type of argument?",
+        "Does each reason directly answer 'why is my position correct?'",
+        "Did I address the other side of the argument?"
+    ],
+    "Informational/Explanatory Writing": [
+        "Did I start with what readers will achieve?",
+        "Are my steps grouped into logical stages (not just listed)?",
+        "Does each stage answer 'how?' about reaching the goal?",
+        "Are my stages in an order that builds logically?"
+    ],
+    "Response to Reading": [
+        "Did I lead with my main insight (not bury it)?",
+        "Is each point a different way the text affected me?",
+        "Do my points together explain my full insight?",
+        "Did I use specific evidence from the text?"
+    ],
+    "Problem-Solution Writing": [
+        "Did I clearly explain the situation before the problem?",
+        "Is it clear WHY this situation is a problem?",
+        "Is my solution stated clearly before my reasons?",
+        "Does each reason answer 'why would this solution work?'"
+    ]
+}
+
 
 class WritingAssessment:
     """Handles writing assessments with curriculum-aligned rubrics and structured thinking."""
 
     def __init__(self):
-        self.prompts = self._load_prompts()
+        self.prompts = get_prompt_catalog()
         self.rubric = WRITING_RUBRIC
         self.think_first = THINK_FIRST_FRAMEWORK
-        self.ai_evaluator = AIEvaluator()
+        # Imported here because the evaluator's prompt is built from this module's rubric
+        from app.assessments.ai_evaluator import get_evaluator
+        self.ai_evaluator = get_evaluator()
+
+    @staticmethod
+    def _load_prompts():
+        """
+        Build writing prompts aligned with Ontario curriculum and structured thinking.
 
-    def _load_prompts(self):
-        """Load writing prompts aligned with Ontario curriculum and structured thinking."""
+        Only meant to be called once per process; use get_prompt_catalog() instead.
+        """
         return {
             "narrative_1": {
                 "id": "narrative_1",
@@ -371,17 +491,19 @@ Your essay should be 4-5 paragraphs in length.
         """Get a specific prompt by ID."""
         prompt = self.prompts.get(prompt_id)
         if prompt:
-            # Add the Think First framework to the prompt
-            prompt["think_first_framework"] = self.think_first
+            # Add the Think First framework without touching the shared catalog
+            prompt = dict(prompt, think_first_framework=self.think_first)
         return prompt
 
-    def evaluate_writing(self, prompt_id, response_text):
+    def evaluate_writing(self, prompt_id, response_text, on_category=None):
         """
         Evaluate student writing using AI assessment.
 
         Args:
             prompt_id: ID of the writing prompt
             response_text: Student's written response
+            on_category: Optional callback(category_key, category_dict) fired
+                as each rubric category of the AI feedback is ready
 
         Returns:
             Assessment with scores, feedback, and improvement suggestions
@@ -390,13 +512,8 @@ Your essay should be 4-5 paragraphs in length.
         if not prompt:
             return {"error": "Prompt not found"}
 
-        # Basic text analysis
-        words = response_text.split()
-        word_count = len(words)
-        sentences = response_text.replace('!', '.').replace('?', '.').split('.')
-        sentence_count = len([s for s in sentences if s.strip()])
-        paragraphs = response_text.split('\n\n')
-        paragraph_count = len([p for p in paragraphs if p.strip()])
+        # One pass over the text; the evaluator reuses these metrics
+        metrics = analyze_text(response_text)
 
         # Get AI evaluation
         prompt_info = {
@@ -405,20 +522,20 @@ Your essay should be 4-5 paragraphs in length.
             "word_minimum": prompt["word_minimum"],
             "word_maximum": prompt["word_maximum"]
         }
-        ai_evaluation = self.ai_evaluator.evaluate_writing(response_text, prompt_info)
+        ai_evaluation = self.ai_evaluator.evaluate_writing(
+            response_text, prompt_info, on_category=on_category, metrics=metrics
+        )
 
         # Build results
         results = {
             "prompt_id": prompt_id,
             "prompt_title": prompt["title"],
             "prompt_type": prompt["type"],
-            "text_metrics": {
-                "word_count": word_count,
-                "sentence_count": sentence_count,
-                "paragraph_count": paragraph_count,
-                "word_minimum": prompt["word_minimum"],
-                "word_maximum": prompt["word_maximum"]
-            },
+            "text_metrics": dict(
+                metrics.to_dict(),
+                word_minimum=prompt["word_minimum"],
+                word_maximum=prompt["word_maximum"]
+            ),
             "evaluation": ai_evaluation,
             "ai_powered": self.ai_evaluator.is_available()
         }
@@ -429,112 +546,29 @@ Your essay should be 4-5 paragraphs in length.
         """Get assessment rubric with structured thinking criteria."""
         return {
             "categories": [
-                {
-                    "name": "Main Message & Focus",
-                    "weight": "25%",
-                    "description": "Is the main point clear from the start?",
-                    "levels": {
-                        "Level 4 (80-100%)": "Main message is crystal clear from the opening; reader immediately understands the point",
-                        "Level 3 (70-79%)": "Main message is clear and stated early in the writing",
-                        "Level 2 (60-69%)": "Main message is present but may be buried or unclear",
-                        "Level 1 (50-59%)": "Main message is missing or very difficult to identify"
-                    }
-                },
-                {
-                    "name": "Logical Structure",
-                    "weight": "25%",
-                    "description": "Do supporting points clearly connect to the main message?",
-                    "levels": {
-                        "Level 4 (80-100%)": "Each paragraph directly answers 'why?' or 'how?' about the main message; points are distinct and complete",
-                        "Level 3 (70-79%)": "Supporting points connect to main message with clear logic",
-                        "Level 2 (60-69%)": "Some connection between points and main message, but logic may be unclear",
-                        "Level 1 (50-59%)": "Points seem disconnected or don't clearly support the main message"
-                    }
-                },
-                {
-                    "name": "Grouping & Completeness",
-                    "weight": "25%",
-                    "description": "Are ideas grouped well? Do they cover everything important without repeating?",
-                    "levels": {
-                        "Level 4 (80-100%)": "Ideas are perfectly grouped; no overlap between points; nothing important is missing",
-                        "Level 3 (70-79%)": "Ideas are well-grouped with minimal overlap; covers main points",
-                        "Level 2 (60-69%)": "Some grouping attempted but ideas may overlap or important points may be missing",
-                        "Level 1 (50-59%)": "Ideas are jumbled, repetitive, or major points are missing"
-                    }
-                },
-                {
-                    "name": "Conventions & Clarity",
-                    "weight": "25%",
-                    "description": "Is the writing clear and error-free?",
-                    "levels": {
-                        "Level 4 (80-100%)": "Virtually no errors; writing is exceptionally clear",
-                        "Level 3 (70-79%)": "Few errors that don't impede understanding",
-                        "Level 2 (60-69%)": "Some errors that may impede understanding",
-                        "Level 1 (50-59%)": "Frequent errors that significantly impede understanding"
-                    }
-                }
+                dict(category, levels=dict(category["levels"]))
+                for category in RUBRIC_CATEGORIES.values()
             ]
         }
 
     def _get_structure_check_questions(self):
         """Questions to help students check their logical structure."""
-        return [
-            "Can you state your main message in ONE sentence? Is that sentence in your opening?",
-            "For each paragraph: what ONE point does it make? Write it in the margin.",
-            "Do your paragraph points answer 'why?' or 'how?' about your main message?",
-            "Look at your paragraph points: are they all different, or do some repeat the same idea?",
-            "Together, do your points cover everything important? Is anything major missing?",
-            "Can a reader follow your logic from start to finish without getting confused?"
-        ]
+        return list(STRUCTURE_CHECK_QUESTIONS)
 
     def _get_self_assessment_questions(self, prompt_type):
         """Get self-assessment questions based on writing type."""
-        # Universal structure questions
-        base_questions = [
-            "Is my main message/point clear in the first paragraph?",
-            "Does each paragraph have ONE clear purpose?",
-            "Does each paragraph support my main message?",
-            "Are my supporting points different from each other (no repeating)?",
-            "Together, do my points cover everything important?",
-            "Can readers follow my logic from beginning to end?",
-            "Did I proofread for spelling and grammar errors?"
-        ]
-
-        type_specific = {
-            "Narrative Writing": [
-                "Does my opening hook show why this story matters?",
-                "Does every scene connect to the main change/lesson?",
-                "Are my events in an order that makes sense?",
-                "Does my ending connect back to my opening?"
-            ],
-            "Opinion/Persuasive Writing": [
-                "Is my position stated clearly in the first paragraph?",
-                "Is each reason a DIFFERENT type of argument?",
-                "Does each reason directly answer 'why is my position correct?'",
-                "Did I address the other side of the argument?"
-            ],
-            "Informational/Explanatory Writing": [
-                "Did I start with what readers will achieve?",
-                "Are my steps grouped into logical stages (not just listed)?",
-                "Does each stage answer 'how?' about reaching the goal?",
-                "Are my stages in an order that builds logically?"
-            ],
-            "Response to Reading": [
-                "Did I lead with my main insight (not bury it)?",
-                "Is each point a different way the text affected me?",
-                "Do my points together explain my full insight?",
-                "Did I use specific evidence from the text?"
-            ],
-            "Problem-Solution Writing": [
-                "Did I clearly explain the situation before the problem?",
-                "Is it clear WHY this situation is a problem?",
-                "Is my solution stated clearly before my reasons?",
-                "Does each reason answer 'why would this solution work?'"
-            ]
-        }
-
-        return base_questions + type_specific.get(prompt_type, [])
+        return SELF_ASSESSMENT_QUESTIONS + TYPE_SELF_ASSESSMENT_QUESTIONS.get(prompt_type, [])
 
     def get_think_first_framework(self):
         """Return the Think First planning framework."""
         return self.think_first
+
+
+@lru_cache(maxsize=None)
+def get_prompt_catalog():
+    """
+    Return the process-wide, read-only writing prompt catalog.
+
+    Built on first use and shared by every WritingAssessment instance.
+    """
+    return freeze(WritingAssessment._load_prompts())
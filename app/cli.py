@@ -0,0 +1,268 @@
+"""
+Command-line Tools
+Teacher and maintenance commands, available through `flask <command>`.
+"""
+
+import json
+import math
+import os
+import time
+
+import click
+
+from app.assessments import irt
+from app.assessments.ai_evaluator import AIEvaluator
+from app.assessments.backends import (DEFAULT_CASSETTE_PATH, DEFAULT_MODEL, RecordingBackend,
+                                      ReplayBackend, remote_backend)
+from app.assessments.cassette import Cassette
+from app.assessments.batch_grading import BatchFormatError, grade_class, parse_answers
+from app.assessments.calibration import DEFAULT_CHECK_INTERVAL, MIN_ITEM_RESPONSES, calibrate
+from app.assessments.export import item_titles
+from app.assessments.item_analysis import analyze_bank
+from app.assessments.knowledge_tracing import DEFAULT_MASTERY_PATH, get_knowledge_tracer, rebuild_from_results
+from app.assessments.progress_reports import class_reports, generate_reports
+from app.assessments.report_pdf import HAS_REPORTLAB
+from app.assessments.resilience import CircuitBreaker
+from app.assessments.response_log import DEFAULT_LOG_PATH, ResponseLog
+from app.assessments.results_store import get_results_store
+from app.assessments.text_analysis import analyze_text
+from app.assessments.writing import get_prompt_catalog
+
+
+@click.command('grade-class')
+@click.argument('passage_id')
+@click.argument('answers_file', type=click.File('r', encoding='utf-8-sig'))
+@click.option('--output', '-o', type=click.File('w'), default='-',
+              help='Where to write the JSON results (default: stdout).')
+@click.option('--summary-only', is_flag=True, help='Only write the class summary.')
+def grade_class_command(passage_id, answers_file, output, summary_only):
+    """Grade a class's answers (CSV or JSON) to one reading passage."""
+    try:
+        students = parse_answers(answers_file.read(), answers_file.name)
+        results = grade_class(passage_id, students)
+    except BatchFormatError as e:
+        raise click.ClickException(str(e))
+
+    if "error" in results:
+        raise click.ClickException(f"{results['error']}: {passage_id}")
+    if summary_only:
+        results = {key: value for key, value in results.items() if key != "results"}
+    json.dump(results, output, indent=2)
+    output.write("\n")
+
+
+@click.command('item-analysis')
+@click.argument('passage_ids', nargs=-1)
+@click.option('--log', 'log_path', type=click.Path(dir_okay=False),
+              default=lambda: os.environ.get('RESPONSE_LOG_PATH', DEFAULT_LOG_PATH),
+              help='Response log to analyse (default: RESPONSE_LOG_PATH).')
+@click.option('--output', '-o', type=click.File('w'), default='-',
+              help='Where to write the JSON report (default: stdout).')
+@click.option('--flagged-only', is_flag=True, help='Only report questions with flags.')
+def item_analysis_command(passage_ids, log_path, output, flagged_only):
+    """Report difficulty, discrimination and distractor statistics per question."""
+    if not os.path.exists(log_path):
+        raise click.ClickException(f"No response log at {log_path}")
+    report = analyze_bank(ResponseLog(log_path).responses(), list(passage_ids) or None)
+    if flagged_only:
+        for passage in report["passages"]:
+            passage["items"] = [item for item in passage["items"] if item["flags"]]
+    json.dump(report, output, indent=2)
+    output.write("\n")
+
+
+@click.command('calibrate')
+@click.option('--log', 'log_path', type=click.Path(dir_okay=False),
+              default=lambda: os.environ.get('RESPONSE_LOG_PATH', DEFAULT_LOG_PATH),
+              help='Response log to calibrate from (default: RESPONSE_LOG_PATH).')
+@click.option('--output', '-o', type=click.Path(dir_okay=False),
+              default=lambda: os.environ.get('CALIBRATION_PATH', irt.DEFAULT_CALIBRATION_PATH),
+              help='Calibration file to write (default: CALIBRATION_PATH).')
+@click.option('--min-responses', type=int, default=MIN_ITEM_RESPONSES, show_default=True,
+              help='Responses an item needs before it is calibrated.')
+def calibrate_command(log_path, output, min_responses):
+    """Fit Rasch item difficulties from the response log."""
+    if not os.path.exists(log_path):
+        raise click.ClickException(f"No response log at {log_path}")
+    calibration = calibrate(ResponseLog(log_path).records(), min_item_responses=min_responses)
+    irt.save_calibration(calibration, output)
+
+    item_count = sum(len(items) for items in calibration["items"].values())
+    click.echo(f"Calibrated {item_count} items from {calibration['response_count']:,} responses "
+               f"by {calibration['person_count']:,} students in {calibration['seconds']}s "
+               f"({calibration['iterations']} iterations"
+               f"{'' if calibration['converged'] else ', not converged'})")
+    interval = float(os.environ.get('CALIBRATION_CHECK_INTERVAL', DEFAULT_CHECK_INTERVAL))
+    if interval > 0:
+        click.echo(f"Wrote {output}; a running web app picks it up within {interval:g}s "
+                   f"if it reads the same CALIBRATION_PATH")
+    else:
+        click.echo(f"Wrote {output}; restart the web app to use it")
+
+
+@click.group('ai-cassette')
+def ai_cassette_group():
+    """Record AI writing evaluations and replay them without the network."""
+
+
+cassette_option = click.option(
+    '--cassette', 'cassette_path', type=click.Path(dir_okay=False),
+    default=lambda: os.environ.get('AI_CASSETTE_PATH', DEFAULT_CASSETTE_PATH),
+    help='Cassette file (default: AI_CASSETTE_PATH).')
+model_option = click.option(
+    '--model', default=lambda: os.environ.get('AI_MODEL', DEFAULT_MODEL),
+    help='Model the recordings belong to (default: AI_MODEL).')
+
+
+@ai_cassette_group.command('record')
+@click.argument('submissions_file', type=click.File('r', encoding='utf-8-sig'))
+@cassette_option
+@model_option
+@click.option('--backend', type=click.Choice(['claude', 'stub']), default='claude', show_default=True,
+              help='Where the recorded calls go.')
+@click.option('--stream', is_flag=True, help='Record streamed calls, with first-token times.')
+def ai_cassette_record(submissions_file, cassette_path, model, backend, stream):
+    """
+    Evaluate submissions and record every AI call.
+
+    SUBMISSIONS_FILE is a JSON list of {"prompt_id", "text"} objects.
+    """
+    try:
+        submissions = json.load(submissions_file)
+    except json.JSONDecodeError as e:
+        raise click.ClickException(f"Submissions file is not valid JSON: {e}")
+    prompts = get_prompt_catalog()
+
+    recorder = RecordingBackend(remote_backend(backend, model), cassette_path)
+    if not recorder.is_available():
+        raise click.ClickException(f"The {backend} backend is not available (is ANTHROPIC_API_KEY set?)")
+    evaluator = AIEvaluator(recorder)
+    before = len(recorder.cassette)
+    for n, submission in enumerate(submissions, 1):
+        prompt = prompts.get(submission.get("prompt_id"))
+        if prompt is None:
+            raise click.ClickException(f"Submission {n}: unknown prompt_id {submission.get('prompt_id')!r}")
+        prompt_info = {key: prompt[key] for key in ("title", "type", "word_minimum", "word_maximum")}
+        text = submission.get("text", "")
+        evaluator.evaluate_writing(text, prompt_info, metrics=analyze_text(text),
+                                   on_category=(lambda key, category: None) if stream else None)
+    click.echo(f"Recorded {len(recorder.cassette) - before} new calls "
+               f"({len(recorder.cassette)} in {cassette_path})")
+
+
+@ai_cassette_group.command('replay')
+@cassette_option
+@model_option
+@click.option('--speed', type=float, default=0.0, show_default=True,
+              help='Multiplier on recorded latencies (1 = original timing).')
+@click.option('--stream', is_flag=True, help='Replay as streamed calls.')
+def ai_cassette_replay(cassette_path, model, speed, stream):
+    """Re-run every recorded evaluation through the evaluator, offline."""
+    cassette = Cassette(cassette_path)
+    if not len(cassette):
+        raise click.ClickException(f"No recordings in {cassette_path}")
+    replay = ReplayBackend(cassette, model=model, speed=speed)
+    evaluator = AIEvaluator(replay)
+    # Every recording has to reach the backend to be checked: a breaker that
+    # opened after a few misses would hide the rest, and retries would repeat them
+    evaluator.breaker = CircuitBreaker(failure_threshold=math.inf)
+    evaluator.max_retries = 0
+
+    offline = 0
+    started = time.perf_counter()
+    for entry in cassette.entries.values():
+        text = entry["student_text"]
+        evaluation = evaluator.evaluate_writing(
+            text, entry["prompt_info"], metrics=analyze_text(text),
+            on_category=(lambda key, category: None) if stream else None)
+        if evaluation.get("ai_evaluated") is False:
+            offline += 1
+    seconds = time.perf_counter() - started
+
+    json.dump({
+        "cassette": cassette.summary(),
+        "replayed": len(cassette),
+        "speed": speed,
+        "seconds": round(seconds, 3),
+        # Misses are recordings the current evaluation prompt no longer produces
+        "misses": replay.misses,
+        "offline_fallbacks": offline
+    }, click.get_text_stream('stdout'), indent=2)
+    click.echo()
+    if replay.misses:
+        raise click.ClickException(f"{replay.misses} recorded requests no longer match; re-record the cassette")
+
+
+@ai_cassette_group.command('info')
+@cassette_option
+def ai_cassette_info(cassette_path):
+    """Summarise a cassette."""
+    if not os.path.exists(cassette_path):
+        raise click.ClickException(f"No cassette at {cassette_path}")
+    json.dump(Cassette(cassette_path).summary(), click.get_text_stream('stdout'), indent=2)
+    click.echo()
+
+
+@click.command('rebuild-rollups')
+def rebuild_rollups_command():
+    """Recompute the progress rollups from saved results (e.g. after changing RESULTS_ROLLING_WEIGHT)."""
+    store = get_results_store()
+    if store is None:
+        raise click.ClickException("Results are not being saved (RESULTS_STORE_ENABLED=0)")
+    started = time.perf_counter()
+    replayed = store.rebuild_rollups()
+    click.echo(f"Rebuilt progress rollups from {replayed} saved results in {time.perf_counter() - started:.2f}s")
+
+
+@click.command('rebuild-mastery')
+@click.option('--output', '-o', 'output_path', type=click.Path(dir_okay=False),
+              default=lambda: os.environ.get('MASTERY_PATH', DEFAULT_MASTERY_PATH),
+              show_default='MASTERY_PATH or instance/mastery.npz', help='Where to save the mastery arrays.')
+def rebuild_mastery_command(output_path):
+    """Re-trace every student's skill mastery from saved reading results (stop the server first)."""
+    store = get_results_store()
+    if store is None:
+        raise click.ClickException("Results are not being saved (RESULTS_STORE_ENABLED=0)")
+    started = time.perf_counter()
+    tracer = rebuild_from_results(store)
+    tracer.save(output_path)
+    stats = tracer.stats()
+    click.echo(f"Traced {stats['updates']} answers for {stats['students']} students across "
+               f"{stats['skills']} skills in {time.perf_counter() - started:.2f}s; saved to {output_path}")
+
+
+@click.command('progress-reports')
+@click.option('--output', '-o', type=click.Path(dir_okay=False), required=True, help='Zip file to write.')
+@click.option('--class-id', help='Only students with results in this class.')
+@click.option('--student', 'student_ids', multiple=True, help='Only these students (repeatable).')
+@click.option('--workers', type=int, default=None, help='Rendering processes (default REPORT_WORKERS or CPU count).')
+def progress_reports_command(output, class_id, student_ids, workers):
+    """Render a PDF progress report per student into one zip."""
+    if not HAS_REPORTLAB:
+        raise click.ClickException("PDF reports need reportlab (pip install reportlab)")
+    store = get_results_store()
+    if store is None:
+        raise click.ClickException("Results are not being saved (RESULTS_STORE_ENABLED=0)")
+    reported = [0]
+
+    def progress(done, seconds):
+        if done - reported[0] >= 50:
+            reported[0] = done
+            click.echo(f"{done} reports ({done / seconds:.1f}/s)", err=True)
+
+    reports = class_reports(store, get_knowledge_tracer(), class_id=class_id,
+                            student_ids=list(student_ids) or None, titles=item_titles())
+    summary = generate_reports(reports, output, workers=workers, on_progress=progress)
+    click.echo(f"Wrote {summary['reports']} reports to {output} in {summary['seconds']:.2f}s "
+               f"({summary['reports_per_second']} reports/s with {summary['workers']} workers)")
+
+
+def register_commands(app):
+    """Attach the command-line tools to the Flask app."""
+    app.cli.add_command(grade_class_command)
+    app.cli.add_command(item_analysis_command)
+    app.cli.add_command(calibrate_command)
+    app.cli.add_command(ai_cassette_group)
+    app.cli.add_command(rebuild_rollups_command)
+    app.cli.add_command(rebuild_mastery_command)
+    app.cli.add_command(progress_reports_command)
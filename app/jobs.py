@@ -0,0 +1,264 @@
+"""
+Background Job Queue
+Runs slow work, such as AI writing evaluation, on a bounded pool of worker
+threads so Flask workers can answer immediately with a job id.
+
+Jobs live in this process's memory. Clients fetch results by polling, or
+by following the job's Server-Sent Events stream, and must reach the same
+process that accepted the job. A stream holds a request worker for the whole
+evaluation, which under sync or threaded WSGI workers brings back the worker
+exhaustion the queue exists to prevent. Streams are therefore off unless
+turned on for servers with async (e.g. gevent) workers.
+
+Configuration (environment variables):
+    WRITING_JOB_WORKERS     Worker threads evaluating writing (default 4)
+    WRITING_JOB_QUEUE_SIZE  Jobs allowed to wait before submit is refused (default 100)
+    WRITING_JOB_RESULT_TTL  Seconds a finished job is kept for pickup (default 600)
+    WRITING_JOB_EVENTS      Set to 1 to offer Server-Sent Events streams; needs async
+                            workers such as gevent (default 0, browsers poll)
+    REPORT_JOB_RESULT_TTL   Seconds a finished progress-report job and its zip are kept (default 3600)
+"""
+
+import collections
+import os
+import queue
+import threading
+import time
+import uuid
+
+
+DEFAULT_WORKERS = 4
+DEFAULT_QUEUE_SIZE = 100
+DEFAULT_RESULT_TTL = 600
+DEFAULT_REPORT_RESULT_TTL = 3600
+
+
+class QueueFull(Exception):
+    """Raised when a job is submitted to a queue that is already at capacity."""
+
+
+class Job:
+    """A unit of work plus the events it has published so far."""
+
+    def __init__(self, func, args, kwargs):
+        self.id = uuid.uuid4().hex
+        self.func = func
+        self.args = args
+        self.kwargs = kwargs
+        self.status = "queued"
+        self.result = None
+        self.error = None
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.events = []
+        self._changed = threading.Condition()
+
+    def publish(self, event, data=None):
+        """Append an event and wake anyone streaming this job."""
+        with self._changed:
+            self.events.append((event, data))
+            self._changed.notify_all()
+
+    def wait_for_events(self, seen, timeout):
+        """
+        Block until there are more than `seen` events or the timeout passes.
+
+        Returns:
+            List of (event, data) tuples published after the first `seen`
+        """
+        with self._changed:
+            if len(self.events) <= seen:
+                self._changed.wait(timeout)
+            return self.events[seen:]
+
+    @property
+    def finished(self):
+        return self.status in ("done", "failed")
+
+    def to_dict(self):
+        """Return the job's public status for polling clients."""
+        data = {
+            "job_id": self.id,
+            "status": self.status
+        }
+        if self.status == "done":
+            data["result"] = self.result
+        elif self.status == "running":
+            data["progress"] = [payload for event, payload in self.events if event == "progress"]
+        elif self.status == "failed":
+            data["error"] = self.error
+        return data
+
+
+class JobQueue:
+    """A bounded FIFO of jobs served by a fixed pool of worker threads."""
+
+    def __init__(self, name, workers=DEFAULT_WORKERS, max_depth=DEFAULT_QUEUE_SIZE,
+                 result_ttl=DEFAULT_RESULT_TTL):
+        self.name = name
+        self.workers = workers
+        self.result_ttl = result_ttl
+        self._queue = queue.Queue(maxsize=max_depth)
+        self._jobs = {}
+        self._lock = threading.Lock()
+        self._threads = []
+        self._running = 0
+        self._completed = 0
+        self._failed = 0
+        self._rejected = 0
+        self._wait_times = collections.deque(maxlen=1000)
+
+    def _start(self):
+        """Start worker threads on first use."""
+        if self._threads:
+            return
+        for index in range(self.workers):
+            thread = threading.Thread(
+                target=self._work, name=f"{self.name}-worker-{index}", daemon=True
+            )
+            thread.start()
+            self._threads.append(thread)
+
+    def submit(self, func, *args, with_job=False, **kwargs):
+        """
+        Queue func(*args, **kwargs) to run on a worker thread.
+
+        If with_job is true, the Job is passed as the first argument so func
+        can publish progress events while it runs.
+
+        Returns:
+            The queued Job
+
+        Raises:
+            QueueFull: if max_depth jobs are already waiting
+        """
+        job = Job(func, args, kwargs)
+        if with_job:
+            job.args = (job,) + args
+        job.publish("queued", {"job_id": job.id})
+        with self._lock:
+            self._start()
+            self._purge_finished()
+            try:
+                self._queue.put_nowait(job)
+            except queue.Full:
+                self._rejected += 1
+                raise QueueFull(f"{self.name} queue is full")
+            self._jobs[job.id] = job
+        return job
+
+    def get(self, job_id):
+        """Return the job with this id, or None if unknown or expired."""
+        return self._jobs.get(job_id)
+
+    def position(self, job):
+        """Approximate number of jobs ahead of this one in the queue."""
+        if job.status != "queued":
+            return 0
+        with self._queue.mutex:
+            waiting = list(self._queue.queue)
+        return waiting.index(job) if job in waiting else 0
+
+    def _work(self):
+        while True:
+            job = self._queue.get()
+            job.started_at = time.time()
+            job.status = "running"
+            with self._lock:
+                self._running += 1
+                self._wait_times.append(job.started_at - job.created_at)
+            job.publish("running")
+            try:
+                job.result = job.func(*job.args, **job.kwargs)
+                job.status = "done"
+            except Exception as e:
+                print(f"{self.name} job {job.id} failed: {e}")
+                job.error = "The job could not be completed."
+                job.status = "failed"
+            job.finished_at = time.time()
+            with self._lock:
+                self._running -= 1
+                if job.status == "done":
+                    self._completed += 1
+                else:
+                    self._failed += 1
+            job.publish(job.status, job.to_dict())
+            self._queue.task_done()
+
+    def _purge_finished(self):
+        """Forget finished jobs older than result_ttl. Caller holds _lock."""
+        cutoff = time.time() - self.result_ttl
+        expired = [
+            job_id for job_id, job in self._jobs.items()
+            if job.finished and job.finished_at < cutoff
+        ]
+        for job_id in expired:
+            del self._jobs[job_id]
+
+    def stats(self):
+        """Return queue depth, worker usage and recent wait times."""
+        with self._lock:
+            waits = sorted(self._wait_times)
+            running = self._running
+            completed = self._completed
+            failed = self._failed
+            rejected = self._rejected
+        return {
+            "workers": self.workers,
+            "depth": self._queue.qsize(),
+            "max_depth": self._queue.maxsize,
+            "running": running,
+            "completed": completed,
+            "failed": failed,
+            "rejected": rejected,
+            "wait_seconds": {
+                "mean": round(sum(waits) / len(waits), 4) if waits else 0.0,
+                "p95": round(waits[int(0.95 * (len(waits) - 1))], 4) if waits else 0.0,
+                "max": round(waits[-1], 4) if waits else 0.0
+            }
+        }
+
+
+def job_events_enabled():
+    """Whether writing jobs offer a Server-Sent Events stream."""
+    return os.environ.get('WRITING_JOB_EVENTS', '0') in ('1', 'true', 'True')
+
+
+_writing_queue = None
+_writing_queue_lock = threading.Lock()
+
+
+def get_writing_queue():
+    """Return the process-wide queue that runs writing evaluations."""
+    global _writing_queue
+    if _writing_queue is None:
+        with _writing_queue_lock:
+            if _writing_queue is None:
+                _writing_queue = JobQueue(
+                    "writing",
+                    workers=int(os.environ.get('WRITING_JOB_WORKERS', DEFAULT_WORKERS)),
+                    max_depth=int(os.environ.get('WRITING_JOB_QUEUE_SIZE', DEFAULT_QUEUE_SIZE)),
+                    result_ttl=float(os.environ.get('WRITING_JOB_RESULT_TTL', DEFAULT_RESULT_TTL))
+                )
+    return _writing_queue
+
+
+_report_queue = None
+_report_queue_lock = threading.Lock()
+
+
+def get_report_queue():
+    """
+    Return the process-wide queue for progress-report jobs. One job runs at
+    a time, since each already uses every CPU through its own process pool.
+    """
+    global _report_queue
+    if _report_queue is None:
+        with _report_queue_lock:
+            if _report_queue is None:
+                _report_queue = JobQueue(
+                    "reports", workers=1, max_depth=4,
+                    result_ttl=float(os.environ.get('REPORT_JOB_RESULT_TTL', DEFAULT_REPORT_RESULT_TTL))
+                )
+    return _report_queue
@@ -0,0 +1,220 @@
+"""
+Metrics
+Request and AI evaluation metrics, exposed in the Prometheus text format on
+/metrics.
+
+Recording is cheap enough to leave on everywhere. Each thread keeps its own
+counters (one list of bucket counts per label combination), so observing a
+value is a bisect and a few list increments with no lock; the per-thread
+counters are only summed when /metrics is scraped. A scrape that races a
+request may see that one observation half-recorded, which Prometheus
+tolerates. When a thread exits, its counters are folded into a shared
+"retired" total (at the next scrape, or once the number of shards has
+doubled), so servers that start a thread per request keep only the live
+threads' counters.
+
+Metrics:
+    http_request_duration_seconds   Histogram by endpoint, method and status
+                                    (streamed responses are timed to their first byte)
+    ai_call_duration_seconds        Histogram of backend calls by backend and outcome
+    ai_call_tokens                  Histogram of tokens per call, in and out
+    ai_evaluations_total            Counter of writing evaluations by how they were
+                                    answered: ai, cache_hit or a fallback reason
+    writing_jobs_queued, writing_jobs_running, ai_circuit_open   Gauges read at scrape time
+"""
+
+import threading
+from bisect import bisect_left
+
+
+HTTP_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+AI_LATENCY_BUCKETS = (0.25, 0.5, 1.0, 2.0, 4.0, 8.0, 16.0, 32.0, 64.0)
+TOKEN_BUCKETS = (64, 128, 256, 512, 1024, 2048, 4096, 8192)
+
+# Fewest per-thread shards before exited threads' shards are folded together
+MIN_RETIRE_AT = 64
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(names, values, extra=""):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value):
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+class _ThreadSharded:
+    """Per-thread storage of {label values: cells}, merged on read."""
+
+    def __init__(self, name, help, labelnames):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._local = threading.local()
+        self._shards = []
+        self._shards_lock = threading.Lock()
+        # Cells of threads that have exited, summed
+        self._retired = {}
+        self._retire_at = MIN_RETIRE_AT
+
+    def _shard(self):
+        try:
+            return self._local.shard
+        except AttributeError:
+            shard = self._local.shard = {}
+            with self._shards_lock:
+                self._shards.append((threading.current_thread(), shard))
+                # Servers that start a thread per request would otherwise keep a shard per request
+                # until the next scrape; retiring whenever the list doubles keeps it amortized O(1)
+                if len(self._shards) >= self._retire_at:
+                    self._retire_finished()
+                    self._retire_at = max(MIN_RETIRE_AT, 2 * len(self._shards))
+            return shard
+
+    def _retire_finished(self):
+        """Fold the shards of exited threads into the retired totals. Needs _shards_lock."""
+        live = []
+        for thread, shard in self._shards:
+            if thread.is_alive():
+                live.append((thread, shard))
+            else:
+                _add_cells(self._retired, shard)
+        self._shards = live
+
+    def _merged(self):
+        """Sum the cells for each label combination across threads."""
+        with self._shards_lock:
+            self._retire_finished()
+            shards = [shard for _, shard in self._shards]
+            merged = {labels: list(cells) for labels, cells in self._retired.items()}
+        for shard in shards:
+            _add_cells(merged, shard)
+        return merged
+
+
+def _add_cells(total, shard):
+    for labels, cells in list(shard.items()):
+        into = total.get(labels)
+        if into is None:
+            total[labels] = list(cells)
+        else:
+            for i, value in enumerate(cells):
+                into[i] += value
+
+
+class Counter(_ThreadSharded):
+    """A monotonically increasing count per label combination."""
+
+    def inc(self, *labels, amount=1):
+        shard = self._shard()
+        cells = shard.get(labels)
+        if cells is None:
+            cells = shard[labels] = [0]
+        cells[0] += amount
+
+    def value(self, *labels):
+        return self._merged().get(labels, [0])[0]
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        for labels, cells in sorted(self._merged().items()):
+            lines.append(f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(cells[0])}")
+        return lines
+
+
+class Histogram(_ThreadSharded):
+    """Observations counted into fixed buckets per label combination, with sum and count."""
+
+    def __init__(self, name, help, buckets, labelnames=()):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # One cell per bucket, one for +Inf, then the sum and the count
+        self._width = len(self.buckets) + 3
+
+    def observe(self, value, *labels):
+        shard = self._shard()
+        cells = shard.get(labels)
+        if cells is None:
+            cells = shard[labels] = [0] * self._width
+        cells[bisect_left(self.buckets, value)] += 1
+        cells[-2] += value
+        cells[-1] += 1
+
+    def snapshot(self, *labels):
+        """Return {"count", "sum"} for one label combination."""
+        cells = self._merged().get(labels)
+        return {"count": cells[-1], "sum": cells[-2]} if cells else {"count": 0, "sum": 0}
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        bounds = [f'le="{_format_value(float(b))}"' for b in self.buckets] + ['le="+Inf"']
+        for labels, cells in sorted(self._merged().items()):
+            cumulative = 0
+            for bound, count in zip(bounds, cells):
+                cumulative += count
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, labels, bound)} {cumulative}")
+            label_text = _format_labels(self.labelnames, labels)
+            lines.append(f"{self.name}_sum{label_text} {_format_value(float(cells[-2]))}")
+            lines.append(f"{self.name}_count{label_text} {cells[-1]}")
+        return lines
+
+
+class Registry:
+    """The metrics to expose, plus gauges computed when scraped."""
+
+    def __init__(self):
+        self.metrics = []
+        self.gauges = []
+
+    def histogram(self, name, help, buckets, labelnames=()):
+        metric = Histogram(name, help, buckets, labelnames)
+        self.metrics.append(metric)
+        return metric
+
+    def counter(self, name, help, labelnames=()):
+        metric = Counter(name, help, labelnames)
+        self.metrics.append(metric)
+        return metric
+
+    def gauge(self, name, help, read):
+        """Register a gauge whose value is read() at scrape time."""
+        self.gauges.append((name, help, read))
+
+    def render(self):
+        """The Prometheus text exposition of every metric."""
+        lines = []
+        for metric in self.metrics:
+            lines.extend(metric.render())
+        for name, help, read in self.gauges:
+            try:
+                value = read()
+            except Exception as e:
+                print(f"Metric {name} could not be read: {e}")
+                continue
+            lines.extend([f"# HELP {name} {help}", f"# TYPE {name} gauge", f"{name} {_format_value(value)}"])
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+http_request_duration = REGISTRY.histogram(
+    "http_request_duration_seconds", "Time to answer a request.",
+    HTTP_BUCKETS, ("endpoint", "method", "status"))
+ai_call_duration = REGISTRY.histogram(
+    "ai_call_duration_seconds", "Duration of one AI backend call, retries counted separately.",
+    AI_LATENCY_BUCKETS, ("backend", "outcome"))
+ai_call_tokens = REGISTRY.histogram(
+    "ai_call_tokens", "Tokens per AI call; input includes cached prompt tokens.",
+    TOKEN_BUCKETS, ("backend", "direction"))
+ai_evaluations = REGISTRY.counter(
+    "ai_evaluations_total", "Writing evaluations by how they were answered.",
+    ("outcome",))
@@ -0,0 +1,261 @@
+"""
+Request Profiling
+Opt-in profiling of live requests, for finding out where a slow route
+actually spends its time.
+
+Two tools, both off unless configured:
+
+- Per-request cProfile. A request carrying the header
+  `X-Profile-Token: <PROFILING_TOKEN>`, or any request to an endpoint listed
+  in PROFILE_ENDPOINTS, is run under cProfile and its stats are written to
+  PROFILE_DIR as a .prof file (open with snakeviz, or turn into a flame graph
+  with flameprof). The response names the file in an X-Profile-File header.
+  Writing evaluation happens on a background job thread, so a profiled
+  `/writing/submit` also profiles its job into a second file.
+
+- Sampling across a time window. `POST /admin/profile/sample?seconds=10`
+  with the token header samples the stacks of every thread (default every
+  5 ms) and returns them in collapsed-stack format, one
+  `frame;frame;frame count` line per distinct stack, ready for
+  flamegraph.pl or speedscope. Threads blocked waiting for work are left
+  out unless `idle=1` is given. A copy is saved in PROFILE_DIR.
+
+Only one cProfile profiler can run at a time (on Python 3.12+ a second one
+raises ValueError), so profiles are taken one at a time: a request that
+finds the profiler busy, or another profiling tool active, simply runs
+unprofiled. A job waits briefly for the request that started it to finish
+its own profile. Profiling never fails a request or a job.
+
+When neither PROFILING_TOKEN nor PROFILE_ENDPOINTS is set, no hooks or
+routes are registered at all, so profiling costs nothing.
+
+Configuration (environment variables):
+    PROFILING_TOKEN     Secret that enables on-demand profiling (default unset: off)
+    PROFILE_ENDPOINTS   Comma-separated endpoints profiled on every request,
+                        e.g. main.submit_reading,main.submit_writing (default none)
+    PROFILE_DIR         Where profiles are written (default instance/profiles)
+"""
+
+import cProfile
+import hmac
+import os
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+
+from flask import Blueprint, Response, abort, g, request
+
+from app.assessments.evaluation_cache import INSTANCE_DIR
+
+
+DEFAULT_PROFILE_DIR = os.path.join(INSTANCE_DIR, 'profiles')
+TOKEN_HEADER = 'X-Profile-Token'
+
+DEFAULT_SAMPLE_SECONDS = 10.0
+MAX_SAMPLE_SECONDS = 120.0
+DEFAULT_SAMPLE_INTERVAL = 0.005
+# Seconds a profiled job waits for the profiler to be free
+JOB_PROFILE_WAIT = 2.0
+
+# Innermost frames of threads that are blocked waiting for work; skipped
+# unless idle threads are asked for, so they don't dominate the flame graph
+IDLE_FRAMES = frozenset([("threading.py", "wait"), ("selectors.py", "select"),
+                         ("socket.py", "accept"), ("queue.py", "get")])
+
+_config = {"enabled": False, "token": None, "endpoints": frozenset(), "directory": DEFAULT_PROFILE_DIR}
+
+admin = Blueprint('profiling', __name__, url_prefix='/admin/profile')
+
+# Held while a request or job is being profiled
+_profile_lock = threading.Lock()
+
+
+def _profile_path(label, suffix):
+    os.makedirs(_config["directory"], exist_ok=True)
+    name = f"{time.strftime('%Y%m%dT%H%M%S')}-{label.replace('.', '_')}-{uuid.uuid4().hex[:6]}{suffix}"
+    return os.path.join(_config["directory"], name)
+
+
+def _token_ok():
+    token = _config["token"]
+    supplied = request.headers.get(TOKEN_HEADER)
+    return bool(token and supplied and hmac.compare_digest(supplied, token))
+
+
+def _enable_profiler():
+    """Start a profiler on this thread, or return None if another tool is profiling."""
+    profiler = cProfile.Profile()
+    try:
+        profiler.enable()
+    except ValueError as e:
+        print(f"Profiling skipped: {e}")
+        return None
+    return profiler
+
+
+def _dump(profiler, label):
+    """Stop the profiler and write its stats. Returns the path, or None if it could not be written."""
+    profiler.disable()
+    try:
+        path = _profile_path(label, ".prof")
+        profiler.dump_stats(path)
+    except OSError as e:
+        print(f"Could not write profile for {label}: {e}")
+        return None
+    return path
+
+
+def _start_request_profile():
+    if request.blueprint == admin.name:
+        return
+    if request.endpoint in _config["endpoints"] or (request.headers.get(TOKEN_HEADER) and _token_ok()):
+        # Busy with another request or job: this one runs unprofiled
+        if not _profile_lock.acquire(blocking=False):
+            return
+        profiler = _enable_profiler()
+        if profiler is None:
+            _profile_lock.release()
+            return
+        g.profiler = profiler
+
+
+def _finish_request_profile(response):
+    profiler = g.pop('profiler', None)
+    if profiler is not None:
+        try:
+            path = _dump(profiler, request.endpoint or "unmatched")
+        finally:
+            _profile_lock.release()
+        if path:
+            response.headers['X-Profile-File'] = os.path.basename(path)
+    return response
+
+
+def _abandon_request_profile(exc):
+    # after_request is skipped when a view raises; free the profiler anyway
+    profiler = g.pop('profiler', None)
+    if profiler is not None:
+        profiler.disable()
+        _profile_lock.release()
+
+
+def profile_job(func, label):
+    """
+    Profile a background job started by the current request, if that
+    request is itself being profiled.
+
+    Returns func unchanged otherwise, so callers can wrap unconditionally.
+    """
+    if not _config["enabled"] or g.get('profiler') is None:
+        return func
+
+    def profiled(*args, **kwargs):
+        # The request that started the job frees the profiler as soon as it responds
+        if not _profile_lock.acquire(timeout=JOB_PROFILE_WAIT):
+            return func(*args, **kwargs)
+        try:
+            profiler = _enable_profiler()
+            if profiler is None:
+                return func(*args, **kwargs)
+            try:
+                return func(*args, **kwargs)
+            finally:
+                _dump(profiler, label)
+        finally:
+            _profile_lock.release()
+
+    return profiled
+
+
+def _frame_label(code):
+    path = code.co_filename
+    for prefix in sys.path:
+        if prefix and path.startswith(prefix):
+            path = path[len(prefix):].lstrip(os.sep)
+            break
+    return f"{code.co_name} ({path}:{code.co_firstlineno})"
+
+
+def _is_idle(code):
+    return (os.path.basename(code.co_filename), code.co_name) in IDLE_FRAMES
+
+
+def sample_stacks(seconds, interval=DEFAULT_SAMPLE_INTERVAL, exclude=(), include_idle=False):
+    """
+    Sample every thread's stack for a time window.
+
+    Args:
+        seconds: Length of the window
+        interval: Seconds between samples
+        exclude: Thread idents not to sample
+        include_idle: Also sample threads blocked waiting for work
+
+    Returns:
+        Counter of {collapsed stack: samples}, stacks written root first
+        and prefixed with the thread name
+    """
+    me = threading.get_ident()
+    labels = {}
+    stacks = Counter()
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+        for ident, frame in sys._current_frames().items():
+            if ident == me or ident in exclude:
+                continue
+            if not include_idle and _is_idle(frame.f_code):
+                continue
+            frames = []
+            while frame is not None:
+                code = frame.f_code
+                label = labels.get(code)
+                if label is None:
+                    label = labels[code] = _frame_label(code)
+                frames.append(label)
+                frame = frame.f_back
+            frames.append(names.get(ident, f"thread-{ident}"))
+            stacks[";".join(reversed(frames))] += 1
+        time.sleep(interval)
+    return stacks
+
+
+def collapsed_text(stacks):
+    """Render sampled stacks in collapsed-stack format."""
+    return "".join(f"{stack} {count}\n" for stack, count in stacks.most_common())
+
+
+@admin.route('/sample', methods=['POST'])
+def sample():
+    if not _token_ok():
+        abort(404)
+    try:
+        seconds = min(float(request.args.get('seconds', DEFAULT_SAMPLE_SECONDS)), MAX_SAMPLE_SECONDS)
+        interval = max(float(request.args.get('interval', DEFAULT_SAMPLE_INTERVAL)), 0.001)
+    except ValueError:
+        return {"error": "seconds and interval must be numbers"}, 400
+
+    include_idle = request.args.get('idle') == '1'
+    text = collapsed_text(sample_stacks(seconds, interval, {threading.get_ident()}, include_idle))
+    path = _profile_path("sample", ".folded")
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(text)
+    return Response(text, mimetype='text/plain', headers={'X-Profile-File': os.path.basename(path)})
+
+
+def init_profiling(app):
+    """Register the profiling hooks and routes if profiling is configured."""
+    token = os.environ.get('PROFILING_TOKEN') or None
+    endpoints = frozenset(e.strip() for e in os.environ.get('PROFILE_ENDPOINTS', '').split(',') if e.strip())
+    if not token and not endpoints:
+        return
+    _config.update(enabled=True, token=token, endpoints=endpoints,
+                   directory=os.environ.get('PROFILE_DIR', DEFAULT_PROFILE_DIR))
+    app.before_request(_start_request_profile)
+    app.after_request(_finish_request_profile)
+    app.teardown_request(_abandon_request_profile)
+    if token:
+        app.register_blueprint(admin)
+    print(f"Profiling enabled (on-demand: {'yes' if token else 'no'}; "
+          f"always: {', '.join(sorted(endpoints)) or 'none'}); profiles go to {_config['directory']}")
@@ -1,9 +1,53 @@
-from flask import Blueprint, render_template, request, jsonify, session
+import json
+import os
+import random
+import time
+import uuid
+
+from flask import Blueprint, Response, g, redirect, render_template, request, jsonify, send_file, session, url_for
 from app.assessments.reading import ReadingAssessment
-from app.assessments.writing import WritingAssessment
+from app.assessments.writing import CATEGORY_NAMES, WritingAssessment
+from app.assessments import adaptive
+from app.assessments.batch_grading import (BatchFormatError, get_answer_key, grade_class, parse_answers, parse_json,
+                                           valid_answers)
+from app.assessments.export import HAS_OPENPYXL, ExportColumns, item_titles, iter_csv, iter_xlsx
+from app.assessments.item_analysis import analyze_bank, analyze_passage
+from app.assessments.knowledge_tracing import get_knowledge_tracer
+from app.assessments.progress_reports import (DEFAULT_REPORT_DIR, class_reports, generate_reports,
+                                              remove_old_archives)
+from app.assessments.report_pdf import HAS_REPORTLAB
+from app.assessments.recommender import recommend_for_student
+from app.assessments.response_log import get_response_log
+from app.assessments.results_store import get_results_store
+from app.assessments.ai_evaluator import get_evaluator
+from app.assessments.client_pool import pool_stats
+from app.jobs import QueueFull, get_report_queue, get_writing_queue, job_events_enabled
+from app.metrics import REGISTRY, http_request_duration
+from app.profiling import profile_job
 
 main = Blueprint('main', __name__)
 
+REGISTRY.gauge("writing_jobs_queued", "Writing submissions waiting for a worker.",
+               lambda: get_writing_queue().stats()["depth"])
+REGISTRY.gauge("writing_jobs_running", "Writing submissions being evaluated.",
+               lambda: get_writing_queue().stats()["running"])
+REGISTRY.gauge("ai_circuit_open", "1 while the AI circuit breaker is open.",
+               lambda: int(get_evaluator().breaker.snapshot()["state"] == "open"))
+
+
+@main.before_request
+def start_request_timer():
+    g.request_started = time.perf_counter()
+
+
+@main.after_request
+def record_request_duration(response):
+    started = g.get('request_started')
+    if started is not None:
+        http_request_duration.observe(time.perf_counter() - started, request.endpoint or "unmatched",
+                                      request.method, str(response.status_code))
+    return response
+
 
 @main.route('/')
 def index():
@@ -14,7 +58,77 @@ def index():
 def reading_assessment():
     assessment = ReadingAssessment()
     passages = assessment.get_available_passages()
-    return render_template('reading.html', passages=passages)
+    return render_template('reading.html', passages=passages, adaptive_ready=adaptive.is_calibrated())
+
+
+@main.route('/reading/recommendations')
+def reading_recommendations():
+    """Untaken passages ranked by how well they practice the student's weakest skills."""
+    try:
+        limit = min(int(request.args.get('limit', 3)), 50)
+    except ValueError:
+        return jsonify({"error": "limit must be a number"}), 400
+    student_id = request.args.get('student_id') or None
+    return jsonify({"student_id": student_id, "recommendations": recommend_for_student(student_id, limit)})
+
+
+@main.route('/reading/adaptive')
+def reading_adaptive():
+    if not adaptive.is_calibrated():
+        # Every question looks alike until calibration, so give a fixed form;
+        # spreading students over the passages also feeds the calibration
+        passages = ReadingAssessment().get_available_passages()
+        return redirect(url_for('main.reading_test', passage_id=random.choice(passages)['id']))
+    return render_template('reading_adaptive.html')
+
+
+@main.route('/reading/adaptive/start', methods=['POST'])
+def start_reading_adaptive():
+    if not adaptive.is_calibrated():
+        return jsonify({"error": "The adaptive test needs a calibrated question bank; take a passage instead"}), 409
+    data = request.get_json(silent=True) or {}
+    state = adaptive.new_test()
+    # Who is taking the test, for the results history
+    state["student_id"] = data.get('student_id')
+    state["class_id"] = data.get('class_id')
+    step = adaptive.next_step(state)
+    session['adaptive_test'] = state
+    return jsonify(step)
+
+
+@main.route('/reading/adaptive/answer', methods=['POST'])
+def answer_reading_adaptive():
+    """Record a batch of answers and return the next batch (or the results) in the same response."""
+    state = session.get('adaptive_test')
+    if not state:
+        return jsonify({"error": "No adaptive test in progress"}), 409
+    data = request.get_json(silent=True) or {}
+    answers = data.get('answers')
+    if not isinstance(answers, dict):
+        return jsonify({"error": "answers must map each item_id to an option index"}), 400
+    for answer in answers.values():
+        # bool is a subclass of int, but true/false are not option indexes
+        if answer is not None and (not isinstance(answer, int) or isinstance(answer, bool)):
+            return jsonify({"error": "Answer must be an option index"}), 400
+    if not adaptive.record_answers(state, answers):
+        return jsonify({"error": "Those are not the current questions"}), 409
+
+    step = adaptive.next_step(state)
+    if step["done"]:
+        session.pop('adaptive_test', None)
+        log = get_response_log()
+        if log:
+            # The real student id links this test to their other answers for calibration;
+            # without one, a per-test id still links the passages within this test
+            student_id = state.get("student_id") or f"adaptive-{uuid.uuid4().hex}"
+            for passage_id, answers in adaptive.answers_by_passage(state).items():
+                log.append(passage_id, valid_answers(get_answer_key(passage_id), answers),
+                           student_id=student_id, source="adaptive")
+        _save_reading_result("adaptive", "adaptive", step["results"],
+                             state.get("student_id"), state.get("class_id"))
+    else:
+        session['adaptive_test'] = state
+    return jsonify(step)
 
 
 @main.route('/reading/<passage_id>')
@@ -31,9 +145,68 @@ def submit_reading():
     data = request.json
     assessment = ReadingAssessment()
     results = assessment.evaluate_answers(data['passage_id'], data['answers'])
+    log = get_response_log()
+    if log and "error" not in results:
+        # Only real option choices reach the log that item analysis reads
+        log.append(data['passage_id'], valid_answers(get_answer_key(data['passage_id']), data['answers']),
+                   student_id=data.get('student_id'))
+    if "error" not in results:
+        _save_reading_result("reading", data['passage_id'], results,
+                             data.get('student_id'), data.get('class_id'))
+    return jsonify(results)
+
+
+def _save_reading_result(kind, item_id, results, student_id, class_id):
+    """Update the student's skill mastery and save the result to their history."""
+    tracer = get_knowledge_tracer()
+    if tracer and student_id:
+        tracer.observe_result(student_id, results)
+    store = get_results_store()
+    if store:
+        store.record(kind, item_id, results, student_id=student_id, class_id=class_id)
+
+
+@main.route('/reading/batch', methods=['POST'])
+def submit_reading_batch():
+    """Grade a whole class: a CSV/JSON file upload or a JSON body."""
+    upload = request.files.get('file')
+    try:
+        if upload:
+            passage_id = request.form.get('passage_id')
+            class_id = request.form.get('class_id')
+            students = parse_answers(upload.read().decode('utf-8-sig'), upload.filename or '')
+        else:
+            data = request.get_json(silent=True) or {}
+            passage_id = data.get('passage_id')
+            class_id = data.get('class_id')
+            students = parse_json(data.get('students'))
+        results = grade_class(passage_id, students)
+    except (BatchFormatError, UnicodeDecodeError) as e:
+        return jsonify({"error": str(e)}), 400
+
+    if "error" in results:
+        return jsonify(results), 404
+    log = get_response_log()
+    if log:
+        log.append_many(passage_id, students)
+    for student_result in results["results"]:
+        _save_reading_result("reading", passage_id, student_result, student_result["student_id"], class_id)
     return jsonify(results)
 
 
+@main.route('/reading/analysis')
+@main.route('/reading/analysis/<passage_id>')
+def reading_item_analysis(passage_id=None):
+    """Item difficulty, discrimination and distractor statistics from logged responses."""
+    log = get_response_log()
+    if passage_id is None:
+        return jsonify(analyze_bank(log.responses() if log else {}))
+    analysis = analyze_passage(passage_id, log.responses(passage_id) if log else [])
+    if analysis is None:
+        return jsonify({"error": "Passage not found"}), 404
+    return jsonify(analysis)
+
+
 @main.route('/writing')
 def writing_assessment():
     assessment = WritingAssessment()
@@ -47,20 +220,267 @@ def writing_test(prompt_id):
     prompt_data = assessment.get_prompt(prompt_id)
     if not prompt_data:
         return "Prompt not found", 404
-    return render_template('writing_test.html', prompt=prompt_data)
+    return render_template('writing_test.html', prompt=prompt_data, category_names=CATEGORY_NAMES)
 
 
 @main.route('/writing/submit', methods=['POST'])
 def submit_writing():
     data = request.json
     assessment = WritingAssessment()
-    results = assessment.evaluate_writing(data['prompt_id'], data['response'])
-    return jsonify(results)
+    if not assessment.get_prompt(data['prompt_id']):
+        return jsonify({"error": "Prompt not found"}), 404
+
+    def evaluate(job):
+        # Each rubric category is pushed to the page as soon as it is ready
+        results = assessment.evaluate_writing(
+            data['prompt_id'], data['response'],
+            on_category=lambda key, category: job.publish("progress", {"key": key, "category": category})
+        )
+        store = get_results_store()
+        if store:
+            store.record("writing", data['prompt_id'], results,
+                         student_id=data.get('student_id'), class_id=data.get('class_id'))
+        return results
+
+    # Evaluation can take many seconds; run it off the request thread
+    try:
+        job = get_writing_queue().submit(profile_job(evaluate, "writing_job"), with_job=True)
+    except QueueFull:
+        return jsonify({"error": "Too many submissions right now. Please try again shortly."}), 503, {"Retry-After": "5"}
+
+    status = {
+        "job_id": job.id,
+        "status": job.status,
+        "status_url": url_for('main.writing_job', job_id=job.id)
+    }
+    # Streams hold a request worker until the job ends, so they are only offered on async servers
+    if job_events_enabled():
+        status["events_url"] = url_for('main.writing_job_events', job_id=job.id)
+    return jsonify(status), 202
+
+
+@main.route('/writing/jobs/<job_id>')
+def writing_job(job_id):
+    jobs = get_writing_queue()
+    job = jobs.get(job_id)
+    if not job:
+        return jsonify({"error": "Job not found"}), 404
+    data = job.to_dict()
+    if job.status == "queued":
+        data["queue_position"] = jobs.position(job)
+    return jsonify(data)
+
+
+@main.route('/writing/jobs/<job_id>/events')
+def writing_job_events(job_id):
+    job = get_writing_queue().get(job_id) if job_events_enabled() else None
+    if not job:
+        return jsonify({"error": "Job not found"}), 404
+
+    def stream():
+        seen = 0
+        while True:
+            events = job.wait_for_events(seen, timeout=15)
+            if not events:
+                # Comment line keeps proxies from closing an idle stream
+                yield ": keep-alive\n\n"
+                continue
+            for event, payload in events:
+                yield f"event: {event}\ndata: {json.dumps(payload)}\n\n"
+            seen += len(events)
+            if events[-1][0] in ("done", "failed"):
+                return
+
+    return Response(stream(), mimetype='text/event-stream', headers={"Cache-Control": "no-cache"})
 
 
 @main.route('/results')
 def results():
-    return render_template('results.html')
+    student_id = request.args.get('student_id', '').strip()
+    class_id = request.args.get('class_id', '').strip()
+    store = get_results_store()
+    attempts, progress = [], None
+    if store and (student_id or class_id):
+        # A student's own page, or the whole class when only a class is given
+        attempts = store.history(student_id=student_id or None, class_id=None if student_id else class_id,
+                                 limit=100)
+        progress = store.progress(student_id=student_id or None, class_id=class_id or None)
+    tracer = get_knowledge_tracer()
+    mastery = tracer.student_mastery(student_id) if tracer and student_id else {}
+    return render_template('results.html', student_id=student_id, class_id=class_id, attempts=attempts,
+                           progress=progress, mastery=mastery, titles=item_titles(),
+                           store_enabled=store is not None, excel_export=HAS_OPENPYXL,
+                           pdf_reports=HAS_REPORTLAB)
+
+
+@main.route('/results/history')
+def results_history():
+    """Saved attempts as JSON, newest first, filtered by student, class, kind or item."""
+    store = get_results_store()
+    if not store:
+        return jsonify({"error": "Results are not being saved"}), 404
+    try:
+        limit = min(int(request.args.get('limit', 50)), 1000)
+        since = float(request.args['since']) if request.args.get('since') else None
+    except ValueError:
+        return jsonify({"error": "limit and since must be numbers"}), 400
+    attempts = store.history(
+        student_id=request.args.get('student_id') or None,
+        class_id=request.args.get('class_id') or None,
+        kind=request.args.get('kind') or None,
+        item_id=request.args.get('item_id') or None,
+        since=since,
+        limit=limit,
+        include_result=request.args.get('include_result') == '1'
+    )
+    return jsonify({"attempts": attempts})
+
+
+@main.route('/results/progress')
+def results_progress():
+    """Progress rollups per skill and rubric category for one student_id or class_id."""
+    store = get_results_store()
+    if not store:
+        return jsonify({"error": "Results are not being saved"}), 404
+    student_id = request.args.get('student_id') or None
+    class_id = request.args.get('class_id') or None
+    if not student_id and not class_id:
+        return jsonify({"error": "student_id or class_id is required"}), 400
+    progress = store.progress(student_id=student_id, class_id=class_id)
+    progress.update(student_id=student_id, class_id=None if student_id else class_id)
+    tracer = get_knowledge_tracer()
+    if tracer and student_id:
+        progress["mastery"] = tracer.student_mastery(student_id)
+    return jsonify(progress)
+
+
+@main.route('/results/export.<file_format>')
+def results_export(file_format):
+    """Download saved results as CSV or XLSX, filtered by class_id, student_id, kind, since or until."""
+    if file_format not in ('csv', 'xlsx'):
+        return jsonify({"error": "Export format must be csv or xlsx"}), 404
+    if file_format == 'xlsx' and not HAS_OPENPYXL:
+        return jsonify({"error": "Excel export is not installed on this server; download CSV instead"}), 501
+    store = get_results_store()
+    if not store:
+        return jsonify({"error": "Results are not being saved"}), 404
+    try:
+        since = float(request.args['since']) if request.args.get('since') else None
+        until = float(request.args['until']) if request.args.get('until') else None
+    except ValueError:
+        return jsonify({"error": "since and until must be numbers"}), 400
+    class_id = request.args.get('class_id') or None
+    student_id = request.args.get('student_id') or None
+    kind = request.args.get('kind') or None
+
+    attempts = store.replay(kinds=(kind,) if kind else None, student_id=student_id, class_id=class_id,
+                            since=since, until=until)
+    name = "-".join(part for part in ("results", class_id, student_id, time.strftime("%Y%m%d")) if part)
+    headers = {"Content-Disposition": f'attachment; filename="{_safe_filename(name)}.{file_format}"'}
+    if file_format == 'csv':
+        return Response(iter_csv(attempts, ExportColumns(), item_titles()),
+                        mimetype='text/csv', headers=headers)
+    return Response(iter_xlsx(attempts, ExportColumns(), item_titles()), headers=headers,
+                    mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
+
+
+def _safe_filename(name):
+    return "".join(c if c.isalnum() or c in "-_" else "_" for c in name)
+
+
+@main.route('/results/reports', methods=['POST'])
+def start_progress_reports():
+    """Render PDF progress reports for a class (or given students) into a zip, in the background."""
+    if not HAS_REPORTLAB:
+        return jsonify({"error": "PDF reports are not installed on this server"}), 501
+    store = get_results_store()
+    if not store:
+        return jsonify({"error": "Results are not being saved"}), 404
+    data = request.get_json(silent=True)
+    if isinstance(data, dict):
+        class_id = data.get('class_id') or None
+        student_ids = data.get('student_ids') or []
+        if not isinstance(student_ids, list) or not all(isinstance(s, str) and s for s in student_ids):
+            return jsonify({"error": "student_ids must be a list of student ids"}), 400
+    else:
+        class_id = request.form.get('class_id') or None
+        # One form field per student; blank fields are ignored
+        student_ids = [s for s in request.form.getlist('student_ids') if s]
+    student_ids = student_ids or None
+    if not class_id and not student_ids:
+        return jsonify({"error": "class_id or student_ids is required"}), 400
+
+    jobs = get_report_queue()
+    directory = os.environ.get('REPORT_DIR', DEFAULT_REPORT_DIR)
+
+    def render(job):
+        remove_old_archives(directory, jobs.result_ttl)
+        reports = class_reports(store, get_knowledge_tracer(), class_id=class_id,
+                                student_ids=student_ids, titles=item_titles())
+        return generate_reports(
+            reports, os.path.join(directory, f"{job.id}.zip"),
+            on_progress=lambda done, seconds: job.publish("progress", {"reports": done,
+                                                                       "seconds": round(seconds, 1)})
+        )
+
+    try:
+        job = jobs.submit(render, with_job=True)
+    except QueueFull:
+        return jsonify({"error": "Reports are already being prepared. Please try again shortly."}), 503, {"Retry-After": "30"}
+    return jsonify({
+        "job_id": job.id,
+        "status": job.status,
+        "status_url": url_for('main.progress_reports_job', job_id=job.id)
+    }), 202
+
+
+@main.route('/results/reports/<job_id>')
+def progress_reports_job(job_id):
+    job = get_report_queue().get(job_id)
+    if not job:
+        return jsonify({"error": "Job not found"}), 404
+    data = job.to_dict()
+    if job.status == "running":
+        # Only the latest count matters, not every update
+        data["progress"] = data["progress"][-1:]
+    elif job.status == "done":
+        data["result"] = dict(data["result"], download_url=url_for('main.progress_reports_download',
+                                                                   job_id=job.id))
+    return jsonify(data)
+
+
+@main.route('/results/reports/<job_id>/download')
+def progress_reports_download(job_id):
+    job = get_report_queue().get(job_id)
+    if not job or job.status != "done":
+        return jsonify({"error": "Reports not ready"}), 404
+    path = os.path.join(os.environ.get('REPORT_DIR', DEFAULT_REPORT_DIR), f"{job.id}.zip")
+    if not os.path.exists(path):
+        return jsonify({"error": "Reports have expired"}), 404
+    return send_file(os.path.abspath(path), mimetype='application/zip', as_attachment=True,
+                     download_name=f"progress-reports-{time.strftime('%Y%m%d')}.zip")
+
+
+@main.route('/health')
+def health():
+    evaluator = get_evaluator()
+    return jsonify({
+        "status": "ok",
+        "ai_available": evaluator.is_available(),
+        "ai_backend": {"name": evaluator.backend.name, "model": evaluator.model},
+        "connection_pool": pool_stats(),
+        "evaluation_cache": evaluator.cache.stats() if evaluator.cache else None,
+        "ai_usage": evaluator.usage.snapshot(),
+        "circuit_breaker": evaluator.breaker.snapshot(),
+        "writing_jobs": get_writing_queue().stats(),
+        "results_store": get_results_store().stats() if get_results_store() else None,
+        "knowledge_tracing": get_knowledge_tracer().stats() if get_knowledge_tracer() else None
+    })
+
+
+@main.route('/metrics')
+def metrics():
+    return Response(REGISTRY.render(), mimetype='text/plain; version=0.0.4')
 
 
 @main.route('/guides')
@@ -3,3 +3,22 @@
 document.addEventListener('DOMContentLoaded', function() {
     console.log('Ontario Reading & Writing Assessment Tool loaded');
 });
+
+// Optional student and class ids, remembered in this browser (set on the
+// Results page) so each submission is saved to the right history
+function getStudentIdentity() {
+    return {
+        student_id: localStorage.getItem('studentId') || null,
+        class_id: localStorage.getItem('classId') || null
+    };
+}
+
+function setStudentIdentity(studentId, classId) {
+    for (const [key, value] of [['studentId', studentId], ['classId', classId]]) {
+        if (value) {
+            localStorage.setItem(key, value);
+        } else {
+            localStorage.removeItem(key);
+        }
+    }
+}
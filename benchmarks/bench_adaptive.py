@@ -0,0 +1,105 @@
+"""
+Adaptive Test Benchmark
+Simulates students taking the adaptive reading test and the real fixed form
+(every question of one randomly chosen passage, submitted together), and
+times item selection and ability updates.
+
+Run from the project root:
+    python -m benchmarks.bench_adaptive
+"""
+
+import argparse
+import timeit
+
+import numpy as np
+
+from app.assessments.adaptive import (DEFAULT_BATCH_SIZE, DEFAULT_MAX_ITEMS, DEFAULT_MIN_ITEMS,
+                                      DEFAULT_SE_TARGET, GRID, get_item_bank)
+
+
+def answer(bank, item, ability, rng):
+    """Simulate one response under the Rasch model."""
+    p = 1 / (1 + np.exp(bank.difficulties[item] - ability))
+    return int(rng.random() < p)
+
+
+def simulate_fixed(bank, abilities, rng):
+    """Return (questions asked, answer requests, final estimate, standard error) per student."""
+    forms = [np.flatnonzero(mask).tolist() for mask in bank.passage_mask.values()]
+    results = []
+    for ability in abilities:
+        used = forms[rng.integers(len(forms))]
+        responses = [answer(bank, item, ability, rng) for item in used]
+        theta, standard_error = bank.estimate(used, responses)
+        results.append((len(used), 1, theta, standard_error))
+    return np.array(results)
+
+
+def simulate_adaptive(bank, abilities, se_target, min_items, max_items, batch_size, rng):
+    """The same for the adaptive test, run exactly as adaptive.next_step() runs it."""
+    results = []
+    for ability in abilities:
+        used, responses, requests = [], [], 0
+        theta, standard_error = bank.estimate(used, responses)
+        while len(used) < max_items and not (len(used) >= min_items and standard_error < se_target):
+            current = bank.passage_of[used[-1]] if used else None
+            batch = bank.select_batch(theta, used, min(batch_size, max_items - len(used)), current)
+            if not batch:
+                break
+            requests += 1
+            for item in batch:
+                used.append(item)
+                responses.append(answer(bank, item, ability, rng))
+            theta, standard_error = bank.estimate(used, responses)
+        results.append((len(used), requests, theta, standard_error))
+    return np.array(results)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--students", type=int, default=1000)
+    parser.add_argument("--se-target", type=float, default=DEFAULT_SE_TARGET)
+    parser.add_argument("--min-items", type=int, default=DEFAULT_MIN_ITEMS)
+    parser.add_argument("--max-items", type=int, default=DEFAULT_MAX_ITEMS)
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+    parser.add_argument("--ability-sd", type=float, default=1.0, help="spread of simulated abilities")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    bank = get_item_bank()
+    rng = np.random.default_rng(args.seed)
+    if not bank.calibrated:
+        # Without a calibration file, spread the bank like a calibrated one
+        print("note: no calibration file; using simulated difficulties")
+        difficulties = rng.normal(0.0, 1.0, size=len(bank.item_ids))
+        bank.difficulties = difficulties
+        p = 1 / (1 + np.exp(difficulties[None, :] - GRID[:, None]))
+        bank.information, bank.log_right, bank.log_wrong = p * (1 - p), np.log(p), np.log1p(-p)
+
+    abilities = rng.normal(0.0, args.ability_sd, size=args.students)
+    fixed = simulate_fixed(bank, abilities, rng)
+    adaptive = simulate_adaptive(bank, abilities, args.se_target, args.min_items, args.max_items,
+                                 args.batch_size, rng)
+
+    print(f"students: {args.students}, bank: {len(bank.item_ids)} questions, SE target {args.se_target}, "
+          f"{args.min_items}-{args.max_items} questions, {args.batch_size} per request")
+    print(f"{'':>10}{'questions':>11}{'answer requests':>17}{'mean SE':>9}{'RMSE vs true':>14}")
+    for name, results in (("fixed", fixed), ("adaptive", adaptive)):
+        rmse = np.sqrt(np.mean((results[:, 2] - abilities) ** 2))
+        print(f"{name:>10}{results[:, 0].mean():>11.1f}{results[:, 1].mean():>17.1f}"
+              f"{results[:, 3].mean():>9.3f}{rmse:>14.3f}")
+    print(f"questions saved: {1 - adaptive[:, 0].mean() / fixed[:, 0].mean():.0%}, "
+          f"answer requests added: {adaptive[:, 1].mean() - fixed[:, 1].mean():+.1f}")
+
+    used = list(range(0, len(bank.item_ids), 5))
+    responses = [1, 0] * (len(used) // 2) + [1] * (len(used) % 2)
+    select_us = min(timeit.repeat(
+        lambda: bank.select_batch(0.3, used, args.batch_size, bank.passage_of[used[-1]]),
+        number=2000, repeat=5)) / 2000 * 1e6
+    estimate_us = min(timeit.repeat(lambda: bank.estimate(used, responses),
+                                    number=2000, repeat=5)) / 2000 * 1e6
+    print(f"select next batch: {select_us:.1f} us, update ability: {estimate_us:.1f} us")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+"""
+Batch Grading Benchmark
+Compares grading a class one student at a time through
+ReadingAssessment.evaluate_answers with the vectorized batch grader.
+
+Run from the project root:
+    python -m benchmarks.bench_batch_grading
+"""
+
+import argparse
+import random
+import timeit
+
+from app.assessments.batch_grading import grade_class
+from app.assessments.reading import ReadingAssessment, get_passage_catalog
+
+
+def make_class(passage, size, seed=7):
+    """Random answers for a class, with a few questions left blank."""
+    rng = random.Random(seed)
+    return [
+        (f"student_{n}", {q["id"]: rng.randint(0, 3) for q in passage["questions"] if rng.random() < 0.95})
+        for n in range(size)
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--passage", default="indigenous_1", help="passage to grade")
+    parser.add_argument("--repeat", type=int, default=5, help="timing runs; best is reported")
+    args = parser.parse_args()
+
+    passage = get_passage_catalog()[args.passage]
+    assessment = ReadingAssessment()
+
+    print(f"{'students':>9}{'one at a time (ms)':>20}{'batch (ms)':>12}")
+    for size in (30, 300, 3000):
+        students = make_class(passage, size)
+        number = max(1, 3000 // size)
+        loop = min(timeit.repeat(
+            lambda: [assessment.evaluate_answers(args.passage, answers) for _, answers in students],
+            number=number, repeat=args.repeat)) / number * 1000
+        batch = min(timeit.repeat(lambda: grade_class(args.passage, students),
+                                  number=number, repeat=args.repeat)) / number * 1000
+        print(f"{size:>9}{loop:>20.2f}{batch:>12.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""
+Rasch Calibration Benchmark
+Simulates a district's response history, with students taking several
+passages each, then times calibration and checks how well the true item
+difficulties are recovered.
+
+Run from the project root:
+    python -m benchmarks.bench_calibration --students 100000
+"""
+
+import argparse
+import time
+
+import numpy as np
+
+from app.assessments.calibration import calibrate
+from app.assessments.reading import get_passage_catalog
+
+
+def simulate_records(students, passages_each, seed):
+    """Response log records drawn from a Rasch model with known difficulties."""
+    rng = np.random.default_rng(seed)
+    catalog = get_passage_catalog()
+    passage_ids = list(catalog)
+    true_difficulty = {
+        (passage_id, question["id"]): rng.normal(0.0, 1.0)
+        for passage_id in passage_ids for question in catalog[passage_id]["questions"]
+    }
+    abilities = rng.normal(0.0, 1.0, size=students)
+
+    records = []
+    for student, ability in enumerate(abilities.tolist()):
+        for passage_id in rng.choice(passage_ids, passages_each, replace=False).tolist():
+            questions = catalog[passage_id]["questions"]
+            draws = rng.random(len(questions)).tolist()
+            answers = {}
+            for question, draw in zip(questions, draws):
+                p = 1 / (1 + np.exp(true_difficulty[(passage_id, question["id"])] - ability))
+                right = question["correct"]
+                answers[question["id"]] = right if draw < p else (right + 1) % len(question["options"])
+            records.append((passage_id, f"student_{student}", answers))
+    return records, true_difficulty
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--students", type=int, default=100000)
+    parser.add_argument("--passages-each", type=int, default=2, help="passages taken per student")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    records, true_difficulty = simulate_records(args.students, args.passages_each, args.seed)
+    started = time.perf_counter()
+    calibration = calibrate(records)
+    elapsed = time.perf_counter() - started
+
+    fitted, truth = [], []
+    for passage_id, items in calibration["items"].items():
+        for question_id, item in items.items():
+            fitted.append(item["difficulty"])
+            truth.append(true_difficulty[(passage_id, question_id)])
+    fitted, truth = np.array(fitted), np.array(truth)
+    truth -= truth.mean()
+
+    print(f"responses:    {calibration['response_count']:,} from {calibration['person_count']:,} students")
+    print(f"calibration:  {elapsed:.2f} s ({calibration['iterations']} iterations)")
+    print(f"items:        {len(fitted)}")
+    print(f"correlation:  {np.corrcoef(fitted, truth)[0, 1]:.4f} with true difficulties")
+    print(f"RMSE:         {np.sqrt(np.mean((fitted - truth) ** 2)):.3f} logits")
+
+
+if __name__ == "__main__":
+    main()
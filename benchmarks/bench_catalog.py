@@ -0,0 +1,65 @@
+"""
+Catalog Construction Benchmark
+Compares the per-request cost of building the passage and prompt banks on
+every request (the old behaviour) with reusing the process-wide catalogs.
+
+Run from the project root:
+    python -m benchmarks.bench_catalog
+"""
+
+import argparse
+import timeit
+
+from app.assessments.reading import ReadingAssessment
+from app.assessments.writing import WritingAssessment, get_prompt_catalog
+
+
+def _rebuild_reading_request():
+    """What every reading route used to pay: a fresh passage literal."""
+    passages = ReadingAssessment._load_passages()
+    return passages.get("fiction_1")
+
+
+def _shared_reading_request():
+    """What every reading route pays now."""
+    return ReadingAssessment().get_passage("fiction_1")
+
+
+def _rebuild_writing_request():
+    prompts = WritingAssessment._load_prompts()
+    return prompts.get("narrative_1")
+
+
+def _shared_writing_request():
+    return get_prompt_catalog().get("narrative_1")
+
+
+def _per_call_us(func, number, repeat):
+    """Best-of-repeat time per call, in microseconds."""
+    timings = timeit.repeat(func, number=number, repeat=repeat)
+    return min(timings) / number * 1_000_000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--number", type=int, default=2000, help="calls per timing run")
+    parser.add_argument("--repeat", type=int, default=5, help="timing runs; best is reported")
+    args = parser.parse_args()
+
+    # Build the shared catalogs up front so the first timed call is not special
+    ReadingAssessment()
+    get_prompt_catalog()
+
+    cases = [
+        ("reading", _rebuild_reading_request, _shared_reading_request),
+        ("writing", _rebuild_writing_request, _shared_writing_request),
+    ]
+    print(f"{'catalog':<10}{'before (us)':>14}{'after (us)':>14}{'speedup':>10}")
+    for name, before, after in cases:
+        before_us = _per_call_us(before, args.number, args.repeat)
+        after_us = _per_call_us(after, args.number, args.repeat)
+        print(f"{name:<10}{before_us:>14.2f}{after_us:>14.2f}{before_us / after_us:>9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
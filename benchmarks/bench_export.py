@@ -0,0 +1,62 @@
+"""
+Results Export Benchmark
+Exports growing numbers of saved results to CSV and XLSX and reports the
+peak Python memory (tracemalloc) and rows per second, to check that export
+memory stays flat however many rows there are.
+
+Run from the project root:
+    python -m benchmarks.bench_export --results 2000 20000
+"""
+
+import argparse
+import os
+import tempfile
+import time
+import tracemalloc
+
+from app.assessments.export import HAS_OPENPYXL, ExportColumns, iter_csv, iter_xlsx
+from app.assessments.results_store import ResultsStore
+from benchmarks.bench_results_store import sample_results
+
+
+def fill_store(path, count):
+    store = ResultsStore(path, max_queue=count)
+    for passage_id, student_id, class_id, result in sample_results(count):
+        store.record("reading", passage_id, result, student_id=student_id, class_id=class_id)
+    store.flush()
+    return store
+
+
+def measure(export, store, columns):
+    """Consume one export; return (bytes, seconds, peak bytes)."""
+    started = time.perf_counter()
+    size = sum(len(piece) for piece in export(store.replay(), columns, {}))
+    seconds = time.perf_counter() - started
+    # Memory is measured on a second run, since tracing slows everything down
+    tracemalloc.start()
+    sum(len(piece) for piece in export(store.replay(), columns, {}))
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return size, seconds, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--results", type=int, nargs="+", default=[2000, 20000])
+    args = parser.parse_args()
+
+    exports = [("csv", iter_csv)] + ([("xlsx", iter_xlsx)] if HAS_OPENPYXL else [])
+    if not HAS_OPENPYXL:
+        print("openpyxl is not installed; timing CSV only")
+    columns = ExportColumns()
+    directory = tempfile.mkdtemp()
+    print(f"{'format':<8}{'rows':>8}{'file MB':>10}{'rows/s':>10}{'peak MB':>10}")
+    for count in args.results:
+        store = fill_store(os.path.join(directory, f"results-{count}.sqlite3"), count)
+        for name, export in exports:
+            size, seconds, peak = measure(export, store, columns)
+            print(f"{name:<8}{count:>8}{size / 1e6:>10.2f}{count / seconds:>10,.0f}{peak / 1e6:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""
+Item Analysis Benchmark
+Times reading a response log and computing item statistics for every
+passage, on simulated responses from students of varying ability.
+
+Run from the project root:
+    python -m benchmarks.bench_item_analysis --responses 100000
+"""
+
+import argparse
+import os
+import tempfile
+import time
+
+import numpy as np
+
+from app.assessments.item_analysis import analyze_bank
+from app.assessments.reading import get_passage_catalog
+from app.assessments.response_log import ResponseLog
+
+
+def simulate_responses(passage, count, rng):
+    """Rasch-style answers: abler students and easier questions go right more often."""
+    questions = passage["questions"]
+    ability = rng.normal(0.0, 1.0, size=(count, 1))
+    difficulty = rng.normal(-0.5, 1.0, size=len(questions))
+    right = rng.random((count, len(questions))) < 1 / (1 + np.exp(difficulty - ability))
+    correct = np.array([q["correct"] for q in questions])
+    # Wrong answers spread over the other options; about 2% are left blank
+    wrong = (correct + rng.integers(1, 4, size=right.shape)) % 4
+    answers = np.where(right, correct, wrong)
+    blank = rng.random(right.shape) < 0.02
+    ids = [q["id"] for q in questions]
+    return [
+        {qid: answer for qid, answer, skip in zip(ids, row, skipped) if not skip}
+        for row, skipped in zip(answers.tolist(), blank.tolist())
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--responses", type=int, default=100000, help="total responses across all passages")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    catalog = get_passage_catalog()
+    per_passage = args.responses // len(catalog)
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "responses.jsonl")
+        log = ResponseLog(path)
+        for passage_id, passage in catalog.items():
+            log.append_many(passage_id, [(None, a) for a in simulate_responses(passage, per_passage, rng)])
+        size_mb = os.path.getsize(path) / 1e6
+
+        started = time.perf_counter()
+        responses = ResponseLog(path).responses()
+        loaded = time.perf_counter()
+        report = analyze_bank(responses)
+        finished = time.perf_counter()
+
+    flagged = sum(1 for p in report["passages"] for item in p["items"] if item["flags"])
+    print(f"responses:      {report['response_count']:,} ({size_mb:.1f} MB log)")
+    print(f"load log:       {(loaded - started) * 1000:8.1f} ms")
+    print(f"analyse bank:   {(finished - loaded) * 1000:8.1f} ms")
+    print(f"flagged items:  {flagged}")
+    for passage in report["passages"]:
+        print(f"  {passage['passage_id']:<14} alpha={passage['cronbach_alpha']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,39 @@
+"""
+Local Rubric Scorer Benchmark
+Times the offline feature-based scorer, which must stay under 5 ms per essay
+to serve as the low-latency evaluation tier.
+
+Run from the project root:
+    python -m benchmarks.bench_local_scorer
+"""
+
+import argparse
+import timeit
+
+from app.assessments.local_scorer import score_writing
+from benchmarks.bench_text_analysis import make_essay
+
+
+BUDGET_MS = 5.0
+PROMPT_INFO = {"title": "Screen Time: Help or Harm?", "type": "Opinion/Persuasive Writing",
+               "word_minimum": 250, "word_maximum": 500}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--number", type=int, default=200, help="calls per timing run")
+    parser.add_argument("--repeat", type=int, default=5, help="timing runs; best is reported")
+    args = parser.parse_args()
+
+    print(f"{'words':>6}{'ms/essay':>10}{'level':>7}  budget")
+    for word_count in (250, 500, 1000, 2500, 5000):
+        essay = make_essay(word_count)
+        per_call = min(timeit.repeat(lambda: score_writing(essay, PROMPT_INFO),
+                                     number=args.number, repeat=args.repeat)) / args.number
+        ms = per_call * 1000
+        level = score_writing(essay, PROMPT_INFO)["overall_level"]
+        print(f"{word_count:>6}{ms:>10.3f}{level:>7}  {'ok' if ms < BUDGET_MS else 'OVER'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""
+Progress Report Benchmark
+Renders a school's worth of PDF progress reports three ways and reports
+reports per second:
+
+    one by one      Each report loads its fonts and styles from scratch, as
+                    rendering in a request thread would
+    pool x1         generate_reports with one worker process (fonts and
+                    styles cached, zip written incrementally)
+    pool xN         generate_reports with one worker per CPU
+
+Reports are synthetic, with realistic numbers of skills, rubric categories
+and recent attempts, so no results database is needed.
+
+Run from the project root:
+    python -m benchmarks.bench_progress_reports --students 300
+"""
+
+import argparse
+import os
+import random
+import tempfile
+import time
+
+from app.assessments import report_pdf
+from app.assessments.knowledge_tracing import catalog_skills
+from app.assessments.progress_reports import generate_reports, report_fonts
+from app.assessments.writing import CATEGORY_NAMES
+
+
+def synthetic_reports(count, seed=0):
+    rng = random.Random(seed)
+    skills = catalog_skills()
+    for n in range(count):
+        skill_rows = []
+        for name in rng.sample(skills, 14):
+            total = rng.randint(1, 6)
+            correct = rng.randint(0, total)
+            mastery = rng.random()
+            skill_rows.append({"name": name, "correct": correct, "total": total,
+                               "average": correct / total * 100, "rolling_average": rng.uniform(0, 100),
+                               "mastery": mastery, "mastered": mastery >= 0.95})
+        yield {
+            "student_id": f"student-{n:04d}",
+            "class_id": f"class-{n // 30}",
+            "generated": "October 18, 2026",
+            "skills": skill_rows,
+            "writing": {
+                "categories": [{"label": label, "latest": rng.randint(1, 4),
+                                "average": rng.uniform(1, 4), "attempts": rng.randint(1, 5)}
+                               for label in CATEGORY_NAMES.values()],
+                "overall_level": rng.randint(1, 4),
+                "top_priority": "Focus on your logical flow. Use linking words like 'because' or "
+                                "'for example' to show how your points connect."
+            },
+            "recent": [{"title": "The Last Light", "date": "2026-10-01", "kind": "reading",
+                        "score": rng.uniform(20, 100), "level": f"Level {rng.randint(1, 4)}"}
+                       for _ in range(6)]
+        }
+
+
+def one_by_one(count):
+    started = time.perf_counter()
+    for report in synthetic_reports(count):
+        report_pdf.init_worker(report_fonts())
+        report_pdf.render_report(report)
+    return time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--students", type=int, default=300)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    if not report_pdf.HAS_REPORTLAB:
+        raise SystemExit("PDF reports need reportlab (pip install reportlab)")
+    directory = tempfile.mkdtemp()
+    print(f"{args.students} reports on {os.cpu_count()} CPUs")
+    seconds = one_by_one(args.students)
+    print(f"{'one by one':<14}{args.students / seconds:>8.1f} reports/s")
+    for workers in sorted({1, args.workers}):
+        summary = generate_reports(synthetic_reports(args.students),
+                                   os.path.join(directory, f"reports-{workers}.zip"), workers=workers)
+        print(f"{f'pool x{workers}':<14}{summary['reports_per_second']:>8.1f} reports/s  "
+              f"({summary['bytes'] / 1e6:.1f} MB zip, including {workers} worker start-up)")
+
+
+if __name__ == "__main__":
+    main()
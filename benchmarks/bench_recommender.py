@@ -0,0 +1,66 @@
+"""
+Passage Recommender Benchmark
+Times building the passage x skill matrix and ranking passages for one
+student, on the real catalog and on synthetic banks of hundreds of passages.
+
+Run from the project root:
+    python -m benchmarks.bench_recommender --passages 100 500 2000
+"""
+
+import argparse
+import random
+import time
+import timeit
+
+import numpy as np
+
+from app.assessments.reading import get_passage_catalog
+from app.assessments.recommender import PassageRecommender
+
+
+STRANDS = ("comprehension", "critical_literacy", "vocabulary", "Canadian_literature", "media_literacy")
+
+
+def synthetic_catalog(passages, skills, seed=0):
+    """A bank of passages with five questions each over a pool of skills."""
+    rng = random.Random(seed)
+    skill_names = [f"Skill {n}" for n in range(skills)]
+    return {
+        f"passage_{n}": {
+            "title": f"Passage {n}",
+            "questions": [{"skill": rng.choice(skill_names)} for _ in range(5)],
+            "curriculum_alignment": tuple(rng.sample(STRANDS, 2))
+        }
+        for n in range(passages)
+    }
+
+
+def time_bank(label, catalog, seen_fraction=0.3):
+    started = time.perf_counter()
+    recommender = PassageRecommender(catalog)
+    build_ms = (time.perf_counter() - started) * 1000
+
+    rng = np.random.default_rng(0)
+    weakness = rng.random(len(recommender.skills), dtype=np.float32)
+    seen = set(rng.choice(recommender.passage_ids, int(len(catalog) * seen_fraction), replace=False).tolist())
+    timer = timeit.Timer(lambda: recommender.recommend(weakness, seen, 3))
+    number, _ = timer.autorange()
+    per_call = min(timer.repeat(repeat=5, number=number)) / number * 1e6
+    print(f"{label:<22}{len(recommender.passage_ids):>9}{len(recommender.skills):>8}"
+          f"{build_ms:>11.2f}{per_call:>14.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--passages", type=int, nargs="+", default=[100, 500, 2000])
+    parser.add_argument("--skills", type=int, default=60)
+    args = parser.parse_args()
+
+    print(f"{'bank':<22}{'passages':>9}{'skills':>8}{'build ms':>11}{'recommend us':>14}")
+    time_bank("catalog", get_passage_catalog())
+    for passages in args.passages:
+        time_bank("synthetic", synthetic_catalog(passages, args.skills))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""
+AI Replay Benchmark
+Runs writing evaluations through AIEvaluator from a recorded cassette, so the
+whole evaluation pipeline can be timed repeatably without the network.
+
+Without --cassette, a cassette is first recorded from the bundled stub
+server (python -m benchmarks.stub_server) into a temporary file.
+
+Run from the project root:
+    python -m benchmarks.bench_replay --speed 1 --concurrency 8
+    python -m benchmarks.bench_replay --cassette instance/ai_cassette.jsonl.gz --speed 0
+"""
+
+import argparse
+import os
+import statistics
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from app.assessments.ai_evaluator import AIEvaluator
+from app.assessments.backends import DEFAULT_MODEL, RecordingBackend, ReplayBackend, StubBackend
+from app.assessments.cassette import Cassette
+from benchmarks.bench_text_analysis import make_essay
+from benchmarks.stub_server import StubConfig, start_server
+
+
+PROMPT_INFO = {"title": "Screen Time: Help or Harm?", "type": "Opinion/Persuasive Writing",
+               "word_minimum": 250, "word_maximum": 500}
+
+
+def record_from_stub(path, count, latency):
+    """Record count evaluations of distinct essays from a local stub server."""
+    server, _ = start_server(StubConfig(latency, seed=1))
+    backend = StubBackend(f"http://127.0.0.1:{server.server_port}", model=DEFAULT_MODEL)
+    evaluator = AIEvaluator(RecordingBackend(backend, path))
+    with ThreadPoolExecutor(max_workers=16) as pool:
+        list(pool.map(lambda n: evaluator.evaluate_writing(make_essay(300, seed=n), PROMPT_INFO),
+                      range(count)))
+    server.shutdown()
+
+
+def percentile(values, share):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * share))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--cassette", help="cassette to replay (default: record one from the stub)")
+    parser.add_argument("--record-count", type=int, default=200, help="calls to record from the stub")
+    parser.add_argument("--record-latency", default="lognormal:0.5:0.4", help="stub latency when recording")
+    parser.add_argument("--speed", type=float, default=0.0, help="multiplier on recorded latencies")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--stream", action="store_true", help="replay as streamed calls")
+    args = parser.parse_args()
+
+    path = args.cassette
+    if path is None:
+        path = os.path.join(tempfile.mkdtemp(), "bench_cassette.jsonl.gz")
+        started = time.perf_counter()
+        record_from_stub(path, args.record_count, args.record_latency)
+        print(f"Recorded {args.record_count} calls from the stub in "
+              f"{time.perf_counter() - started:.1f}s ({os.path.getsize(path):,} bytes)")
+
+    cassette = Cassette(path)
+    evaluator = AIEvaluator(ReplayBackend(cassette, model=DEFAULT_MODEL, speed=args.speed))
+    entries = list(cassette.entries.values())
+    on_category = (lambda key, category: None) if args.stream else None
+
+    def run(entry):
+        started = time.perf_counter()
+        evaluator.evaluate_writing(entry["student_text"], entry["prompt_info"], on_category=on_category)
+        return time.perf_counter() - started
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        latencies = list(pool.map(run, entries))
+    wall = time.perf_counter() - started
+
+    recorded = [entry["latency"] * args.speed for entry in entries]
+    print(f"Replayed {len(entries)} calls at speed {args.speed:g}, concurrency {args.concurrency}"
+          f"{', streamed' if args.stream else ''}: {wall:.2f}s, {len(entries) / wall:.1f} evaluations/s")
+    print(f"{'':>10}{'mean':>10}{'p50':>10}{'p95':>10}")
+    for label, values in (("recorded", recorded), ("replayed", latencies)):
+        print(f"{label:>10}{statistics.mean(values):>10.3f}{percentile(values, 0.5):>10.3f}"
+              f"{percentile(values, 0.95):>10.3f}")
+    overhead = [replayed - expected for replayed, expected in zip(latencies, recorded)]
+    print(f"Pipeline overhead per evaluation: {statistics.mean(overhead) * 1000:.2f} ms mean")
+    print(f"Replay misses: {evaluator.backend.misses}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+"""
+Results Store Benchmark
+Compares saving results through the batched background writer with
+committing each result as it arrives, times history queries on a large
+table, and compares reading progress from the rollups with recomputing it
+from every saved attempt.
+
+Run from the project root:
+    python -m benchmarks.bench_results_store --results 20000
+"""
+
+import argparse
+import json
+import os
+import sqlite3
+import tempfile
+import time
+
+from app.assessments.reading import ReadingAssessment, get_passage_catalog
+from app.assessments import rollups
+from app.assessments.results_store import SCHEMA, ResultsStore, summarize_result
+
+
+def sample_results(count):
+    """Reading results for count attempts spread over 300 students in 10 classes."""
+    assessment = ReadingAssessment()
+    catalog = get_passage_catalog()
+    passage_ids = list(catalog)
+    results = []
+    for n in range(count):
+        passage_id = passage_ids[n % len(passage_ids)]
+        answers = {q["id"]: (q["correct"] + n) % 4 for q in catalog[passage_id]["questions"]}
+        results.append((passage_id, f"student-{n % 300}", f"class-{n % 300 // 30}",
+                        assessment.evaluate_answers(passage_id, answers)))
+    return results
+
+
+def progress_from_history(conn, column, value):
+    """What the dashboard would cost without rollups: fold every saved attempt."""
+    totals = {}
+    for kind, result in conn.execute(f"SELECT kind, result FROM attempts WHERE {column} = ?", (value,)):
+        for dimension, name, score, correct, total in rollups.observations(kind, json.loads(result)):
+            entry = totals.setdefault((dimension, name), [0, 0, 0, 0.0])
+            entry[0] += 1
+            entry[1] += correct
+            entry[2] += total
+            entry[3] += score
+    return totals
+
+
+def per_result_commits(path, results):
+    """The simple alternative: one synchronous transaction per submission."""
+    conn = sqlite3.connect(path)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.executescript(SCHEMA)
+    latencies = []
+    for passage_id, student_id, class_id, result in results:
+        started = time.perf_counter()
+        score, level = summarize_result("reading", result)
+        with conn:
+            conn.execute(
+                "INSERT INTO attempts (kind, item_id, student_id, class_id, score, level, created_at, result)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                ("reading", passage_id, student_id, class_id, score, level, time.time(), json.dumps(result))
+            )
+        latencies.append(time.perf_counter() - started)
+    conn.close()
+    return latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--results", type=int, default=20000)
+    args = parser.parse_args()
+
+    results = sample_results(args.results)
+    directory = tempfile.mkdtemp()
+
+    started = time.perf_counter()
+    latencies = per_result_commits(os.path.join(directory, "direct.sqlite3"), results)
+    direct_seconds = time.perf_counter() - started
+
+    # A queue big enough for the burst; a real server's submissions arrive far slower
+    store = ResultsStore(os.path.join(directory, "batched.sqlite3"), max_queue=args.results)
+    batched_latencies = []
+    started = time.perf_counter()
+    for passage_id, student_id, class_id, result in results:
+        call_started = time.perf_counter()
+        store.record("reading", passage_id, result, student_id=student_id, class_id=class_id)
+        batched_latencies.append(time.perf_counter() - call_started)
+    store.flush()
+    batched_seconds = time.perf_counter() - started
+    stats = store.stats()
+
+    def p99(values):
+        return sorted(values)[int(len(values) * 0.99)] * 1e6
+
+    print(f"{args.results:,} reading results")
+    print(f"{'':>22}{'mean us':>10}{'p99 us':>10}{'results/s':>12}")
+    print(f"{'commit per result':>22}{sum(latencies) / len(latencies) * 1e6:>10.1f}"
+          f"{p99(latencies):>10.1f}{args.results / direct_seconds:>12,.0f}")
+    print(f"{'batched writer':>22}{sum(batched_latencies) / len(batched_latencies) * 1e6:>10.1f}"
+          f"{p99(batched_latencies):>10.1f}{args.results / batched_seconds:>12,.0f}")
+    print(f"Writer used {stats['batches']} transactions for {stats['written']:,} results")
+
+    for label, kwargs in (("one student's history", {"student_id": "student-42"}),
+                          ("one passage, last 50", {"kind": "reading", "item_id": results[0][0]})):
+        started = time.perf_counter()
+        for _ in range(200):
+            store.history(**kwargs)
+        print(f"History query ({label}): {(time.perf_counter() - started) / 200 * 1000:.3f} ms")
+
+    conn = sqlite3.connect(os.path.join(directory, "batched.sqlite3"))
+    for label, column, value in (("one student", "student_id", "student-42"),
+                                 ("one class", "class_id", "class-1")):
+        started = time.perf_counter()
+        for _ in range(50):
+            store.progress(**{column: value})
+        rollup_ms = (time.perf_counter() - started) / 50 * 1000
+        started = time.perf_counter()
+        for _ in range(50):
+            progress_from_history(conn, column, value)
+        scan_ms = (time.perf_counter() - started) / 50 * 1000
+        print(f"Progress for {label}: rollups {rollup_ms:.3f} ms, recomputed from history {scan_ms:.3f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""
+Text Analysis Benchmark
+Times the shared analyze_text() call against the chained replace/split
+counting that WritingAssessment and the fallback evaluator each used to do,
+on synthetic essays of 500 to 5,000 words.
+
+Run from the project root:
+    python -m benchmarks.bench_text_analysis
+"""
+
+import argparse
+import random
+import timeit
+
+from app.assessments.text_analysis import analyze_text
+
+
+VOCABULARY = (
+    "the a students school screen time reading writing because however therefore "
+    "community lighthouse keeper storm decision changed everything reason evidence "
+    "believe important family friends learned moment finally example first second "
+    "percent about approximately twelve hours and of to in that it was for on with"
+).split()
+
+# Tokens that trip naive sentence splitting, mixed in now and then
+TRICKY = ["Mr.", "Dr.", "e.g.", "3.5", "i.e.", "U.S."]
+
+
+def make_essay(word_count, seed=7):
+    """Build a deterministic essay with varied sentences, ellipses and paragraphs."""
+    rng = random.Random(seed)
+    paragraphs = []
+    written = 0
+    while written < word_count:
+        sentences = []
+        for _ in range(rng.randint(4, 7)):
+            length = rng.randint(6, 22)
+            words = [rng.choice(VOCABULARY) for _ in range(length)]
+            if rng.random() < 0.2:
+                words[rng.randrange(1, length)] = rng.choice(TRICKY)
+            words[0] = words[0].capitalize()
+            ending = rng.choice([".", ".", ".", "!", "?", "..."])
+            sentences.append(" ".join(words) + ending)
+            written += length
+        paragraphs.append(" ".join(sentences))
+    return "\n\n".join(paragraphs)
+
+
+def chained_counts(text):
+    """The old counting: several full copies of the essay per caller."""
+    word_count = len(text.split())
+    sentences = text.replace('!', '.').replace('?', '.').split('.')
+    sentence_count = len([s for s in sentences if s.strip()])
+    paragraphs = text.split('\n\n')
+    paragraph_count = len([p for p in paragraphs if p.strip()])
+    return word_count, sentence_count, paragraph_count
+
+
+def _per_call_us(func, number, repeat):
+    return min(timeit.repeat(func, number=number, repeat=repeat)) / number * 1_000_000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--number", type=int, default=200, help="calls per timing run")
+    parser.add_argument("--repeat", type=int, default=5, help="timing runs; best is reported")
+    args = parser.parse_args()
+
+    print(f"{'words':>6}{'chained x2 (us)':>18}{'shared once (us)':>19}{'sentences':>11}")
+    for word_count in (500, 1000, 2500, 5000):
+        essay = make_essay(word_count)
+        # The old code counted twice per submission: once in
+        # WritingAssessment and again in the fallback evaluator
+        before = _per_call_us(lambda: (chained_counts(essay), chained_counts(essay)),
+                              args.number, args.repeat)
+        after = _per_call_us(lambda: analyze_text(essay), args.number, args.repeat)
+        metrics = analyze_text(essay)
+        print(f"{metrics.word_count:>6}{before:>18.1f}{after:>19.1f}{metrics.sentence_count:>11}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,354 @@
+"""
+Class Session Load Test
+Simulates whole classes taking the reading and writing assessments at once
+and reports throughput, per-route latency percentiles and error rates as JSON.
+
+Each simulated student, starting at a random moment within the ramp-up
+window, opens the reading page, opens the class's passage, answers it and
+submits, then opens the class's writing prompt, submits an essay and polls
+the job until the evaluation is done, thinking between steps. Every class
+shares one passage and one prompt, as a real class does.
+
+The app is driven in-process through its WSGI interface by default, or over
+HTTP with --url. In-process runs default to the offline scorer for writing
+(AI_BACKEND=local) so they never call the Claude API; --stub starts the
+bundled stub server and evaluates through it instead, with its latency.
+
+Think times use the stub server's distribution specs: fixed:S,
+uniform:LOW:HIGH or lognormal:MEDIAN:SIGMA (seconds).
+
+Run from the project root:
+    python -m benchmarks.load_class_session --students 30 --classes 3
+    python -m benchmarks.load_class_session --stub --stub-latency lognormal:4:0.5 -o report.json
+    python -m benchmarks.load_class_session --url http://127.0.0.1:5000
+"""
+
+import argparse
+import http.client
+import json
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from urllib.parse import urlsplit
+
+from benchmarks.bench_text_analysis import make_essay
+from benchmarks.stub_server import StubConfig, parse_latency, start_server
+
+
+DEFAULT_THINK = "uniform:0.5:2"
+DEFAULT_READING_TIME = "uniform:2:6"
+DEFAULT_WRITING_TIME = "uniform:3:8"
+
+# Seconds between polls of a writing job, as the writing page does
+POLL_INTERVAL = 1.0
+# Give up on a writing job after this long
+JOB_TIMEOUT = 180.0
+
+
+class WSGITransport:
+    """Requests through the Flask test client, one client per student."""
+
+    def __init__(self, app):
+        self.app = app
+
+    def session(self):
+        client = self.app.test_client()
+
+        def send(method, path, body=None):
+            response = client.open(path, method=method, json=body)
+            return response.status_code, response.get_data()
+
+        return send
+
+
+class HTTPTransport:
+    """Requests over HTTP, one keep-alive connection per student."""
+
+    def __init__(self, url):
+        parts = urlsplit(url)
+        self.host = parts.hostname
+        self.port = parts.port or (443 if parts.scheme == "https" else 80)
+        self.connection_class = (http.client.HTTPSConnection if parts.scheme == "https"
+                                 else http.client.HTTPConnection)
+        self.prefix = parts.path.rstrip("/")
+
+    def session(self):
+        holder = {}
+
+        def send(method, path, body=None):
+            headers = {}
+            data = None
+            if body is not None:
+                data = json.dumps(body).encode()
+                headers["Content-Type"] = "application/json"
+            for attempt in (0, 1):
+                if "connection" not in holder:
+                    holder["connection"] = self.connection_class(self.host, self.port, timeout=120)
+                connection = holder["connection"]
+                try:
+                    connection.request(method, self.prefix + path, body=data, headers=headers)
+                    response = connection.getresponse()
+                    return response.status, response.read()
+                except (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError):
+                    # The server closed an idle keep-alive connection; reconnect once
+                    connection.close()
+                    del holder["connection"]
+                    if attempt:
+                        raise
+
+        return send
+
+
+class Recorder:
+    """Thread-safe latency and error samples per route."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.samples = {}
+        self.errors = {}
+
+    def add(self, route, seconds, ok, detail=None):
+        with self._lock:
+            self.samples.setdefault(route, []).append(seconds)
+            if not ok:
+                self.errors.setdefault(route, []).append(detail)
+
+    def report(self, elapsed):
+        with self._lock:
+            samples = {route: sorted(values) for route, values in self.samples.items()}
+            errors = {route: list(values) for route, values in self.errors.items()}
+        routes = {}
+        for route, values in samples.items():
+            failed = errors.get(route, [])
+            routes[route] = {
+                "count": len(values),
+                "errors": len(failed),
+                "error_rate": round(len(failed) / len(values), 4),
+                "throughput_per_second": round(len(values) / elapsed, 2),
+                "mean_ms": round(sum(values) / len(values) * 1000, 1),
+                "p50_ms": round(percentile(values, 0.50) * 1000, 1),
+                "p95_ms": round(percentile(values, 0.95) * 1000, 1),
+                "p99_ms": round(percentile(values, 0.99) * 1000, 1),
+                "max_ms": round(values[-1] * 1000, 1)
+            }
+            if failed:
+                routes[route]["error_examples"] = sorted(set(failed))[:5]
+        return routes
+
+
+def percentile(sorted_values, share):
+    """Nearest-rank percentile of an already sorted list."""
+    index = max(0, min(len(sorted_values) - 1, int(round(share * len(sorted_values) + 0.5)) - 1))
+    return sorted_values[index]
+
+
+def simulate_student(send, recorder, plan, rng, think, reading_time, writing_time, time_scale):
+    """Run one student's session; returns True if every step succeeded."""
+
+    def pause(sample):
+        time.sleep(sample() * time_scale)
+
+    def call(route, method, path, body=None, expect=(200,)):
+        started = time.perf_counter()
+        try:
+            status, data = send(method, path, body)
+        except Exception as e:
+            recorder.add(route, time.perf_counter() - started, False, type(e).__name__)
+            return None, None
+        ok = status in expect
+        recorder.add(route, time.perf_counter() - started, ok, None if ok else f"HTTP {status}")
+        return (status, data) if ok else (None, None)
+
+    passage_id, prompt_id = plan["passage_id"], plan["prompt_id"]
+    if call("GET /reading", "GET", "/reading")[0] is None:
+        return False
+    pause(think)
+    if call("GET /reading/<id>", "GET", f"/reading/{passage_id}")[0] is None:
+        return False
+    pause(reading_time)
+
+    answers = {
+        question_id: correct if rng.random() < plan["accuracy"] else rng.randrange(4)
+        for question_id, correct in plan["answer_key"].items()
+    }
+    body = {"passage_id": passage_id, "answers": answers, "student_id": plan["student_id"]}
+    if call("POST /reading/submit", "POST", "/reading/submit", body)[0] is None:
+        return False
+    pause(think)
+
+    if call("GET /writing/<id>", "GET", f"/writing/{prompt_id}")[0] is None:
+        return False
+    pause(writing_time)
+
+    submitted = time.perf_counter()
+    body = {"prompt_id": prompt_id, "response": make_essay(rng.randint(220, 420), seed=rng.getrandbits(32))}
+    status, data = call("POST /writing/submit", "POST", "/writing/submit", body, expect=(202,))
+    if status is None:
+        return False
+    job_id = json.loads(data)["job_id"]
+    while time.perf_counter() - submitted < JOB_TIMEOUT:
+        time.sleep(POLL_INTERVAL * time_scale)
+        status, data = call("GET /writing/jobs/<id>", "GET", f"/writing/jobs/{job_id}")
+        if status is None:
+            return False
+        job_status = json.loads(data)["status"]
+        if job_status in ("done", "failed"):
+            ok = job_status == "done"
+            recorder.add("writing evaluation (submit to result)", time.perf_counter() - submitted,
+                         ok, None if ok else "job failed")
+            return ok
+    recorder.add("writing evaluation (submit to result)", time.perf_counter() - submitted, False, "timed out")
+    return False
+
+
+def class_plans(classes, students, accuracy, seed):
+    """One passage and prompt per class, rotating through the catalogs."""
+    from app.assessments.reading import get_passage_catalog
+    from app.assessments.writing import get_prompt_catalog
+
+    passages = list(get_passage_catalog().items())
+    prompt_ids = list(get_prompt_catalog())
+    plans = []
+    for class_number in range(classes):
+        passage_id, passage = passages[class_number % len(passages)]
+        answer_key = {question["id"]: question["correct"] for question in passage["questions"]}
+        for student in range(students):
+            plans.append({
+                "class": class_number,
+                "student_id": f"load-{seed}-{class_number}-{student}",
+                "passage_id": passage_id,
+                "prompt_id": prompt_ids[class_number % len(prompt_ids)],
+                "answer_key": answer_key,
+                "accuracy": accuracy
+            })
+    return plans
+
+
+def run(transport, plans, ramp, think, reading_time, writing_time, time_scale, seed):
+    """Run every student concurrently and return (recorder, elapsed, completed)."""
+    recorder = Recorder()
+    completed = []
+    lock = threading.Lock()
+    master = random.Random(seed)
+    started = time.perf_counter()
+
+    def student(plan, delay, student_seed):
+        time.sleep(delay)
+        ok = simulate_student(transport.session(), recorder, plan, random.Random(student_seed),
+                              think, reading_time, writing_time, time_scale)
+        with lock:
+            completed.append(ok)
+
+    threads = [
+        threading.Thread(target=student, args=(plan, master.uniform(0, ramp), master.getrandbits(32)))
+        for plan in plans
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return recorder, time.perf_counter() - started, completed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--students", type=int, default=30, help="students per class")
+    parser.add_argument("--classes", type=int, default=1, help="classes testing at the same time")
+    parser.add_argument("--ramp", type=float, default=10.0, help="seconds over which students start")
+    parser.add_argument("--think", default=DEFAULT_THINK, help="pause between page steps")
+    parser.add_argument("--reading-time", default=DEFAULT_READING_TIME, help="time spent on the passage")
+    parser.add_argument("--writing-time", default=DEFAULT_WRITING_TIME, help="time spent writing")
+    parser.add_argument("--time-scale", type=float, default=1.0,
+                        help="multiplier on every think time and poll interval")
+    parser.add_argument("--accuracy", type=float, default=0.7, help="chance each reading answer is right")
+    parser.add_argument("--url", help="test a running server instead of the app in-process")
+    parser.add_argument("--stub", action="store_true",
+                        help="in-process only: evaluate writing through a local stub Claude server")
+    parser.add_argument("--stub-latency", default="lognormal:4:0.5", help="stub response latency")
+    parser.add_argument("--stub-error-rate", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", "-o", help="write the JSON report here (default: stdout)")
+    args = parser.parse_args()
+
+    try:
+        think = parse_latency(args.think)
+        reading_time = parse_latency(args.reading_time)
+        writing_time = parse_latency(args.writing_time)
+    except ValueError as e:
+        parser.error(str(e))
+
+    if args.url:
+        if args.stub:
+            parser.error("--stub only applies to in-process runs; start benchmarks.stub_server "
+                         "and run the server with AI_BACKEND=stub instead")
+        transport = HTTPTransport(args.url)
+        backend = None
+    else:
+        if args.stub:
+            server, _ = start_server(StubConfig(args.stub_latency, error_rate=args.stub_error_rate,
+                                                seed=args.seed))
+            os.environ["AI_BACKEND"] = "stub"
+            os.environ["AI_STUB_URL"] = f"http://127.0.0.1:{server.server_port}"
+        else:
+            os.environ.setdefault("AI_BACKEND", "local")
+        # Simulated answers must not end up in the real response log, results history or
+        # skill mastery; results and mastery are still saved, to throwaway files, so their
+        # cost is measured
+        os.environ.setdefault("RESPONSE_LOG_ENABLED", "0")
+        scratch = tempfile.mkdtemp(prefix="load-class-session-")
+        os.environ.setdefault("RESULTS_DB_PATH", os.path.join(scratch, "results.sqlite3"))
+        os.environ.setdefault("MASTERY_PATH", os.path.join(scratch, "mastery.npz"))
+        backend = os.environ["AI_BACKEND"]
+
+        from app import create_app
+        transport = WSGITransport(create_app())
+
+    plans = class_plans(args.classes, args.students, args.accuracy, args.seed)
+    print(f"Simulating {len(plans)} students in {args.classes} class(es) "
+          f"against {args.url or 'the app in-process'}...", file=sys.stderr)
+    recorder, elapsed, completed = run(transport, plans, args.ramp, think, reading_time,
+                                       writing_time, args.time_scale, args.seed)
+
+    routes = recorder.report(elapsed)
+    request_count = sum(route["count"] for name, route in routes.items() if name.startswith(("GET", "POST")))
+    error_count = sum(route["errors"] for name, route in routes.items() if name.startswith(("GET", "POST")))
+    report = {
+        "config": {
+            "target": args.url or "wsgi",
+            "ai_backend": backend,
+            "classes": args.classes,
+            "students_per_class": args.students,
+            "ramp_seconds": args.ramp,
+            "think": args.think,
+            "reading_time": args.reading_time,
+            "writing_time": args.writing_time,
+            "time_scale": args.time_scale,
+            "stub_latency": args.stub_latency if args.stub else None,
+            "seed": args.seed
+        },
+        "duration_seconds": round(elapsed, 2),
+        "students": len(plans),
+        "students_completed": sum(completed),
+        "requests": request_count,
+        "throughput_per_second": round(request_count / elapsed, 2),
+        "error_rate": round(error_count / request_count, 4) if request_count else 0.0,
+        "routes": routes
+    }
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+        print(f"Wrote {args.output}", file=sys.stderr)
+    else:
+        print(text)
+    print(f"{sum(completed)}/{len(plans)} students completed in {elapsed:.1f}s; "
+          f"{request_count} requests at {report['throughput_per_second']}/s, "
+          f"error rate {report['error_rate']:.2%}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
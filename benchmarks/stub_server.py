@@ -0,0 +1,318 @@
+"""
+Stub Claude Server
+A local stand-in for the Claude Messages API, for load tests that must not
+spend money or need the network.
+
+POST /v1/messages answers like the real API, streaming (server-sent events)
+or not. The evaluation in each response comes from the offline scorer run
+on the essay in the request, so feedback varies realistically. Latency is
+drawn from a configurable distribution, and a share of requests can fail
+(overloaded, rate limited or server errors) or hang past the client's
+timeout. GET /stats reports what the server has done so far.
+
+Latency distributions:
+    fixed:SECONDS
+    uniform:LOW:HIGH
+    lognormal:MEDIAN:SIGMA      heavy right tail, like real model latency
+
+Run from the project root, then start the app with AI_BACKEND=stub:
+    python -m benchmarks.stub_server --latency lognormal:4:0.5 --error-rate 0.05
+"""
+
+import argparse
+import json
+import math
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from app.assessments.ai_evaluator import MIN_CACHEABLE_PROMPT_TOKENS
+from app.assessments.local_scorer import score_writing
+
+
+DEFAULT_PORT = 8765
+
+_ESSAY = re.compile(r'STUDENT\'S WRITING:\s*"""\n(.*)\n"""', re.S)
+_REQUIREMENTS = re.compile(r"REQUIREMENTS: (\d+)-(\d+) words")
+
+# Share of the latency spent before the first token when streaming
+FIRST_TOKEN_SHARE = 0.25
+STREAM_CHUNK_CHARS = 24
+
+
+def parse_latency(spec):
+    """
+    Turn a latency spec into a function returning one sampled delay.
+
+    Raises:
+        ValueError: for an unknown distribution or bad parameters
+    """
+    name, _, params = spec.partition(":")
+    values = [float(v) for v in params.split(":")] if params else []
+    if name == "fixed" and len(values) == 1:
+        return lambda: values[0]
+    if name == "uniform" and len(values) == 2:
+        return lambda: random.uniform(values[0], values[1])
+    if name == "lognormal" and len(values) == 2:
+        mu = math.log(values[0])
+        return lambda: random.lognormvariate(mu, values[1])
+    raise ValueError(f"Unknown latency spec {spec!r}")
+
+
+class StubConfig:
+    """Behaviour of the stub server."""
+
+    def __init__(self, latency="fixed:0.5", error_rate=0.0, error_status=529,
+                 rate_limit_rate=0.0, hang_rate=0.0, hang_seconds=120.0, seed=None):
+        self.latency_spec = latency
+        self.sample_latency = parse_latency(latency)
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.rate_limit_rate = rate_limit_rate
+        self.hang_rate = hang_rate
+        self.hang_seconds = hang_seconds
+        if seed is not None:
+            random.seed(seed)
+
+
+class StubStats:
+    """Thread-safe counters reported by GET /stats."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counts = {"requests": 0, "streamed": 0, "errors": 0, "rate_limited": 0, "hung": 0,
+                       "abandoned": 0}
+        self.latencies = []
+
+    def add(self, name):
+        with self._lock:
+            self.counts[name] += 1
+
+    def add_latency(self, seconds):
+        with self._lock:
+            self.latencies.append(seconds)
+
+    def snapshot(self):
+        with self._lock:
+            latencies = sorted(self.latencies)
+            snapshot = dict(self.counts)
+        if latencies:
+            snapshot["latency_seconds"] = {
+                "p50": round(latencies[len(latencies) // 2], 3),
+                "p95": round(latencies[int(len(latencies) * 0.95)], 3),
+                "max": round(latencies[-1], 3)
+            }
+        return snapshot
+
+
+def _evaluation_text(request):
+    """Score the essay in a Messages API request with the offline scorer."""
+    content = request.get("messages", [{}])[-1].get("content", "")
+    if isinstance(content, list):
+        content = "".join(block.get("text", "") for block in content)
+    essay = _ESSAY.search(content)
+    requirements = _REQUIREMENTS.search(content)
+    prompt_info = {}
+    if requirements:
+        prompt_info = {"word_minimum": int(requirements.group(1)), "word_maximum": int(requirements.group(2))}
+    evaluation = score_writing(essay.group(1) if essay else content, prompt_info)
+    del evaluation["ai_evaluated"]
+    return json.dumps(evaluation, indent=2)
+
+
+def _usage(request, text, seen_systems):
+    """
+    Token counts in the API's shape, at roughly four characters a token.
+
+    Like the real API, the system prompt is only cached (written on first
+    sight, read after that) when it is marked for caching and at least
+    MIN_CACHEABLE_PROMPT_TOKENS long; otherwise it counts as plain input.
+    """
+    system = request.get("system", "")
+    blocks = system if isinstance(system, list) else [{"text": system}]
+    system_tokens = sum(len(block.get("text", "")) for block in blocks) // 4
+    prompt_tokens = len(json.dumps(request.get("messages", []))) // 4
+    cacheable = (any("cache_control" in block for block in blocks)
+                 and system_tokens >= MIN_CACHEABLE_PROMPT_TOKENS)
+    if not cacheable:
+        return {
+            "input_tokens": system_tokens + prompt_tokens,
+            "cache_read_input_tokens": 0,
+            "cache_creation_input_tokens": 0,
+            "output_tokens": len(text) // 4
+        }
+    key = json.dumps(system, sort_keys=True)
+    cached = key in seen_systems
+    seen_systems.add(key)
+    return {
+        "input_tokens": prompt_tokens,
+        "cache_read_input_tokens": system_tokens if cached else 0,
+        "cache_creation_input_tokens": 0 if cached else system_tokens,
+        "output_tokens": len(text) // 4
+    }
+
+
+def make_handler(config, stats):
+    """Build the request handler class bound to a config and stats."""
+    seen_systems = set()
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, format, *args):
+            pass
+
+        def _send_json(self, status, payload, headers=None):
+            body = json.dumps(payload).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            if self.path.rstrip("/") == "/stats":
+                self._send_json(200, dict(stats.snapshot(), latency=config.latency_spec,
+                                          error_rate=config.error_rate))
+            else:
+                self._send_json(404, {"type": "error", "error": {"type": "not_found_error",
+                                                                 "message": "Not found"}})
+
+        def do_POST(self):
+            length = int(self.headers.get("Content-Length") or 0)
+            request = json.loads(self.rfile.read(length) or b"{}")
+            stats.add("requests")
+
+            roll = random.random()
+            if roll < config.hang_rate:
+                stats.add("hung")
+                time.sleep(config.hang_seconds)
+            elif roll < config.hang_rate + config.rate_limit_rate:
+                stats.add("rate_limited")
+                self._send_json(429, {"type": "error", "error": {"type": "rate_limit_error",
+                                                                 "message": "Rate limited"}},
+                                headers={"retry-after": "1"})
+                return
+            elif roll < config.hang_rate + config.rate_limit_rate + config.error_rate:
+                stats.add("errors")
+                time.sleep(config.sample_latency() * FIRST_TOKEN_SHARE)
+                self._send_json(config.error_status, {"type": "error", "error": {
+                    "type": "overloaded_error" if config.error_status == 529 else "api_error",
+                    "message": "Stub failure"}})
+                return
+
+            latency = config.sample_latency()
+            stats.add_latency(latency)
+            text = _evaluation_text(request)
+            usage = _usage(request, text, seen_systems)
+            model = request.get("model", "stub")
+            if request.get("stream"):
+                stats.add("streamed")
+                try:
+                    self._stream(text, usage, model, latency)
+                except (BrokenPipeError, ConnectionResetError):
+                    # The client gave up on the stream, e.g. at its deadline
+                    stats.add("abandoned")
+                return
+
+            time.sleep(latency)
+            self._send_json(200, {
+                "id": f"msg_stub_{random.getrandbits(48):x}",
+                "type": "message",
+                "role": "assistant",
+                "model": model,
+                "content": [{"type": "text", "text": text}],
+                "stop_reason": "end_turn",
+                "stop_sequence": None,
+                "usage": usage
+            })
+
+        def _stream(self, text, usage, model, latency):
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+
+            def event(name, data):
+                body = f"event: {name}\ndata: {json.dumps(data)}\n\n".encode()
+                self.wfile.write(f"{len(body):x}\r\n".encode() + body + b"\r\n")
+                self.wfile.flush()
+
+            chunks = [text[i:i + STREAM_CHUNK_CHARS] for i in range(0, len(text), STREAM_CHUNK_CHARS)]
+            time.sleep(latency * FIRST_TOKEN_SHARE)
+            event("message_start", {"type": "message_start", "message": {
+                "id": f"msg_stub_{random.getrandbits(48):x}", "type": "message", "role": "assistant",
+                "model": model, "content": [], "stop_reason": None, "stop_sequence": None,
+                "usage": dict(usage, output_tokens=1)}})
+            event("content_block_start", {"type": "content_block_start", "index": 0,
+                                          "content_block": {"type": "text", "text": ""}})
+            pause = latency * (1 - FIRST_TOKEN_SHARE) / max(1, len(chunks))
+            for chunk in chunks:
+                event("content_block_delta", {"type": "content_block_delta", "index": 0,
+                                              "delta": {"type": "text_delta", "text": chunk}})
+                time.sleep(pause)
+            event("content_block_stop", {"type": "content_block_stop", "index": 0})
+            event("message_delta", {"type": "message_delta",
+                                    "delta": {"stop_reason": "end_turn", "stop_sequence": None},
+                                    "usage": {"output_tokens": usage["output_tokens"]}})
+            event("message_stop", {"type": "message_stop"})
+            self.wfile.write(b"0\r\n\r\n")
+
+    return Handler
+
+
+def start_server(config=None, host="127.0.0.1", port=0):
+    """
+    Start the stub server on a background thread.
+
+    Args:
+        config: StubConfig (defaults: 0.5 s fixed latency, no errors)
+        port: Port to listen on; 0 picks a free one
+
+    Returns:
+        (server, stats); the URL is f"http://{host}:{server.server_port}"
+    """
+    stats = StubStats()
+    server = ThreadingHTTPServer((host, port), make_handler(config or StubConfig(), stats))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--latency", default="lognormal:4:0.5",
+                        help="fixed:S, uniform:LOW:HIGH or lognormal:MEDIAN:SIGMA (seconds)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="share of requests that fail")
+    parser.add_argument("--error-status", type=int, default=529, help="status code for failures")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="share answered with 429")
+    parser.add_argument("--hang-rate", type=float, default=0.0, help="share that hang past client timeouts")
+    parser.add_argument("--hang-seconds", type=float, default=120.0)
+    parser.add_argument("--seed", type=int)
+    args = parser.parse_args()
+
+    try:
+        config = StubConfig(args.latency, args.error_rate, args.error_status,
+                            args.rate_limit_rate, args.hang_rate, args.hang_seconds, args.seed)
+    except ValueError as e:
+        parser.error(str(e))
+
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(config, StubStats()))
+    server.daemon_threads = True
+    print(f"Stub Claude server on http://{args.host}:{args.port} (latency {args.latency}, "
+          f"errors {args.error_rate:.0%}, rate limits {args.rate_limit_rate:.0%}, hangs {args.hang_rate:.0%})")
+    print(f"Run the app with AI_BACKEND=stub AI_STUB_URL=http://{args.host}:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,254 @@
+"""
+Assessment Microbenchmark Suite
+Times the request hot paths in-process and saves the results, with machine
+metadata, as JSON so runs can be compared over time.
+
+Benchmarks:
+    reading_assessment_init     ReadingAssessment()
+    get_available_passages      Passage list for /reading
+    evaluate_answers            Grading one submitted reading test
+    trace_mastery               Knowledge-tracing update from one graded reading test
+    writing_evaluate_local      WritingAssessment.evaluate_writing with the offline scorer
+    parse_evaluation_json       Parsing a typical AI response (JSON inside prose)
+    parse_evaluation_fallback   Parsing an AI response with no usable JSON
+    render_reading_test         Rendering reading_test.html
+    render_writing_test         Rendering writing_test.html
+
+Each benchmark reports the best, median and spread of several timing runs,
+in microseconds per call. compare flags benchmarks whose best time grew by
+more than the threshold; run-to-run noise on a quiet machine is usually a
+few percent, so the default of 10% avoids false alarms. Compare runs from
+the same machine only.
+
+Run from the project root:
+    python -m benchmarks.suite run -o baseline.json
+    python -m benchmarks.suite run -o current.json --compare baseline.json
+    python -m benchmarks.suite compare baseline.json current.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import socket
+import statistics
+import subprocess
+import sys
+import time
+import timeit
+
+from benchmarks.bench_text_analysis import make_essay
+
+
+DEFAULT_THRESHOLD = 0.10
+# Each timing run lasts at least this long
+MIN_RUN_SECONDS = 0.2
+
+
+def build_cases():
+    """Return {name: zero-argument callable} for every benchmark."""
+    from flask import render_template
+
+    from app import create_app
+    from app.assessments.ai_evaluator import AIEvaluator
+    from app.assessments.backends import LocalBackend
+    from app.assessments.knowledge_tracing import KnowledgeTracer, catalog_skills
+    from app.assessments.local_scorer import score_writing
+    from app.assessments.reading import ReadingAssessment
+    from app.assessments.writing import WritingAssessment
+
+    app = create_app()
+    reading = ReadingAssessment()
+    passage_id = next(iter(reading.passages))
+    passage = reading.get_passage(passage_id)
+    answers = {
+        question["id"]: question["correct"] if n % 3 else (question["correct"] + 1) % 4
+        for n, question in enumerate(passage["questions"])
+    }
+
+    graded = reading.evaluate_answers(passage_id, answers)
+    tracer = KnowledgeTracer(catalog_skills())
+
+    writing = WritingAssessment()
+    writing.ai_evaluator = AIEvaluator(LocalBackend())
+    prompt_id = next(iter(writing.prompts))
+    prompt = writing.get_prompt(prompt_id)
+    essay = make_essay(350)
+
+    evaluator = AIEvaluator(LocalBackend())
+    evaluation = score_writing(essay, prompt)
+    del evaluation["ai_evaluated"]
+    json_response = ("Here is my evaluation of the student's writing.\n\n```json\n"
+                     + json.dumps(evaluation, indent=2) + "\n```\n\nI hope this feedback helps!")
+    prose_response = ("The student makes a clear point about screen time but the supporting "
+                      "paragraphs repeat each other. Level 3 overall. " * 12)
+
+    context = app.test_request_context()
+    context.push()
+
+    return {
+        "reading_assessment_init": ReadingAssessment,
+        "get_available_passages": reading.get_available_passages,
+        "evaluate_answers": lambda: reading.evaluate_answers(passage_id, answers),
+        "trace_mastery": lambda: tracer.observe_result("student-1", graded),
+        "writing_evaluate_local": lambda: writing.evaluate_writing(prompt_id, essay),
+        "parse_evaluation_json": lambda: evaluator._parse_evaluation_response(json_response),
+        "parse_evaluation_fallback": lambda: evaluator._parse_evaluation_response(prose_response),
+        "render_reading_test": lambda: render_template('reading_test.html', passage=passage),
+        "render_writing_test": lambda: render_template('writing_test.html', prompt=prompt)
+    }
+
+
+def time_case(func, repeat):
+    """Time func, choosing the call count so each run lasts at least MIN_RUN_SECONDS."""
+    timer = timeit.Timer(func)
+    number, elapsed = timer.autorange()
+    number = max(1, int(number * MIN_RUN_SECONDS / max(elapsed, 1e-9)))
+    runs = [seconds / number * 1e6 for seconds in timer.repeat(repeat=repeat, number=number)]
+    return {
+        "best_us": round(min(runs), 3),
+        "median_us": round(statistics.median(runs), 3),
+        "stdev_us": round(statistics.stdev(runs), 3) if len(runs) > 1 else 0.0,
+        "number": number,
+        "repeat": repeat
+    }
+
+
+def _package_version(name):
+    try:
+        from importlib.metadata import version
+        return version(name)
+    except Exception:
+        return None
+
+
+def _git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                              text=True, timeout=5, cwd=os.path.dirname(os.path.abspath(__file__))
+                              ).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def machine_metadata():
+    """Where and with what the benchmarks ran."""
+    return {
+        "hostname": socket.gethostname(),
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "processor": platform.processor() or None,
+        "cpu_count": os.cpu_count(),
+        "python": platform.python_version(),
+        "implementation": platform.python_implementation(),
+        "packages": {name: _package_version(name) for name in ("flask", "jinja2", "numpy")},
+        "git_commit": _git_commit()
+    }
+
+
+def run_suite(selected, repeat):
+    cases = build_cases()
+    unknown = set(selected or ()) - set(cases)
+    if unknown:
+        raise SystemExit(f"Unknown benchmarks: {', '.join(sorted(unknown))}")
+    results = {}
+    for name, func in cases.items():
+        if selected and name not in selected:
+            continue
+        results[name] = time_case(func, repeat)
+        print(f"{name:<28}{results[name]['best_us']:>12.2f} us  "
+              f"(median {results[name]['median_us']:.2f}, x{results[name]['number']})", file=sys.stderr)
+    return {
+        "created": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "machine": machine_metadata(),
+        "benchmarks": results
+    }
+
+
+def compare(baseline, current, threshold):
+    """
+    Compare two result sets by best time.
+
+    Returns:
+        (rows, regressions) where each row is (name, baseline_us, current_us, change)
+    """
+    rows = []
+    regressions = []
+    for name, result in current["benchmarks"].items():
+        before = baseline["benchmarks"].get(name)
+        if before is None:
+            rows.append((name, None, result["best_us"], None))
+            continue
+        change = result["best_us"] / before["best_us"] - 1
+        rows.append((name, before["best_us"], result["best_us"], change))
+        if change > threshold:
+            regressions.append(name)
+    return rows, regressions
+
+
+def print_comparison(baseline, current, threshold):
+    """Print the comparison table and return the list of regressed benchmarks."""
+    if baseline["machine"].get("hostname") != current["machine"].get("hostname"):
+        print("Warning: results come from different machines", file=sys.stderr)
+    rows, regressions = compare(baseline, current, threshold)
+    print(f"{'benchmark':<28}{'baseline us':>13}{'current us':>13}{'change':>9}")
+    for name, before, after, change in rows:
+        if change is None:
+            print(f"{name:<28}{'-':>13}{after:>13.2f}{'new':>9}")
+            continue
+        flag = "  REGRESSION" if name in regressions else ""
+        print(f"{name:<28}{before:>13.2f}{after:>13.2f}{change:>+9.1%}{flag}")
+    if regressions:
+        print(f"{len(regressions)} regression(s) over {threshold:.0%}: {', '.join(regressions)}")
+    else:
+        print(f"No regressions over {threshold:.0%}")
+    return regressions
+
+
+def _load(path):
+    with open(path) as f:
+        return json.load(f)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = commands.add_parser("run", help="run the benchmarks")
+    run_parser.add_argument("names", nargs="*", help="benchmarks to run (default: all)")
+    run_parser.add_argument("--repeat", type=int, default=7, help="timing runs per benchmark")
+    run_parser.add_argument("--output", "-o", help="write the JSON results here (default: stdout)")
+    run_parser.add_argument("--compare", metavar="BASELINE", help="compare against saved results")
+    run_parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                            help="slowdown counted as a regression (default 0.10)")
+
+    compare_parser = commands.add_parser("compare", help="compare two saved result files")
+    compare_parser.add_argument("baseline")
+    compare_parser.add_argument("current")
+    compare_parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                                help="slowdown counted as a regression (default 0.10)")
+    args = parser.parse_args()
+
+    if args.command == "compare":
+        regressions = print_comparison(_load(args.baseline), _load(args.current), args.threshold)
+        sys.exit(1 if regressions else 0)
+
+    # The suite must never call the Claude API
+    os.environ["AI_BACKEND"] = "local"
+    os.environ["RESPONSE_LOG_ENABLED"] = "0"
+    os.environ.setdefault("RESULTS_STORE_ENABLED", "0")
+    os.environ.setdefault("KNOWLEDGE_TRACING_ENABLED", "0")
+    results = run_suite(args.names, args.repeat)
+    text = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+    if args.compare:
+        regressions = print_comparison(_load(args.compare), results, args.threshold)
+        sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()